@@ -0,0 +1,96 @@
+""" Selection of the extraction backend, and lazy access to the Abaqus
+modules. Two backends are available:
+
+- 'xy': Uses the session and xyDataListFromField, and therefore requires
+  the CAE kernel (``abaqus cae noGUI=script.py``)
+- 'bulk': Reads the field output bulk data through the odb object only,
+  see :py:mod:`odb_scripts.bulk_data`. This works with
+  ``abaqus python`` and odbAccess, which starts faster and uses less
+  memory than the CAE kernel.
+
+The Abaqus modules are only imported when the 'xy' backend is used, such
+that the extraction modules can be imported by a plain python, e.g. for
+tooling and tests.
+"""
+from __future__ import print_function, division
+import importlib
+
+
+ENGINES = ('xy', 'bulk')
+
+_cae = {}
+
+
+def cae_available():
+    """ Check if the CAE kernel (the abaqus session) is available
+
+    :rtype: bool
+
+    """
+    if 'available' not in _cae:
+        try:
+            import_abaqus('abaqus')
+            _cae['available'] = True
+        except ImportError:
+            _cae['available'] = False
+    return _cae['available']
+
+
+def resolve_engine(engine):
+    """ Get the engine to use
+
+    :param engine: 'xy', 'bulk' or 'auto'. 'auto' selects 'xy' if the
+                   CAE kernel is available, and 'bulk' otherwise.
+    :type engine: str
+
+    :returns: 'xy' or 'bulk'
+    :rtype: str
+
+    """
+    if engine == 'auto':
+        return 'xy' if cae_available() else 'bulk'
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine "' + str(engine) + '", must be '
+                         + 'one of "xy", "bulk" or "auto"')
+    return engine
+
+
+def import_abaqus(name):
+    """ Import an Abaqus module, e.g. 'abaqus' or 'abaqusConstants'
+
+    :param name: The module name
+    :type name: str
+
+    :returns: The module
+
+    :raises ImportError: If not running in Abaqus, with a hint to use
+                         the 'bulk' engine
+
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError as error:
+        raise ImportError('Could not import the Abaqus module "' + name
+                          + '" (' + str(error) + '). The "xy" engine '
+                          + 'requires the CAE kernel, use engine="bulk" '
+                          + 'with abaqus python')
+
+
+def get_session():
+    """ Get the abaqus session (requires the CAE kernel)
+
+    :rtype: Session object (Abaqus)
+
+    """
+    session = import_abaqus('abaqus').session
+    import_abaqus('visualization')  # Required for the xy data functions
+    return session
+
+
+def get_constants():
+    """ Get the abaqusConstants module
+
+    :rtype: module
+
+    """
+    return import_abaqus('abaqusConstants')
@@ -0,0 +1,349 @@
+""" Extract results from many odb files in parallel. Each odb file is
+opened by a separate worker process, and the results are extracted with
+the headless engine in :py:mod:`odb_scripts.bulk_data`. Failures are
+isolated per file, such that one broken odb does not stop the batch.
+
+On Windows, the calling script must protect the call with
+``if __name__ == '__main__':``, as required by :py:mod:`multiprocessing`.
+
+Command line usage::
+
+    abaqus python -m odb_scripts.batch spec.json out.npz job1.odb job2.odb
+
+where spec.json contains the extraction specification, see
+:py:func:`extract_many`.
+"""
+from __future__ import print_function, division
+import os
+import sys
+import json
+import argparse
+import importlib
+import traceback
+import multiprocessing
+import numpy as np
+
+from odb_scripts import bulk_data
+from odb_scripts import mesh_table
+from odb_scripts import frame_cache
+from odb_scripts.results import ResultArray
+from odb_scripts.writers import get_writer
+
+
+EXTRACTION_FUNCTIONS = {
+    'get_multiple_positions': bulk_data.get_multiple_positions,
+    'get_multiple_variables': bulk_data.get_multiple_variables}
+
+
+def extract_many(odb_paths, spec, processes=None, writer=None,
+                 keep_results=True, odb_module='odbAccess'):
+    """ Extract results from many odb files in parallel
+
+    :param odb_paths: Paths to the odb files
+    :type odb_paths: list[ str ]
+
+    :param spec: The extraction specification. The item 'function' is
+                 either 'get_multiple_positions' (default) or
+                 'get_multiple_variables', and the remaining items are
+                 passed as keyword arguments to that function, e.g.
+                 {'inst_name': 'PART-1-1', 'positions': 'NODESET',
+                 'variable': 'U2', 'step_numbers': [0, 1]}
+    :type spec: dict
+
+    :param processes: The number of worker processes. If None, the
+                      number of cpus is used. If 1, the files are
+                      processed in the current process.
+    :type processes: int
+
+    :param writer: If given, each result is written as a table named
+                   after the odb file, see :py:func:`get_table_names`
+                   and :py:func:`result_to_table`. Errors when writing
+                   a table are reported as errors for that odb file.
+    :type writer: :py:class:`odb_scripts.writers.Writer`
+
+    :param keep_results: Should the results be returned? Can be set to
+                         False to save memory when writing the results.
+    :type keep_results: bool
+
+    :param odb_module: The name of the module providing the function
+                       openOdb. Can be changed to use a stand-in for
+                       odbAccess.
+    :type odb_module: str
+
+    :returns: The results, with one item per odb path (None for failed
+              files), and the errors, with the traceback for each
+              failed odb path.
+    :rtype: (dict, dict)
+
+    """
+    spec = dict(spec)
+    function = spec.pop('function', 'get_multiple_positions')
+    if function not in EXTRACTION_FUNCTIONS:
+        raise ValueError('Unknown extraction function "' + function + '", '
+                         + 'must be one of '
+                         + str(sorted(EXTRACTION_FUNCTIONS)))
+
+    table_names = get_table_names(odb_paths)
+    in_worker = processes != 1
+    tasks = [(path, function, spec, odb_module, in_worker)
+             for path in odb_paths]
+
+    if in_worker:
+        pool = multiprocessing.Pool(processes)
+        task_results = pool.imap(_extract_file, tasks)
+    else:
+        task_results = map(_extract_file, tasks)
+        pool = None
+
+    results = {}
+    errors = {}
+    try:
+        for path, result, error in task_results:
+            if error is not None:
+                print('Extraction failed for "' + path + '":\n' + error)
+                errors[path] = error
+                results[path] = None
+                continue
+            results[path] = result if keep_results else None
+            if writer is not None:
+                try:
+                    columns, data, metadata = result_to_table(result)
+                    metadata['odb'] = path
+                    writer.write(table_names[path], columns, data, metadata)
+                except Exception:
+                    error = traceback.format_exc()
+                    print('Writing failed for "' + path + '":\n' + error)
+                    errors[path] = error
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return results, errors
+
+
+def extract_parallel(odb_path, spec, processes=None, odb_module='odbAccess'):
+    """ Extract results from one odb file, split into contiguous frame
+    ranges that are extracted in parallel by separate worker processes,
+    each opening the odb read-only. The merged result is identical to a
+    serial extraction with the same spec.
+
+    :param odb_path: Path to the odb file
+    :type odb_path: str
+
+    :param spec: The extraction specification, see
+                 :py:func:`extract_many`
+    :type spec: dict
+
+    :param processes: The number of worker processes. If None, the
+                      number of cpus is used.
+    :type processes: int
+
+    :param odb_module: The name of the module providing the function
+                       openOdb
+    :type odb_module: str
+
+    :returns: The merged result of all frame ranges, as from
+              get_multiple_positions or get_multiple_variables
+    :rtype: :py:class:`odb_scripts.results.ResultArray`
+
+    """
+    spec = dict(spec)
+    function = spec.pop('function', 'get_multiple_positions')
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    odb = importlib.import_module(odb_module).openOdb(odb_path, readOnly=True)
+    try:
+        num_frames = len(bulk_data.get_active_frames(
+            odb, spec['step_numbers'], spec.get('increments', ['0:-1'])))
+    finally:
+        odb.close()
+
+    frame_ranges = partition_frames(num_frames, processes)
+    tasks = [(odb_path, function, dict(spec, frame_range=frame_range),
+              odb_module, len(frame_ranges) > 1)
+             for frame_range in frame_ranges]
+
+    if len(tasks) == 1:
+        task_results = [_extract_file(tasks[0])]
+    else:
+        pool = multiprocessing.Pool(len(tasks))
+        try:
+            task_results = pool.map(_extract_file, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    for path, result, error in task_results:
+        if error is not None:
+            raise RuntimeError('Extraction failed for "' + path + '":\n'
+                               + error)
+
+    return merge_results([result for path, result, error in task_results])
+
+
+def get_table_names(odb_paths):
+    """ Get a unique table name for each odb file. The name is the file
+    name without extension if it is unique, and otherwise the path
+    relative to the common directory of the odb files, with the
+    directories joined by '_', e.g. 'run1_Job-1' for run1/Job-1.odb.
+
+    :param odb_paths: Paths to the odb files
+    :type odb_paths: list[ str ]
+
+    :returns: The table name for each odb path
+    :rtype: dict
+
+    """
+    abs_paths = [os.path.abspath(path) for path in odb_paths]
+    root = os.path.dirname(os.path.commonprefix(abs_paths))
+    base_names = [os.path.splitext(os.path.basename(path))[0]
+                  for path in abs_paths]
+    names = {}
+    used = set()
+    for path, abs_path, base_name in zip(odb_paths, abs_paths, base_names):
+        if path in names:
+            continue
+        if base_names.count(base_name) > 1:
+            rel_path = os.path.splitext(os.path.relpath(abs_path, root))[0]
+            base_name = '_'.join(rel_path.split(os.sep))
+        name = base_name
+        suffix = 1
+        while name in used:
+            suffix += 1
+            name = base_name + '_' + str(suffix)
+        names[path] = name
+        used.add(name)
+    return names
+
+
+def partition_frames(num_frames, num_parts):
+    """ Partition frames into contiguous ranges of similar size
+
+    :param num_frames: The number of frames
+    :type num_frames: int
+
+    :param num_parts: The maximum number of ranges
+    :type num_parts: int
+
+    :returns: The frame ranges, (start, stop), in order
+    :rtype: list[ tuple( int ) ]
+
+    """
+    num_parts = max(1, min(num_parts, num_frames))
+    bounds = [(num_frames*i)//num_parts for i in range(num_parts + 1)]
+    return [(bounds[i], bounds[i+1]) for i in range(num_parts)]
+
+
+def merge_results(results):
+    """ Merge results for consecutive frame ranges
+
+    :param results: The results, from get_multiple_positions or
+                    get_multiple_variables, in frame order
+    :type results: list[ :py:class:`odb_scripts.results.ResultArray` ]
+
+    :returns: The merged result
+    :rtype: :py:class:`odb_scripts.results.ResultArray`
+
+    """
+    if isinstance(results[0], ResultArray):
+        return ResultArray.concatenate(results)
+    merged = {}
+    for key in results[0]:
+        if key == 'node':
+            merged[key] = results[0][key]
+        elif key in ['step', 'incr']:
+            merged[key] = [item for result in results for item in result[key]]
+        else:
+            merged[key] = np.concatenate([result[key] for result in results])
+    return merged
+
+
+def result_to_table(result):
+    """ Convert a result dictionary from get_multiple_positions or
+    get_multiple_variables to a table
+
+    :param result: The result dictionary
+    :type result: dict
+
+    :returns: The column names, the data (one column per name) and the
+              metadata (node coordinates for results from
+              get_multiple_positions).
+    :rtype: (list[ str ], np.array, dict)
+
+    """
+    value_keys = [key for key in result
+                  if key not in ['step', 'incr', 'time', 'node']]
+    value_keys.sort(key=lambda key: (isinstance(key, (str, type(u''))), key))
+    columns = ['step', 'incr', 'Time'] + [str(key) for key in value_keys]
+    data = np.transpose([result['step'], result['incr'], result['time']]
+                        + [result[key] for key in value_keys])
+    metadata = {}
+    if 'node' in result:
+        metadata['node'] = np.asarray(result['node']).tolist()
+    return columns, data, metadata
+
+
+def _extract_file(task):
+    """ Extract results from one odb file, catching all errors. Worker
+    processes are reused for several files, and remove the cached data
+    of each file when it is done. In the current process, only the mesh
+    tables created for the closed odb are removed, and the caches of
+    the caller are kept.
+    """
+    path, function, kwargs, odb_module, in_worker = task
+    try:
+        open_odb = importlib.import_module(odb_module).openOdb
+        odb = open_odb(path, readOnly=True)
+        was_cached = mesh_table.is_cached(odb.name)
+        try:
+            result = EXTRACTION_FUNCTIONS[function](odb, **kwargs)
+        finally:
+            odb.close()
+            if in_worker:
+                mesh_table.clear_cache(odb.name)
+                frame_cache.default_cache.clear(odb.name)
+            elif not was_cached:
+                mesh_table.clear_cache(odb.name)
+        return path, result, None
+    except Exception:
+        return path, None, traceback.format_exc()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Extract results from many odb files in parallel')
+    parser.add_argument('spec', help='json file with the extraction spec')
+    parser.add_argument('output', help='output file (.npz, .h5 or a '
+                                       + 'directory for text files)')
+    parser.add_argument('odb_paths', nargs='+', help='the odb files')
+    parser.add_argument('-n', '--processes', type=int, default=None,
+                        help='number of worker processes')
+    parser.add_argument('--odb-module', default='odbAccess',
+                        help='module providing openOdb')
+    args = parser.parse_args(args)
+
+    with open(args.spec, 'r') as fid:
+        spec = json.load(fid)
+
+    if args.output.endswith('.npz'):
+        writer = get_writer('npz', filename=args.output)
+    elif args.output.endswith('.h5'):
+        writer = get_writer('h5', filename=args.output)
+    else:
+        if not os.path.isdir(args.output):
+            os.makedirs(args.output)
+        writer = get_writer('txt', directory=args.output)
+
+    with writer:
+        results, errors = extract_many(args.odb_paths, spec,
+                                       processes=args.processes,
+                                       writer=writer, keep_results=False,
+                                       odb_module=args.odb_module)
+
+    return 1 if len(errors) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
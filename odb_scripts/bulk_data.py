@@ -0,0 +1,639 @@
+""" Extraction of nodal results directly from the field output bulk
+data, without using the session, viewports or xy data objects. This
+module only requires the odb object, and can therefore be used when
+running ``abaqus python`` without the CAE kernel.
+"""
+from __future__ import print_function, division
+import re
+import hashlib
+import numpy as np
+
+from odb_scripts.mesh_table import get_mesh_table
+from odb_scripts.odb_pool import get_odb
+from odb_scripts.results import ResultArray
+from odb_scripts import derived
+from odb_scripts import frame_cache
+from odb_scripts.instrumentation import instrumented, phase, count
+
+
+@instrumented
+def get_multiple_positions(odb, inst_name, positions, variable, step_numbers,
+                           increments=['0:-1'], tol=1.e-2,
+                           frame_range=None):
+    """ Get given variable from odb at given positions for specified steps and
+    increments. See :py:func:`odb_scripts.node_data.get_multiple_positions`
+    for a description of the input parameters and the output.
+
+    :param frame_range: If given, only extract the frames
+                        frames[start:stop] of the selected frames, where
+                        frame_range=(start, stop). Used to split an
+                        extraction into parts, see
+                        :py:func:`odb_scripts.batch.extract_parallel`.
+    :type frame_range: tuple( int )
+
+    :rtype: :py:class:`odb_scripts.results.ResultArray`
+
+    """
+    odb = get_odb(odb)
+    node_labels, region = get_node_region(odb, inst_name, positions, tol)
+    frames = get_active_frames(odb, step_numbers, increments)
+    if frame_range is not None:
+        frames = frames[frame_range[0]:frame_range[1]]
+
+    values, time = read_nodal_values(
+        frames, [variable], region, node_labels,
+        cache_key=_cache_key(odb, inst_name, positions))
+
+    return ResultArray(values[:, :, 0], range(len(node_labels)),
+                       [frame[0] for frame in frames],
+                       [frame[2] for frame in frames], time,
+                       node=get_mesh_table(odb, inst_name).coordinates(
+                           node_labels))
+
+
+@instrumented
+def get_multiple_variables(odb, inst_name, position, variables, step_numbers,
+                           increments=['0:-1'], tol=1.e-2,
+                           frame_range=None):
+    """ Get given variables from odb at given position for specified
+    steps and increments. See
+    :py:func:`odb_scripts.node_data.get_multiple_variables` for a
+    description of the input parameters and the output.
+
+    :param frame_range: If given, only extract the frames
+                        frames[start:stop] of the selected frames, where
+                        frame_range=(start, stop). Used to split an
+                        extraction into parts, see
+                        :py:func:`odb_scripts.batch.extract_parallel`.
+    :type frame_range: tuple( int )
+
+    :rtype: :py:class:`odb_scripts.results.ResultArray`
+
+    """
+    odb = get_odb(odb)
+    node_labels, region = get_node_region(odb, inst_name, [position], tol)
+    frames = get_active_frames(odb, step_numbers, increments)
+    if frame_range is not None:
+        frames = frames[frame_range[0]:frame_range[1]]
+
+    values, time = read_nodal_values(
+        frames, variables, region, node_labels,
+        cache_key=_cache_key(odb, inst_name, [position]))
+
+    return ResultArray(values[:, 0, :], variables,
+                       [frame[0] for frame in frames],
+                       [frame[2] for frame in frames], time)
+
+
+@instrumented
+def get_multiple_positions_variables(odb, inst_name, positions, variables,
+                                     step_numbers, increments=['0:-1'],
+                                     tol=1.e-2):
+    """ Get given variables from odb at given positions for specified
+    steps and increments, in a single pass over the frames. See
+    :py:func:`odb_scripts.node_data.get_multiple_positions_variables` for
+    a description of the input parameters and the output.
+
+    :rtype: dict
+
+    """
+    odb = get_odb(odb)
+    node_labels, region = get_node_region(odb, inst_name, positions, tol)
+    frames = get_active_frames(odb, step_numbers, increments)
+
+    values, time = read_nodal_values(
+        frames, variables, region, node_labels,
+        cache_key=_cache_key(odb, inst_name, positions))
+
+    return {'step': [frame[0] for frame in frames],
+            'incr': [frame[2] for frame in frames],
+            'time': time,
+            'label': np.asarray(node_labels),
+            'node': get_mesh_table(odb, inst_name).coordinates(node_labels),
+            'variables': list(variables),
+            'values': values}
+
+
+def iter_multiple_positions(odb, inst_name, positions, variable, step_numbers,
+                            increments=['0:-1'], tol=1.e-2):
+    """ Iterate over the frames, yielding the given variable at the given
+    positions for one frame at a time. The input is the same as for
+    :py:func:`odb_scripts.node_data.get_multiple_positions`. The node
+    coordinates can be obtained from the mesh table, see
+    :py:meth:`odb_scripts.mesh_table.MeshTable.coordinates`.
+
+    :returns: Generator giving (step, incr, time, values) for each
+              frame, where values is an array with one value per node.
+              The values array is reused for all frames, and must be
+              copied if it should be kept.
+    :rtype: generator
+
+    """
+    odb = get_odb(odb)
+    node_labels, region = get_node_region(odb, inst_name, positions, tol)
+    frames = get_active_frames(odb, step_numbers, increments)
+    for frame_ind, time, values in iter_nodal_values(
+            frames, [variable], region, node_labels,
+            cache_key=_cache_key(odb, inst_name, positions)):
+        yield frames[frame_ind][0], frames[frame_ind][2], time, values[:, 0]
+
+
+def iter_multiple_variables(odb, inst_name, position, variables,
+                            step_numbers, increments=['0:-1'], tol=1.e-2):
+    """ Iterate over the frames, yielding the given variables at the
+    given position for one frame at a time. The input is the same as for
+    :py:func:`odb_scripts.node_data.get_multiple_variables`.
+
+    :returns: Generator giving (step, incr, time, values) for each
+              frame, where values is an array with one value per
+              variable. The values array is reused for all frames, and
+              must be copied if it should be kept.
+    :rtype: generator
+
+    """
+    odb = get_odb(odb)
+    node_labels, region = get_node_region(odb, inst_name, [position], tol)
+    frames = get_active_frames(odb, step_numbers, increments)
+    for frame_ind, time, values in iter_nodal_values(
+            frames, variables, region, node_labels,
+            cache_key=_cache_key(odb, inst_name, [position])):
+        yield frames[frame_ind][0], frames[frame_ind][2], time, values[0]
+
+
+def get_node_region(odb, inst_name, positions, tol):
+    """ Get the node labels and the smallest available region containing
+    the nodes, see :py:func:`get_label_region`.
+
+    :param odb: The odb object
+    :type odb: Odb object (Abaqus)
+
+    :param inst_name: The name of the instance
+    :type inst_name: str
+
+    :param positions: Node coordinates or name of node set in the
+                      instance
+    :type positions: list[ list[ float ] ] or str
+
+    :param tol: Tolerance for node position
+    :type tol: float
+
+    :returns: The node labels and the region (node, node set or
+              instance)
+    :rtype: (list[ int ], OdbMeshNode, OdbSet or OdbInstance object
+            (Abaqus))
+
+    """
+    with phase('node_lookup'):
+        mesh_table = get_mesh_table(odb, inst_name)
+        odb_inst = odb.rootAssembly.instances[inst_name]
+        if isinstance(positions, (str, type(u''))):
+            return (mesh_table.node_set_labels(positions),
+                    odb_inst.nodeSets[positions])
+        node_labels = mesh_table.find_labels(positions, tol)
+        return node_labels, get_label_region(odb, inst_name, node_labels)
+
+
+def get_label_region(odb, inst_name, node_labels):
+    """ Get the smallest region containing the given nodes, such that
+    only the values of these nodes are read from the field outputs. This
+    is the node itself for a single node, and a node set created in the
+    instance for several nodes. The created node sets are named after
+    their nodes, and are reused by later calls for the same nodes.
+
+    If the :py:data:`odb_scripts.frame_cache.default_cache` is enabled,
+    the instance is returned, such that the cached frames can be reused
+    by later calls for other nodes.
+
+    :param odb: The odb object
+    :type odb: Odb object (Abaqus)
+
+    :param inst_name: The name of the instance
+    :type inst_name: str
+
+    :param node_labels: The node labels
+    :type node_labels: list[ int ]
+
+    :returns: The region
+    :rtype: OdbMeshNode, OdbSet or OdbInstance object (Abaqus)
+
+    """
+    odb_inst = odb.rootAssembly.instances[inst_name]
+    node_labels = np.unique(np.asarray(node_labels, dtype=np.int64))
+    if frame_cache.default_cache.enabled or len(node_labels) == 0:
+        return odb_inst
+    if len(node_labels) == 1:
+        return odb_inst.getNodeFromLabel(int(node_labels[0]))
+    set_name = label_set_name(node_labels)
+    if set_name not in odb_inst.nodeSets.keys():
+        odb_inst.NodeSetFromNodeLabels(
+            name=set_name, nodeLabels=tuple(int(label)
+                                            for label in node_labels))
+        count('node_sets_created')
+    return odb_inst.nodeSets[set_name]
+
+
+def label_set_name(labels):
+    """ Get the name of the set created for the given labels, see
+    :py:func:`get_label_region`
+
+    :param labels: The sorted, unique node or element labels
+    :type labels: np.array
+
+    :rtype: str
+
+    """
+    label_str = ','.join(str(label) for label in labels.tolist())
+    return ('ODB_SCRIPTS_'
+            + hashlib.md5(label_str.encode('ascii')).hexdigest().upper())
+
+
+def read_nodal_values(frames, variables, region, node_labels,
+                      cache_key=None):
+    """ Read nodal values for the given frames into a preallocated array
+
+    :param frames: The frames to read, as given by
+                   :py:func:`get_active_frames`
+    :type frames: list[ tuple ]
+
+    :param variables: The variables to read, e.g. ['U1', 'RF2']
+    :type variables: list[ str ]
+
+    :param region: The region to get the field output subset for. Must
+                   contain all nodes in node_labels.
+    :type region: OdbInstance or OdbSet object (Abaqus)
+
+    :param node_labels: The labels of the nodes to read values for
+    :type node_labels: list[ int ]
+
+    :param cache_key: The region key, see :py:func:`iter_nodal_values`
+    :type cache_key: tuple
+
+    :returns: The values (frames x nodes x variables) and the total
+              time for each frame
+    :rtype: (np.array, np.array)
+
+    """
+    values = np.empty((len(frames), len(node_labels), len(variables)))
+    time = np.empty(len(frames))
+    for frame_ind, frame_time, frame_values in iter_nodal_values(
+            frames, variables, region, node_labels, cache_key):
+        time[frame_ind] = frame_time
+        values[frame_ind] = frame_values
+
+    count('bytes_produced', values.nbytes + time.nbytes)
+    return values, time
+
+
+def iter_nodal_values(frames, variables, region, node_labels,
+                      cache_key=None):
+    """ Iterate over the frames, reading the nodal values for one frame
+    at a time. Each field output is only read once per frame.
+
+    :param frames: The frames to read, as given by
+                   :py:func:`get_active_frames`
+    :type frames: list[ tuple ]
+
+    :param variables: The variables to read, e.g. ['U1', 'RF2']
+    :type variables: list[ str ]
+
+    :param region: The region to get the field output subset for. Must
+                   contain all nodes in node_labels.
+    :type region: OdbInstance or OdbSet object (Abaqus)
+
+    :param node_labels: The labels of the nodes to read values for
+    :type node_labels: list[ int ]
+
+    :param cache_key: The key identifying the region in the frame cache,
+                      see :py:func:`odb_scripts.frame_cache.region_key`.
+                      If given and the
+                      :py:data:`odb_scripts.frame_cache.default_cache`
+                      is enabled, the field outputs are read through
+                      the cache.
+    :type cache_key: tuple
+
+    :returns: Generator giving (frame index, time, values) for each
+              frame, where the frame index is the position in frames
+              and values is a nodes x variables array. The same values
+              array is reused for all frames.
+    :rtype: generator
+
+    """
+    output_names = []
+    if frames:
+        step_ind, step, frame_num = frames[0]
+        outputs = step.frames[frame_num].fieldOutputs
+        output_names = list(outputs.keys())
+
+    # Group the variables by field
+    fields = []
+    field_names = []
+    for var_ind, variable in enumerate(variables):
+        field_name, component = split_variable(variable, output_names)
+        if field_name not in field_names:
+            field_names.append(field_name)
+            fields.append((field_name, [], [], NodeSelector(node_labels)))
+        field = fields[field_names.index(field_name)]
+        field[1].append(component)
+        field[2].append(var_ind)
+
+    # Check the requested fields before reading any values
+    if frames:
+        for field_name, components, columns, selector in fields:
+            if field_name not in output_names:
+                raise ValueError('Could not extract ' + str(components)
+                                 + ': There is no field output '
+                                 + field_name + ' in the step '
+                                 + step.name + ', the field outputs are '
+                                 + str(output_names))
+            check_nodal_field(outputs[field_name], components)
+
+    cache = frame_cache.default_cache
+    use_cache = cache_key is not None and cache.enabled
+    values = np.empty((len(node_labels), len(variables)))
+    for frame_ind, (step_ind, step, frame_num) in enumerate(frames):
+        with phase('field_read'):
+            frame = step.frames[frame_num]
+            for field_name, components, columns, selector in fields:
+                field = frame.fieldOutputs[field_name]
+                if use_cache:
+                    blocks = cache.get_blocks(
+                        frame_cache.frame_key(cache_key, step, frame_num,
+                                              field_name), field, region)
+                else:
+                    blocks = field.getSubset(region=region).bulkDataBlocks
+                if any(derived.is_derived(comp, [field_name])
+                       for comp in components):
+                    # Read all components, and compute the derived values
+                    labels = list(field.componentLabels)
+                    raw = np.empty((len(node_labels), len(labels)))
+                    selector.fill(blocks, list(range(len(labels))), raw)
+                    with phase('derived'):
+                        values[:, columns] = derived.evaluate(
+                            components, raw, labels, field_name)
+                else:
+                    comp_inds = get_component_indices(field, components)
+                    selector.fill(blocks, comp_inds, values, columns)
+                count('bulk_blocks_read', len(blocks))
+        count('frames_read')
+        yield frame_ind, step.totalTime + frame.frameValue, values
+
+
+class NodeSelector(object):
+    """ Copy the values for a given list of nodes from bulk data blocks.
+    The mapping from block rows to output rows is cached, and reused as
+    long as the node labels in the blocks do not change between frames.
+
+    :param node_labels: The labels of the nodes to select
+    :type node_labels: list[ int ]
+
+    """
+
+    def __init__(self, node_labels):
+        self.keys = np.asarray(node_labels, dtype=np.int64)
+        self._block_maps = []
+
+    def fill(self, blocks, comp_inds, out, columns=None):
+        """ Fill the output array with the values from the bulk data
+        blocks
+
+        :param blocks: The bulk data blocks of a field output subset
+        :type blocks: list[ FieldBulkData object (Abaqus) ]
+
+        :param comp_inds: The component indices to copy
+        :type comp_inds: list[ int ]
+
+        :param out: The array to fill, with one row per selected key
+        :type out: np.array
+
+        :param columns: The columns in out to fill, one per component
+                        index. If None, out has one column per component
+                        index.
+        :type columns: list[ int ]
+
+        """
+        filled = np.zeros(len(self.keys), dtype=bool)
+        for block_ind, block in enumerate(blocks):
+            block_rows, out_rows = self._get_map(block_ind,
+                                                 self._block_keys(block))
+            if np.any(filled[out_rows]):
+                self._raise_duplicates(self.keys[out_rows[filled[out_rows]]])
+            if len(out_rows) > 0:
+                data = np.asarray(block.data)
+                data = data.reshape(data.shape[0], -1)
+                block_values = data[block_rows][:, comp_inds]
+                if columns is None:
+                    out[out_rows] = block_values
+                else:
+                    out[np.ix_(out_rows, columns)] = block_values
+                filled[out_rows] = True
+
+        if not np.all(filled):
+            raise ValueError('Could not find the '
+                             + self._describe(self.keys[~filled])
+                             + ' in the field output')
+
+    def _block_keys(self, block):
+        """ Get the key for each row in the block """
+        if block.nodeLabels is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.asarray(block.nodeLabels, dtype=np.int64)
+
+    def _describe(self, keys):
+        """ Describe the given keys in error messages """
+        return 'nodes ' + str(keys.tolist())
+
+    def _raise_duplicates(self, keys):
+        """ Raise an error for keys found more than once in the blocks """
+        raise ValueError('Found the ' + self._describe(np.unique(keys))
+                         + ' more than once in the field output')
+
+    def _get_map(self, block_ind, block_keys):
+        if block_ind < len(self._block_maps):
+            cached_keys, block_rows, out_rows = self._block_maps[block_ind]
+            if (cached_keys is block_keys
+                    or np.array_equal(cached_keys, block_keys)):
+                return block_rows, out_rows
+
+        if len(block_keys) > 0:
+            block_sort = np.argsort(block_keys, kind='mergesort')
+            sorted_keys = block_keys[block_sort]
+            inds = np.searchsorted(sorted_keys, self.keys)
+            inds[inds == len(sorted_keys)] = 0
+            out_rows = np.nonzero(sorted_keys[inds] == self.keys)[0]
+            block_rows = block_sort[inds[out_rows]]
+            duplicate = sorted_keys[1:] == sorted_keys[:-1]
+            if np.any(duplicate):
+                duplicate_keys = np.intersect1d(sorted_keys[1:][duplicate],
+                                                self.keys)
+                if len(duplicate_keys) > 0:
+                    self._raise_duplicates(duplicate_keys)
+        else:
+            out_rows = np.zeros(0, dtype=np.int64)
+            block_rows = np.zeros(0, dtype=np.int64)
+
+        block_map = (block_keys, block_rows, out_rows)
+        if block_ind < len(self._block_maps):
+            self._block_maps[block_ind] = block_map
+        else:
+            self._block_maps.append(block_map)
+        return block_rows, out_rows
+
+
+def _cache_key(odb, inst_name, positions):
+    """ Get the frame cache key of the region read for the positions """
+    if isinstance(positions, (str, type(u''))):
+        return frame_cache.region_key(odb, inst_name, positions)
+    return frame_cache.region_key(odb, inst_name)
+
+
+def check_nodal_field(field, variables):
+    """ Check that a field output has values at the nodes. Field outputs
+    at integration points, e.g. stresses, are not extrapolated to the
+    nodes by the bulk data engine.
+
+    :param field: The field output
+    :type field: FieldOutput object (Abaqus)
+
+    :param variables: The requested components and derived quantities
+                      of the field output, used in the error message
+    :type variables: list[ str ]
+
+    :raises ValueError: If the field output is not available at the
+                        nodes
+
+    """
+    positions = [str(location.position) for location in field.locations]
+    if 'NODAL' not in positions:
+        raise ValueError('Could not extract ' + str(list(variables))
+                         + ' at the nodes: The field output ' + field.name
+                         + ' is only available at ' + ', '.join(positions)
+                         + '. Use odb_scripts.element_data.'
+                         + 'get_multiple_elements for values at the '
+                         + 'integration points.')
+
+
+def get_component_indices(field, components):
+    """ Get the column indices of the given components in the field
+    output data
+
+    :param field: The field output
+    :type field: FieldOutput object (Abaqus)
+
+    :param components: The component labels, e.g. ['U1', 'U2']. The
+                       only component of a scalar field output, e.g.
+                       'PEEQ', is the field output name.
+    :type components: list[ str ]
+
+    :returns: The column index of each component
+    :rtype: list[ int ]
+
+    """
+    labels = list(field.componentLabels) or [field.name]
+    try:
+        return [labels.index(comp) for comp in components]
+    except ValueError:
+        raise ValueError('Could not find all components ' + str(components)
+                         + ' in field output ' + field.name
+                         + ' with components ' + str(labels))
+
+
+def split_variable(variable, field_names=()):
+    """ Split a variable specification, formatted as var_label +
+    str(comp_num), into the field output name and the component label,
+    e.g. 'UR2' gives ('UR', 'UR2'). Derived quantities give the field
+    output they are computed from, e.g. 'MISES' gives ('S', 'MISES'),
+    see :py:mod:`odb_scripts.derived`.
+
+    :param variable: The variable specification
+    :type variable: str
+
+    :param field_names: The names of the field outputs in the odb. A
+                        variable that is the name of a field output, e.g.
+                        'PEMAG', gives that scalar field output.
+    :type field_names: list[ str ]
+
+    :returns: The field output name and the component label
+    :rtype: (str, str)
+
+    """
+    if variable in field_names:
+        return variable, variable
+    split = derived.split_derived(variable)
+    if split is not None:
+        return split[0], variable
+    match = re.match(r'^(\D+)(\d+)$', variable)
+    if match is None:
+        raise ValueError('Could not extract variable from expression "'
+                         + variable + '"')
+    return match.group(1), variable
+
+
+def get_active_frames(odb, steps, incr):
+    """ Get the frames for the given steps and increments, without
+    using the session. The frame selection is the same as for
+    :py:func:`odb_scripts.node_data.set_active_frames`
+
+    :param odb: The odb object to get frames from
+    :type odb: Odb object (Abaqus)
+
+    :param steps: List of step numbers
+    :type steps: list[ int ]
+
+    :param incr: List of increments from which to extract results.
+                 ['0:-1'] implies all increments.
+                 Note that python negative numbering can be used,
+                 such that -1 implies last increment. Opposed to
+                 python lists, the last given index is included.
+    :type incr: list[ int or str ]
+
+    :returns: List of (step index, step, frame number), one item per
+              frame. The step index is the position in steps.
+    :rtype: list[ tuple( int, OdbStep object (Abaqus), int ) ]
+
+    """
+    with phase('frame_selection'):
+        all_step_names = odb.steps.keys()
+        frames = []
+        for step_ind, step_num in enumerate(steps):
+            step = odb.steps[all_step_names[step_num]]
+            for frame_num in get_frame_numbers(len(step.frames), incr):
+                frames.append((step_ind, step, frame_num))
+    count('frames_activated', len(frames))
+    return frames
+
+
+def get_frame_numbers(num_frames, incr):
+    """ Convert an increment specification to a sorted list of frame
+    numbers
+
+    :param num_frames: The number of frames in the step
+    :type num_frames: int
+
+    :param incr: List of increments, see :py:func:`get_active_frames`.
+                 Strings can be formatted as 'start:stop' or
+                 'start:stop:step', with the stop index included.
+    :type incr: list[ int or str ]
+
+    :returns: Frame numbers
+    :rtype: list[ int ]
+
+    """
+    def positive(num):
+        return num + num_frames if num < 0 else num
+
+    frame_nums = set()
+    for the_incr in incr:
+        if isinstance(the_incr, (str, type(u''))):
+            spec = [int(s) for s in the_incr.split(':')]
+            step = spec[2] if len(spec) > 2 else 1
+            frame_nums.update(range(positive(spec[0]),
+                                    positive(spec[1]) + 1, step))
+        else:
+            frame_nums.add(positive(the_incr))
+
+    invalid = [n for n in frame_nums if n < 0 or n >= num_frames]
+    if len(invalid) > 0:
+        raise IndexError('The increments ' + str(incr) + ' are not valid '
+                         + 'for a step with ' + str(num_frames) + ' frames')
+
+    return sorted(frame_nums)
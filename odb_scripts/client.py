@@ -0,0 +1,182 @@
+""" Client for the odb query server in :py:mod:`odb_scripts.server`. The
+client only depends on numpy, and can be used from any python, e.g.::
+
+    from odb_scripts.client import OdbClient
+    with OdbClient() as client:
+        data = client.get_multiple_positions('job.odb', 'PART-1-1',
+                                             'NODESET', 'U2', [0])
+
+The methods take the same arguments as the corresponding functions in
+:py:mod:`odb_scripts.bulk_data`, with the odb path replacing the odb
+object. Positions given as numpy arrays are sent as raw buffers.
+"""
+from __future__ import print_function, division
+import socket
+
+from odb_scripts.protocol import send_message, recv_message
+
+
+DEFAULT_PORT = 50007
+
+
+class OdbClient(object):
+    """ Connection to an odb query server
+
+    :param address: The (host, port) of the server
+    :type address: tuple
+
+    :param timeout: Timeout in seconds for connecting and for each
+                    response. If None, wait forever.
+    :type timeout: float
+
+    """
+
+    def __init__(self, address=('127.0.0.1', DEFAULT_PORT), timeout=None):
+        self.address = tuple(address)
+        self.sock = socket.create_connection(self.address, timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Close the connection, the server keeps running """
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def request(self, command, **items):
+        """ Send a request and wait for the result
+
+        :param command: The command, 'call', 'open', 'close', 'list',
+                        'ping' or 'shutdown'
+        :type command: str
+
+        :param items: The items required by the command
+
+        :returns: The result
+        :rtype: object
+
+        :raises RuntimeError: If the request failed on the server, with
+                              the traceback from the server
+
+        """
+        if self.sock is None:
+            raise RuntimeError('The connection is closed')
+        send_message(self.sock, dict(items, command=command))
+        response = recv_message(self.sock)
+        if response is None:
+            raise EOFError('The server closed the connection')
+        if response['status'] != 'ok':
+            raise RuntimeError('Request failed on the server:\n'
+                               + response['error'])
+        return response['result']
+
+    def call(self, function, odb_path, **kwargs):
+        """ Call an extraction function on the server
+
+        :param function: The function name, see
+                         :py:data:`odb_scripts.server.FUNCTIONS`
+        :type function: str
+
+        :param odb_path: Path to the odb file, as seen by the server
+        :type odb_path: str
+
+        :param kwargs: The arguments to the function, except the odb
+
+        :returns: The result of the function
+
+        """
+        return self.request('call', function=function, odb=odb_path,
+                            kwargs=kwargs)
+
+    def get_multiple_positions(self, odb_path, inst_name, positions,
+                               variable, step_numbers, increments=['0:-1'],
+                               tol=1.e-2):
+        """ See :py:func:`odb_scripts.node_data.get_multiple_positions`
+
+        :rtype: :py:class:`odb_scripts.results.ResultArray`
+
+        """
+        return self.call('get_multiple_positions', odb_path,
+                         inst_name=inst_name, positions=positions,
+                         variable=variable, step_numbers=step_numbers,
+                         increments=increments, tol=tol)
+
+    def get_multiple_variables(self, odb_path, inst_name, position,
+                               variables, step_numbers, increments=['0:-1'],
+                               tol=1.e-2):
+        """ See :py:func:`odb_scripts.node_data.get_multiple_variables`
+
+        :rtype: :py:class:`odb_scripts.results.ResultArray`
+
+        """
+        return self.call('get_multiple_variables', odb_path,
+                         inst_name=inst_name, position=position,
+                         variables=variables, step_numbers=step_numbers,
+                         increments=increments, tol=tol)
+
+    def get_multiple_positions_variables(self, odb_path, inst_name,
+                                         positions, variables, step_numbers,
+                                         increments=['0:-1'], tol=1.e-2):
+        """ See
+        :py:func:`odb_scripts.node_data.get_multiple_positions_variables`
+
+        :rtype: dict
+
+        """
+        return self.call('get_multiple_positions_variables', odb_path,
+                         inst_name=inst_name, positions=positions,
+                         variables=variables, step_numbers=step_numbers,
+                         increments=increments, tol=tol)
+
+    def get_node_labels(self, odb_path, inst_name, positions, tol=1.e-2):
+        """ See :py:func:`odb_scripts.node_data.get_node_labels`
+
+        :rtype: list[ int ]
+
+        """
+        return self.call('get_node_labels', odb_path, inst=inst_name,
+                         pos=positions, tol=tol)
+
+    def open_odb(self, odb_path):
+        """ Open an odb on the server, to avoid the delay at the first
+        extraction
+
+        :returns: The paths of the open odb files
+        :rtype: list[ str ]
+
+        """
+        return self.request('open', odb=odb_path)
+
+    def close_odb(self, odb_path):
+        """ Close an odb on the server
+
+        :returns: The paths of the open odb files
+        :rtype: list[ str ]
+
+        """
+        return self.request('close', odb=odb_path)
+
+    def list_odbs(self):
+        """ Get the paths of the odb files open on the server
+
+        :rtype: list[ str ]
+
+        """
+        return self.request('list')
+
+    def ping(self):
+        """ Check that the server responds
+
+        :rtype: bool
+
+        """
+        return self.request('ping') == 'pong'
+
+    def shutdown(self):
+        """ Stop the server, closing all odb files """
+        self.request('shutdown')
+        self.close()
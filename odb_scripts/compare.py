@@ -0,0 +1,385 @@
+""" Comparison of the results in two odb files, e.g. for regression
+testing after a solver upgrade or a change of a material subroutine.
+The field outputs are read frame by frame for the whole instance, and
+the maximum absolute and relative errors are computed with numpy::
+
+    from odb_scripts.compare import compare_odbs, format_report
+    report = compare_odbs('old.odb', 'new.odb', 'PART-1-1',
+                          ['U', 'S', 'MISES'], [0, 1], rtol=1.e-4)
+    print(format_report(report))
+
+The nodes (and elements) of the two odb files are matched by label, or
+by coordinates within a tolerance, such that remeshed models with the
+same nodes can be compared. Values at integration points are matched by
+element and integration point. Nodes and integration points only found
+in one of the odb files are counted, but not compared.
+"""
+from __future__ import print_function, division
+from collections import OrderedDict
+import numpy as np
+
+from odb_scripts.bulk_data import get_active_frames
+from odb_scripts.frame_cache import CachedBlock
+from odb_scripts.mesh_table import get_mesh_table
+from odb_scripts.odb_pool import get_odb
+from odb_scripts.spatial_index import NodeGrid
+from odb_scripts import derived
+from odb_scripts.instrumentation import instrumented, phase, count
+
+
+@instrumented
+def compare_odbs(odb_a, odb_b, inst_name, fields, step_numbers,
+                 increments=['0:-1'], match='label', tol=1.e-6, atol=0.0,
+                 rtol=1.e-5, stop_early=True, inst_name_b=None):
+    """ Compare field outputs between two odb files
+
+    :param odb_a: The reference odb object, or the path to the odb file
+    :type odb_a: Odb object (Abaqus) or str
+
+    :param odb_b: The odb object to compare, or the path to the odb file
+    :type odb_b: Odb object (Abaqus) or str
+
+    :param inst_name: The name of the instance
+    :type inst_name: str
+
+    :param fields: The field outputs, e.g. ['U', 'S'], with all
+                   components compared, and derived quantities, e.g.
+                   ['MISES'], see :py:mod:`odb_scripts.derived`
+    :type fields: list[ str ]
+
+    :param step_numbers: List of step numbers to compare
+    :type step_numbers: list[ int ]
+
+    :param increments: List of increments to compare. ['0:-1'] implies
+                       all increments. The frames are compared in order,
+                       i.e. the n-th selected frame of odb_a with the
+                       n-th selected frame of odb_b.
+    :type increments: list[ int ]
+
+    :param match: How to match the nodes, 'label' or 'coordinates'.
+                  With 'coordinates', nodes are matched by position and
+                  elements by the position of their centroids.
+    :type match: str
+
+    :param tol: Tolerance for matching positions
+    :type tol: float
+
+    :param atol: Absolute tolerance
+    :type atol: float
+
+    :param rtol: Relative tolerance. A field output fails in a frame if
+                 max(abs(a - b)) > atol + rtol*max(abs(a)), where a and
+                 b are all matched values in the frame.
+    :type rtol: float
+
+    :param stop_early: Stop after the first frame where any field output
+                       fails
+    :type stop_early: bool
+
+    :param inst_name_b: The name of the instance in odb_b, if different
+                        from inst_name
+    :type inst_name_b: str
+
+    :returns: The report, with the items
+
+              - "passed": True if all compared frames are within the
+                tolerances, and the number of frames are equal
+              - "num_frames": The number of selected frames in odb_a
+                and odb_b
+              - "step", "incr", "time": The compared frames of odb_a
+              - "time_b": The time of the compared frames of odb_b
+              - "fields": For each item in fields, a dict with the
+                arrays "max_abs", "max_rel", "passed" and "label" (the
+                node or element label in odb_a with the largest
+                absolute error), with one value per compared frame, and
+                the number of "compared" and "unmatched" values (nodes
+                or integration points)
+              - "failure": (field, frame index) of the first failure,
+                None if all compared frames passed
+
+    :rtype: dict
+
+    """
+    odb_a = get_odb(odb_a)
+    odb_b = get_odb(odb_b)
+    if inst_name_b is None:
+        inst_name_b = inst_name
+    if match not in ('label', 'coordinates'):
+        raise ValueError('Unknown match "' + str(match) + '", must be '
+                         + '"label" or "coordinates"')
+
+    if match == 'coordinates':
+        with phase('node_matching'):
+            mesh_a = get_mesh_table(odb_a, inst_name)
+            mesh_b = get_mesh_table(odb_b, inst_name_b)
+            node_map = LabelMap.from_coordinates(
+                mesh_a.labels, mesh_a.coords, mesh_b.labels, mesh_b.coords,
+                tol)
+            element_map = LabelMap.from_coordinates(
+                mesh_a.element_labels, _centroids(mesh_a),
+                mesh_b.element_labels, _centroids(mesh_b), tol)
+    else:
+        node_map = element_map = None
+
+    # Group the items by field output, to read each once per frame
+    field_items = OrderedDict()
+    for item in fields:
+        field_items.setdefault(_field_name(item), []).append(item)
+
+    frames_a = get_active_frames(odb_a, step_numbers, increments)
+    frames_b = get_active_frames(odb_b, step_numbers, increments)
+    num_frames = min(len(frames_a), len(frames_b))
+    inst_a = odb_a.rootAssembly.instances[inst_name]
+    inst_b = odb_b.rootAssembly.instances[inst_name_b]
+
+    results = OrderedDict((item, {'max_abs': [], 'max_rel': [],
+                                  'passed': [], 'label': []})
+                          for item in fields)
+    matches = {}
+    time = []
+    time_b = []
+    failure = None
+    for frame_ind in range(num_frames):
+        step_a, frame_num_a = frames_a[frame_ind][1:]
+        step_b, frame_num_b = frames_b[frame_ind][1:]
+        frame_a = step_a.frames[frame_num_a]
+        frame_b = step_b.frames[frame_num_b]
+        time.append(step_a.totalTime + frame_a.frameValue)
+        time_b.append(step_b.totalTime + frame_b.frameValue)
+        for field_name, items in field_items.items():
+            with phase('field_read'):
+                field = frame_a.fieldOutputs[field_name]
+                block_a = CachedBlock(
+                    field.getSubset(region=inst_a).bulkDataBlocks)
+                block_b = CachedBlock(frame_b.fieldOutputs[field_name]
+                                      .getSubset(region=inst_b)
+                                      .bulkDataBlocks)
+            with phase('comparison'):
+                if field_name not in matches or not matches[
+                        field_name].valid(block_a, block_b):
+                    matches[field_name] = KeyMatch(block_a, block_b,
+                                                   node_map, element_map)
+                key_match = matches[field_name]
+                values_a = block_a.data[key_match.rows_a]
+                values_b = block_b.data[key_match.rows_b]
+                labels = list(field.componentLabels)
+                for item in items:
+                    if derived.is_derived(item):
+                        item_a = derived.evaluate([item], values_a, labels,
+                                                  field_name)
+                        item_b = derived.evaluate([item], values_b, labels,
+                                                  field_name)
+                    else:
+                        item_a, item_b = values_a, values_b
+                    passed = _compare(results[item], item_a, item_b,
+                                      key_match.labels_a, atol, rtol)
+                    if not passed and failure is None:
+                        failure = (item, frame_ind)
+            count('values_compared', 2*len(key_match.rows_a))
+        count('frames_read')
+        if failure is not None and stop_early:
+            break
+
+    report = {'passed': (failure is None
+                         and len(frames_a) == len(frames_b)),
+              'num_frames': (len(frames_a), len(frames_b)),
+              'step': [frame[0] for frame in frames_a[:len(time)]],
+              'incr': [frame[2] for frame in frames_a[:len(time)]],
+              'time': np.array(time),
+              'time_b': np.array(time_b),
+              'fields': OrderedDict(),
+              'failure': failure}
+    for item, result in results.items():
+        key_match = matches.get(_field_name(item))
+        report['fields'][item] = dict(
+            ((key, np.array(value)) for key, value in result.items()),
+            compared=0 if key_match is None else len(key_match.rows_a),
+            unmatched=0 if key_match is None else key_match.num_unmatched)
+    return report
+
+
+def format_report(report):
+    """ Format a comparison report as a few lines of text
+
+    :param report: The report, see :py:func:`compare_odbs`
+    :type report: dict
+
+    :rtype: str
+
+    """
+    lines = ['%s: %d of %d/%d frames compared'
+             % ('PASSED' if report['passed'] else 'FAILED',
+                len(report['time']), report['num_frames'][0],
+                report['num_frames'][1])]
+    for item, result in report['fields'].items():
+        if len(result['max_abs']) == 0:
+            lines.append('%s: not compared' % item)
+            continue
+        worst = int(np.argmax(result['max_abs']))
+        lines.append('%s: max abs %.3e (frame %d, label %d), max rel '
+                     '%.3e, %d failed frames, %d compared, %d unmatched'
+                     % (item, result['max_abs'][worst], worst,
+                        result['label'][worst], np.max(result['max_rel']),
+                        np.sum(~result['passed']), result['compared'],
+                        result['unmatched']))
+    if report['failure'] is not None:
+        lines.append('First failure: %s in frame %d' % report['failure'])
+    return '\n'.join(lines)
+
+
+class LabelMap(object):
+    """ Map from the labels of one odb to the labels of another
+
+    :param labels: The labels, sorted
+    :type labels: np.array
+
+    :param mapped: The mapped label of each label, -1 if not matched
+    :type mapped: np.array
+
+    """
+
+    def __init__(self, labels, mapped):
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.mapped = np.asarray(mapped, dtype=np.int64)
+
+    @classmethod
+    def from_coordinates(cls, labels_a, coords_a, labels_b, coords_b, tol):
+        """ Match points by coordinates. Points without a unique point
+        within tol are not matched.
+
+        :rtype: :py:class:`LabelMap`
+
+        """
+        inds, num_found = NodeGrid(coords_b, min_cell_size=tol).query(
+            coords_a, tol)
+        mapped = np.where(num_found == 1, np.asarray(labels_b)[inds], -1)
+        return cls(labels_a, mapped)
+
+    def __call__(self, labels):
+        """ Get the mapped labels, -1 for labels not matched
+
+        :rtype: np.array
+
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        inds = np.searchsorted(self.labels, labels)
+        inds[inds == len(self.labels)] = 0
+        return np.where(self.labels[inds] == labels, self.mapped[inds], -1)
+
+
+class KeyMatch(object):
+    """ The matching rows of bulk data of two odb files. The keys are
+    the node labels, or the element labels and integration points, of
+    the rows.
+
+    :param block_a: The bulk data of the reference odb
+    :type block_a: :py:class:`odb_scripts.frame_cache.CachedBlock`
+
+    :param block_b: The bulk data of the compared odb
+    :type block_b: :py:class:`odb_scripts.frame_cache.CachedBlock`
+
+    :param node_map: The map from node labels in a to node labels in b,
+                     None to match by label
+    :type node_map: :py:class:`LabelMap`
+
+    :param element_map: The map from element labels in a to element
+                        labels in b, None to match by label
+    :type element_map: :py:class:`LabelMap`
+
+    """
+
+    def __init__(self, block_a, block_b, node_map=None, element_map=None):
+        self.keys_a = _block_keys(block_a)
+        self.keys_b = _block_keys(block_b)
+        if block_a.elementLabels is None:
+            labels, label_map = block_a.nodeLabels, node_map
+        else:
+            labels, label_map = block_a.elementLabels, element_map
+        mapped = _block_keys(block_a, label_map)
+
+        sort_b = np.argsort(self.keys_b, kind='mergesort')
+        if len(sort_b) > 0:
+            inds = np.searchsorted(self.keys_b, mapped, sorter=sort_b)
+            inds[inds == len(sort_b)] = 0
+            found = (mapped >= 0) & (self.keys_b[sort_b[inds]] == mapped)
+        else:
+            inds = np.zeros(len(mapped), dtype=np.int64)
+            found = np.zeros(len(mapped), dtype=bool)
+        self.rows_a = np.nonzero(found)[0]
+        self.rows_b = sort_b[inds[found]]
+        self.labels_a = np.asarray(labels, dtype=np.int64)[self.rows_a]
+        self.num_unmatched = (len(self.keys_a) + len(self.keys_b)
+                              - 2*len(self.rows_a))
+
+    def valid(self, block_a, block_b):
+        """ Check if the match can be reused for other bulk data, i.e.
+        the keys are the same
+
+        :rtype: bool
+
+        """
+        return (np.array_equal(_block_keys(block_a), self.keys_a)
+                and np.array_equal(_block_keys(block_b), self.keys_b))
+
+
+def _block_keys(block, label_map=None):
+    """ Get the key of each row of merged bulk data, with the labels
+    mapped if a label map is given. Unmapped labels give negative keys.
+    """
+    if block.elementLabels is None:
+        if block.nodeLabels is None:
+            return np.zeros(0, dtype=np.int64)
+        labels = block.nodeLabels
+        if label_map is not None:
+            labels = label_map(labels)
+        return labels
+    labels = block.elementLabels
+    if label_map is not None:
+        labels = label_map(labels)
+    ips = (np.zeros(len(labels), dtype=np.int64)
+           if block.integrationPoints is None else block.integrationPoints)
+    return np.where(labels >= 0, (labels << 16) + ips, -1)
+
+
+def _field_name(item):
+    """ Get the field output name of a compared item, e.g. 'S' for 'S'
+    and 'MISES'
+    """
+    split = derived.split_derived(item)
+    return item if split is None else split[0]
+
+
+def _compare(result, values_a, values_b, labels, atol, rtol):
+    """ Compare the values of one frame, and add the errors to the
+    result
+
+    :returns: True if the values are within the tolerances
+    :rtype: bool
+
+    """
+    if values_a.size == 0:
+        max_abs, scale, label = 0.0, 0.0, -1
+    else:
+        errors = np.abs(np.asarray(values_a, dtype=np.float64) - values_b)
+        errors = errors.reshape(len(values_a), -1)
+        row = np.unravel_index(np.argmax(errors), errors.shape)[0]
+        max_abs = float(errors[row].max())
+        scale = float(np.max(np.abs(values_a)))
+        label = int(labels[row])
+    passed = max_abs <= atol + rtol*scale
+    result['max_abs'].append(max_abs)
+    result['max_rel'].append(max_abs/scale if scale > 0 else
+                             (0.0 if max_abs == 0 else np.inf))
+    result['passed'].append(passed)
+    result['label'].append(label)
+    return passed
+
+
+def _centroids(mesh_table):
+    """ Get the centroid of the nodes of each element """
+    node_inds = mesh_table.element_node_indices()
+    valid = node_inds >= 0
+    coords = mesh_table.coords[np.where(valid, node_inds, 0)]
+    coords[~valid] = 0.0
+    return (np.sum(coords, axis=1)
+            / np.sum(valid, axis=1)[:, np.newaxis].astype(np.float64))
@@ -0,0 +1,295 @@
+""" Derived quantities, e.g. von Mises stress or displacement magnitude,
+computed with numpy from the components of a field output. The raw
+components are read once, and the quantities are computed for all
+points (and frames) at once. The derived quantities can be requested
+wherever variables are accepted, e.g.
+``node_data.get_multiple_variables(odb, 'PART-1-1', pos, ['U2', 'UMAG',
+'RFMAG'], [0])``.
+
+The following variable names are supported
+
+- '<FIELD>MAG': The magnitude of a vector field, e.g. 'UMAG' or 'RFMAG'.
+  Only fields with the components <FIELD>1, <FIELD>2 and <FIELD>3 are
+  vector fields. Names of existing field outputs, e.g. 'PEMAG', are not
+  derived quantities.
+- 'MISES', 'TRESCA', 'PRESS', 'INV3', 'MAX_PRINCIPAL', 'MID_PRINCIPAL'
+  and 'MIN_PRINCIPAL': Invariants of the stress tensor (field 'S')
+- 'MAX_PRINCIPAL_DIR1' ... 'MIN_PRINCIPAL_DIR3': The components of the
+  principal directions of the stress tensor
+- '<FIELD>:<INVARIANT>': The invariants of other tensor fields, e.g.
+  'LE:MAX_PRINCIPAL'. The shear components of strain fields are
+  engineering strains, and are halved to give the tensor components.
+
+With the bulk data engine, the nodal extraction functions only read
+field outputs with values at the nodes. Quantities of element fields,
+e.g. 'MISES', are then extracted at the integration points with
+:py:func:`odb_scripts.element_data.get_multiple_elements`.
+
+The invariants follow the Abaqus definitions, e.g. PRESS = -trace/3 and
+INV3 = (27/2 det(s))^(1/3), where s is the deviatoric tensor.
+"""
+from __future__ import print_function, division
+import re
+import numpy as np
+
+
+PRINCIPALS = ('MIN_PRINCIPAL', 'MID_PRINCIPAL', 'MAX_PRINCIPAL')
+INVARIANTS = (('MISES', 'TRESCA', 'PRESS', 'INV3') + PRINCIPALS
+              + tuple(name + '_DIR' + str(i)
+                      for name in PRINCIPALS for i in (1, 2, 3)))
+
+# Fields with engineering shear strain components
+STRAIN_FIELDS = ('E', 'LE', 'NE', 'PE', 'EE', 'IE', 'THE', 'ER', 'LEP')
+
+_TENSOR_INDICES = {'11': (0, 0), '22': (1, 1), '33': (2, 2),
+                   '12': (0, 1), '13': (0, 2), '23': (1, 2)}
+
+
+def split_derived(variable, field_names=()):
+    """ Get the field output name and the quantity for a derived variable
+
+    :param variable: The variable, e.g. 'MISES', 'LE:MISES' or 'UMAG'
+    :type variable: str
+
+    :param field_names: The names of the field outputs in the odb. A
+                        variable that is the name of a field output, e.g.
+                        'PEMAG', is not a derived quantity.
+    :type field_names: list[ str ]
+
+    :returns: The field output name and the quantity, e.g. ('S', 'MISES')
+              or ('U', 'MAG'). None if variable is not a derived
+              quantity.
+    :rtype: (str, str)
+
+    """
+    if ':' in variable:
+        field_name, quantity = variable.split(':', 1)
+        if quantity in INVARIANTS:
+            return field_name, quantity
+        return None
+    if variable in field_names:
+        return None
+    if variable in INVARIANTS:
+        return 'S', variable
+    match = re.match(r'^([A-Z]+)MAG$', variable)
+    if match is not None:
+        return match.group(1), 'MAG'
+    return None
+
+
+def is_derived(variable, field_names=()):
+    """ Check if a variable is a derived quantity, see
+    :py:func:`split_derived`
+
+    :rtype: bool
+
+    """
+    return split_derived(variable, field_names) is not None
+
+
+def evaluate(variables, data, component_labels, field_name):
+    """ Evaluate components and derived quantities of one field output
+
+    :param variables: The components (e.g. 'S11') and derived quantities
+                      (e.g. 'MISES') to evaluate
+    :type variables: list[ str ]
+
+    :param data: The raw components, with the component as last axis,
+                 e.g. points x components or frames x points x
+                 components
+    :type data: np.array
+
+    :param component_labels: The label of each component in data
+    :type component_labels: list[ str ]
+
+    :param field_name: The field output name
+    :type field_name: str
+
+    :returns: The values, with the same shape as data except for the
+              last axis, which has one item per variable
+    :rtype: np.array
+
+    """
+    component_labels = list(component_labels)
+    data = np.asarray(data)
+    values = np.empty(data.shape[:-1] + (len(variables),))
+    cache = {}
+    for var_ind, variable in enumerate(variables):
+        if variable in component_labels:
+            values[..., var_ind] = data[..., component_labels.index(variable)]
+            continue
+        split = split_derived(variable)
+        if split is None or split[0] != field_name:
+            raise ValueError('Could not find "' + variable + '" in the field '
+                             + 'output ' + field_name + ' with components '
+                             + str(component_labels))
+        values[..., var_ind] = _quantity(split[1], data, component_labels,
+                                         field_name, cache)
+    return values
+
+
+def expand_variables(variables, get_component_labels):
+    """ Get the raw components required to evaluate the variables
+
+    :param variables: The variables, components and derived quantities
+    :type variables: list[ str ]
+
+    :param get_component_labels: Function giving the component labels
+                                 of a field output, called as
+                                 get_component_labels(field_name)
+    :type get_component_labels: callable
+
+    :returns: The raw components, e.g. ['U1', 'S11', 'S22', ...], see
+              :py:func:`evaluate_variables`
+    :rtype: list[ str ]
+
+    """
+    raw_variables = []
+    for variable in variables:
+        split = split_derived(variable)
+        if split is None:
+            required = [variable]
+        else:
+            required = get_component_labels(split[0])
+        raw_variables += [raw for raw in required if raw not in raw_variables]
+    return raw_variables
+
+
+def evaluate_variables(variables, raw_variables, raw_values):
+    """ Evaluate variables from raw components of several field outputs
+
+    :param variables: The variables, components and derived quantities
+    :type variables: list[ str ]
+
+    :param raw_variables: The raw components, as given by
+                          :py:func:`expand_variables`
+    :type raw_variables: list[ str ]
+
+    :param raw_values: The raw values, with the raw component as last axis
+    :type raw_values: np.array
+
+    :returns: The values, with one item per variable in the last axis
+    :rtype: np.array
+
+    """
+    raw_variables = list(raw_variables)
+    raw_fields = [re.match(r'^(\D+)\d+$', raw).group(1)
+                  for raw in raw_variables]
+    values = np.empty(raw_values.shape[:-1] + (len(variables),))
+    for var_ind, variable in enumerate(variables):
+        split = split_derived(variable)
+        if split is None:
+            values[..., var_ind] = raw_values[
+                ..., raw_variables.index(variable)]
+            continue
+        inds = [ind for ind, field in enumerate(raw_fields)
+                if field == split[0]]
+        values[..., var_ind] = evaluate(
+            [variable], raw_values[..., inds],
+            [raw_variables[ind] for ind in inds], split[0])[..., 0]
+    return values
+
+
+def _quantity(quantity, data, component_labels, field_name, cache):
+    """ Compute one derived quantity, caching the intermediate results """
+    if quantity == 'MAG':
+        vector_labels = [field_name + str(i + 1)
+                         for i in range(len(component_labels))]
+        if not 0 < len(component_labels) <= 3 or (list(component_labels)
+                                                  != vector_labels):
+            raise ValueError('The magnitude ' + field_name + 'MAG is only '
+                             + 'computed for vector fields, but the field '
+                             + 'output ' + field_name + ' has the '
+                             + 'components ' + str(list(component_labels)))
+        return magnitude(data)
+    if 'tensor' not in cache:
+        cache['tensor'] = tensor(data, component_labels, field_name)
+    tens = cache['tensor']
+    if quantity == 'MISES':
+        return mises(tens)
+    elif quantity == 'PRESS':
+        return pressure(tens)
+    elif quantity == 'INV3':
+        return third_invariant(tens)
+    elif '_DIR' in quantity:
+        if 'directions' not in cache:
+            cache['directions'] = principal_directions(tens)
+        name, direction = quantity.split('_DIR')
+        return cache['directions'][..., int(direction) - 1,
+                                   PRINCIPALS.index(name)]
+    if 'principals' not in cache:
+        cache['principals'] = principal_values(tens)
+    principals = cache['principals']
+    if quantity == 'TRESCA':
+        return principals[..., 2] - principals[..., 0]
+    return principals[..., PRINCIPALS.index(quantity)]
+
+
+def tensor(data, component_labels, field_name):
+    """ Assemble symmetric 3 x 3 tensors from the components. Missing
+    components, e.g. S13 and S23 for plane stress, are zero.
+
+    :param data: The components, with the component as last axis
+    :type data: np.array
+
+    :param component_labels: The label of each component, e.g. 'S12'
+    :type component_labels: list[ str ]
+
+    :param field_name: The field output name, used to identify strains
+    :type field_name: str
+
+    :returns: The tensors, with shape data.shape[:-1] + (3, 3)
+    :rtype: np.array
+
+    """
+    tens = np.zeros(data.shape[:-1] + (3, 3))
+    for comp_ind, label in enumerate(component_labels):
+        suffix = label[len(field_name):]
+        if suffix not in _TENSOR_INDICES:
+            raise ValueError('The component ' + label + ' of field output '
+                             + field_name + ' is not a tensor component')
+        i, j = _TENSOR_INDICES[suffix]
+        factor = 0.5 if i != j and field_name in STRAIN_FIELDS else 1.0
+        tens[..., i, j] = factor*data[..., comp_ind]
+        tens[..., j, i] = tens[..., i, j]
+    return tens
+
+
+def magnitude(data):
+    """ The magnitude of vectors, with the component as last axis """
+    return np.sqrt(np.sum(np.square(data), axis=-1))
+
+
+def pressure(tens):
+    """ The equivalent pressure stress, -trace/3 """
+    return -np.trace(tens, axis1=-2, axis2=-1)/3.0
+
+
+def deviator(tens):
+    """ The deviatoric part of tensors with shape (..., 3, 3) """
+    return tens + pressure(tens)[..., np.newaxis, np.newaxis]*np.eye(3)
+
+
+def mises(tens):
+    """ The von Mises equivalent, sqrt(3/2 s:s) """
+    dev = deviator(tens)
+    return np.sqrt(1.5*np.sum(dev*dev, axis=(-2, -1)))
+
+
+def third_invariant(tens):
+    """ The third deviatoric invariant, (27/2 det(s))^(1/3) """
+    cube = 13.5*np.linalg.det(deviator(tens))
+    return np.sign(cube)*np.abs(cube)**(1.0/3)
+
+
+def principal_values(tens):
+    """ The principal values, in ascending order (min, mid, max) """
+    return np.linalg.eigvalsh(tens)
+
+
+def principal_directions(tens):
+    """ The principal directions, as columns in ascending order of the
+    principal values, i.e. [..., :, 2] is the direction of the maximum
+    principal value
+    """
+    return np.linalg.eigh(tens)[1]
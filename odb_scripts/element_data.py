@@ -0,0 +1,338 @@
+""" Extraction of integration point results for many elements at once,
+reading the field output bulk data directly. No session or xy data
+objects are created, such that this module can be used when running
+``abaqus python`` without the CAE kernel.
+"""
+from __future__ import print_function, division
+import numpy as np
+
+from odb_scripts.bulk_data import (get_active_frames, get_component_indices,
+                                   NodeSelector, label_set_name)
+from odb_scripts.mesh_table import get_mesh_table
+from odb_scripts.odb_pool import get_odb
+from odb_scripts import derived
+from odb_scripts.instrumentation import instrumented, phase, count
+
+
+@instrumented
+def get_multiple_elements(odb, inst_name, elements, quantity, components,
+                          step_numbers, increments=['0:-1'], ips=None,
+                          section_point=None):
+    """ Get given components of a quantity at the integration points of
+    given elements, for specified steps and increments. All elements
+    are read in one pass over the frames.
+
+    :param odb: The odb object to extract results from, or the path to
+                the odb file, see :py:mod:`odb_scripts.odb_pool`
+    :type odb: Odb object (Abaqus) or str
+
+    :param inst_name: The name of the instance to get results for
+    :type inst_name: str
+
+    :param elements: Element labels where results will be extracted.
+                     Alternatively, name of set in odb instance
+                     containing the elements from which results shall
+                     be extracted.
+    :type elements: list[ int ] or str
+
+    :param quantity: The quantity that is requested, e.g. stress ('S')
+    :type quantity: str
+
+    :param components: List of components to extract data for, e.g.
+                       ['S11', 'S22', 'S12']. Derived quantities, e.g.
+                       'MISES', are computed from all components, see
+                       :py:mod:`odb_scripts.derived`.
+    :type components: list[ str ]
+
+    :param step_numbers: List of step numbers from which to extract results
+    :type step_numbers: list[ int ]
+
+    :param increments: List of increments from which to extract results.
+                       ['0:-1'] implies all increments.
+                       Note that python negative numbering can be used,
+                       such that -1 implies last increment. Opposed to
+                       python lists, the last given index is included.
+    :type increments: list[ int ]
+
+    :param ips: The integration point numbers to extract results for.
+                If None, all integration points of the first element
+                in the first frame are used.
+    :type ips: list[ int ]
+
+    :param section_point: The section point number, for shell and beam
+                          elements with values at several section
+                          points. If None, the values must be unique
+                          for each element and integration point.
+    :type section_point: int
+
+    :returns: Dictionary describing the results with fields
+
+              - "step"
+              - "incr"
+              - "time"
+              - "element": The element labels
+              - "ip": The integration point numbers
+              - "components": The component names
+              - "values": Array with dimensions frames x elements x
+                integration points x components
+
+    :rtype: dict
+
+    """
+    odb = get_odb(odb)
+    odb_inst = odb.rootAssembly.instances[inst_name]
+    with phase('element_lookup'):
+        if isinstance(elements, (str, type(u''))):
+            region = odb_inst.elementSets[elements]
+            mesh_table = get_mesh_table(odb, inst_name)
+            element_labels = mesh_table.element_set_labels(elements)
+        else:
+            element_labels = np.asarray(elements, dtype=np.int64)
+            region = get_element_label_region(odb, inst_name,
+                                              element_labels)
+    if len(element_labels) == 0:
+        raise ValueError('No elements to extract ' + quantity + ' for: '
+                         + ('The element set "' + elements + '" in the '
+                            + 'instance ' + inst_name + ' is empty'
+                            if isinstance(elements, (str, type(u'')))
+                            else 'The element labels are empty'))
+
+    frames = get_active_frames(odb, step_numbers, increments)
+
+    if ips is None:
+        step_ind, step, frame_num = frames[0]
+        field = step.frames[frame_num].fieldOutputs[quantity]
+        ips = get_integration_points(field.getSubset(region=region),
+                                     element_labels[0])
+
+    values = np.empty((len(frames), len(element_labels), len(ips),
+                       len(components)))
+    time = np.empty(len(frames))
+    selector = IntegrationPointSelector(element_labels, ips, section_point)
+    for frame_ind, (step_ind, step, frame_num) in enumerate(frames):
+        with phase('field_read'):
+            frame = step.frames[frame_num]
+            time[frame_ind] = step.totalTime + frame.frameValue
+            field = frame.fieldOutputs[quantity]
+            blocks = field.getSubset(region=region).bulkDataBlocks
+            frame_values = values[frame_ind].reshape(-1, len(components))
+            if any(derived.is_derived(comp, [quantity])
+                   for comp in components):
+                labels = list(field.componentLabels)
+                raw = np.empty((len(frame_values), len(labels)))
+                selector.fill(blocks, list(range(len(labels))), raw)
+                with phase('derived'):
+                    frame_values[:] = derived.evaluate(components, raw,
+                                                       labels, quantity)
+            else:
+                comp_inds = get_component_indices(field, components)
+                selector.fill(blocks, comp_inds, frame_values)
+            count('bulk_blocks_read', len(blocks))
+        count('frames_read')
+    count('bytes_produced', values.nbytes)
+
+    return {'step': [frame[0] for frame in frames],
+            'incr': [frame[2] for frame in frames],
+            'time': time,
+            'element': element_labels,
+            'ip': np.asarray(ips),
+            'components': list(components),
+            'values': values}
+
+
+def get_element_label_region(odb, inst_name, element_labels):
+    """ Get an element set containing the given elements, such that only
+    the values of these elements are read from the field outputs. The
+    created element sets are named after their elements, and are reused
+    by later calls for the same elements, as for the node sets of
+    :py:func:`odb_scripts.bulk_data.get_label_region`.
+
+    :param odb: The odb object
+    :type odb: Odb object (Abaqus)
+
+    :param inst_name: The name of the instance
+    :type inst_name: str
+
+    :param element_labels: The element labels
+    :type element_labels: list[ int ]
+
+    :returns: The region, the instance if no labels are given
+    :rtype: OdbSet or OdbInstance object (Abaqus)
+
+    """
+    odb_inst = odb.rootAssembly.instances[inst_name]
+    element_labels = np.unique(np.asarray(element_labels, dtype=np.int64))
+    if len(element_labels) == 0:
+        return odb_inst
+    set_name = label_set_name(element_labels)
+    if set_name not in odb_inst.elementSets.keys():
+        odb_inst.ElementSetFromElementLabels(
+            name=set_name, elementLabels=tuple(int(label)
+                                               for label in element_labels))
+        count('element_sets_created')
+    return odb_inst.elementSets[set_name]
+
+
+def get_integration_points(field, element_label):
+    """ Get the integration point numbers available for an element
+
+    :param field: The field output (or subset) containing the element
+    :type field: FieldOutput object (Abaqus)
+
+    :param element_label: The element label
+    :type element_label: int
+
+    :returns: The integration point numbers
+    :rtype: list[ int ]
+
+    """
+    for block in field.bulkDataBlocks:
+        if block.elementLabels is None or block.integrationPoints is None:
+            continue
+        rows = np.asarray(block.elementLabels) == element_label
+        if np.any(rows):
+            return sorted(set(np.asarray(block.integrationPoints)[rows]
+                              .tolist()))
+    raise ValueError('Could not find integration points for element '
+                     + str(element_label) + ' in field output '
+                     + field.name)
+
+
+def get_element_points(field, section_point=None):
+    """ Get the elements and integration points with values in a field
+    output, e.g. for mixed meshes where the elements have different
+    integration points, or instances with elements without the field
+    output
+
+    :param field: The field output (or subset)
+    :type field: FieldOutput object (Abaqus)
+
+    :param section_point: The section point number to get the points
+                          for. If None, the field output must not have
+                          values at several section points.
+    :type section_point: int
+
+    :returns: The element label and integration point number of each
+              point, sorted by element and integration point
+    :rtype: (np.array, np.array)
+
+    """
+    keys = []
+    section_points = set()
+    for block in field.bulkDataBlocks:
+        if block.elementLabels is None or block.integrationPoints is None:
+            continue
+        block_section_point = get_section_point(block)
+        if section_point is not None and block_section_point != section_point:
+            continue
+        section_points.add(block_section_point)
+        keys.append(_ip_keys(np.asarray(block.elementLabels, dtype=np.int64),
+                             np.asarray(block.integrationPoints,
+                                        dtype=np.int64)))
+    if len(section_points) > 1:
+        raise ValueError('The field output ' + field.name + ' has values '
+                         + 'at the section points '
+                         + str(sorted(number for number in section_points
+                                      if number is not None))
+                         + '. Select one section point with section_point.')
+    if len(keys) == 0:
+        raise ValueError('The field output ' + field.name + ' has no '
+                         + 'values at integration points'
+                         + ('' if section_point is None else
+                            ' at the section point ' + str(section_point)))
+    keys = np.unique(np.concatenate(keys))
+    return keys >> 16, keys & 0xFFFF
+
+
+class IntegrationPointSelector(NodeSelector):
+    """ Copy the values for given elements and integration points from
+    bulk data blocks. The output rows are ordered by element, and then
+    by integration point.
+
+    :param element_labels: The labels of the elements to select
+    :type element_labels: list[ int ]
+
+    :param ips: The integration point numbers to select
+    :type ips: list[ int ]
+
+    :param section_point: The section point number to select. If None,
+                          the values of all blocks are used, and an
+                          element and integration point found at
+                          several section points raises a ValueError.
+    :type section_point: int
+
+    """
+
+    def __init__(self, element_labels, ips, section_point=None):
+        element_labels = np.asarray(element_labels, dtype=np.int64)
+        ips = np.asarray(ips, dtype=np.int64)
+        keys = _ip_keys(element_labels[:, np.newaxis], ips[np.newaxis, :])
+        NodeSelector.__init__(self, keys.ravel())
+        self.section_point = section_point
+
+    @classmethod
+    def from_points(cls, element_labels, ips, section_point=None):
+        """ Create a selector for given points, e.g. from
+        :py:func:`get_element_points`
+
+        :param element_labels: The element label of each point
+        :type element_labels: list[ int ]
+
+        :param ips: The integration point number of each point
+        :type ips: list[ int ]
+
+        :param section_point: The section point number to select
+        :type section_point: int
+
+        :rtype: :py:class:`IntegrationPointSelector`
+
+        """
+        selector = cls([], [], section_point)
+        selector.keys = _ip_keys(np.asarray(element_labels, dtype=np.int64),
+                                 np.asarray(ips, dtype=np.int64))
+        return selector
+
+    def _block_keys(self, block):
+        if block.elementLabels is None or block.integrationPoints is None:
+            return np.zeros(0, dtype=np.int64)
+        if (self.section_point is not None
+                and get_section_point(block) != self.section_point):
+            return np.zeros(0, dtype=np.int64)
+        return _ip_keys(np.asarray(block.elementLabels, dtype=np.int64),
+                        np.asarray(block.integrationPoints, dtype=np.int64))
+
+    def _describe(self, keys):
+        return ('(element, integration point) '
+                + str(list(zip((keys >> 16).tolist(),
+                               (keys & 0xFFFF).tolist()))))
+
+    def _raise_duplicates(self, keys):
+        raise ValueError('Found the ' + self._describe(np.unique(keys))
+                         + ' more than once in the field output, e.g. at '
+                         + 'several section points of shell or beam '
+                         + 'elements. Select one section point with '
+                         + 'section_point.')
+
+
+def get_section_point(block):
+    """ Get the section point number of a bulk data block
+
+    :param block: The bulk data block
+    :type block: FieldBulkData object (Abaqus)
+
+    :returns: The section point number, None for blocks without section
+              points
+    :rtype: int
+
+    """
+    section_point = getattr(block, 'sectionPoint', None)
+    if section_point is None:
+        return None
+    return section_point.number
+
+
+def _ip_keys(element_labels, ips):
+    """ Combine element labels and integration point numbers into one
+    integer key
+    """
+    return (element_labels << 16) + ips
@@ -0,0 +1,243 @@
+""" Dump a complete field output, e.g. U at all nodes or S at all
+integration points, for many frames to raw binary files on disk. The
+values are written frame by frame into a preallocated memory mapped
+array, such that the dump never needs to fit in memory. A small json
+header describes the layout, and the dump can be opened without Abaqus
+using :py:mod:`odb_scripts.field_reader`.
+
+The dump directory contains
+
+- header.json: The layout, frames (step, increment and time) and
+  components, see :py:func:`dump_field`
+- values.bin: The values, frames x points x components, C order
+- labels.bin: The node label (nodal fields) or element label
+  (integration point fields) of each point
+- ip.bin: The integration point number of each point (integration point
+  fields only)
+- coords.bin: The node coordinates, points x 3 (nodal fields only)
+
+Command line usage::
+
+    abaqus python -m odb_scripts.field_dump job.odb PART-1-1 U out_dir
+"""
+from __future__ import print_function, division
+import os
+import sys
+import json
+import argparse
+import importlib
+import numpy as np
+
+from odb_scripts.mesh_table import get_mesh_table
+from odb_scripts.bulk_data import (get_active_frames, get_component_indices,
+                                   NodeSelector)
+from odb_scripts.element_data import (get_element_points,
+                                      IntegrationPointSelector)
+from odb_scripts.field_reader import HEADER_FILE, FORMAT_VERSION
+from odb_scripts.instrumentation import instrumented, phase, count
+
+
+@instrumented
+def dump_field(odb, inst_name, field_name, directory, step_numbers,
+               increments=['0:-1'], region=None, components=None,
+               dtype='float32', section_point=None):
+    """ Dump a field output for all points of an instance (or set) and
+    for the given steps and increments to a directory
+
+    :param odb: The odb object to extract results from
+    :type odb: Odb object (Abaqus)
+
+    :param inst_name: The name of the instance to dump results for
+    :type inst_name: str
+
+    :param field_name: The field output to dump, e.g. 'U' or 'S'
+    :type field_name: str
+
+    :param directory: The directory to write to, created if needed.
+                      Existing dump files are overwritten.
+    :type directory: str
+
+    :param step_numbers: List of step numbers from which to dump results
+    :type step_numbers: list[ int ]
+
+    :param increments: List of increments from which to dump results.
+                       ['0:-1'] implies all increments. Opposed to
+                       python lists, the last given index is included.
+    :type increments: list[ int ]
+
+    :param region: Name of a node set (nodal fields) or element set
+                   (integration point fields) to dump. If None, all
+                   nodes or elements of the instance are dumped.
+    :type region: str
+
+    :param components: The components to dump, e.g. ['S11', 'S22']. If
+                       None, all components of the field are dumped.
+    :type components: list[ str ]
+
+    :param dtype: The data type of the dumped values. The odb stores
+                  single precision values.
+    :type dtype: str
+
+    :param section_point: The section point number to dump, for shell
+                          and beam elements with values at several
+                          section points
+    :type section_point: int
+
+    :returns: The header, as written to header.json
+    :rtype: dict
+
+    """
+    odb_inst = odb.rootAssembly.instances[inst_name]
+    frames = get_active_frames(odb, step_numbers, increments)
+    if len(frames) == 0:
+        raise ValueError('No frames selected')
+
+    step_ind, step, frame_num = frames[0]
+    field = step.frames[frame_num].fieldOutputs[field_name]
+    all_components = list(field.componentLabels)
+    if len(all_components) == 0:  # Scalar field
+        all_components = [field_name]
+    if components is None:
+        components = all_components
+    components = list(components)
+
+    with phase('point_lookup'):
+        mesh_table = get_mesh_table(odb, inst_name)
+        nodal = _is_nodal(field.getSubset(region=odb_inst))
+        if nodal:
+            if region is None:
+                labels = mesh_table.labels
+                odb_region = odb_inst
+            else:
+                labels = mesh_table.node_set_labels(region)
+                odb_region = odb_inst.nodeSets[region]
+            labels = np.sort(labels)
+            selector = NodeSelector(labels)
+            arrays = {'labels': labels,
+                      'coords': mesh_table.coordinates(labels)}
+        else:
+            # The points are taken from the values, as the elements
+            # can have different integration points (mixed meshes), or
+            # no values (e.g. springs)
+            if region is None:
+                odb_region = odb_inst
+            else:
+                odb_region = odb_inst.elementSets[region]
+            if region is not None and len(
+                    mesh_table.element_set_labels(region)) == 0:
+                point_labels = ips = np.zeros(0, dtype=np.int64)
+            else:
+                point_labels, ips = get_element_points(
+                    field.getSubset(region=odb_region), section_point)
+            selector = IntegrationPointSelector.from_points(
+                point_labels, ips, section_point)
+            arrays = {'labels': point_labels, 'ip': ips}
+    if len(selector.keys) == 0:
+        raise ValueError('The region ' + str(region) + ' of the instance '
+                         + inst_name + ' has no values of the field '
+                         + 'output ' + field_name)
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    header_file = os.path.join(directory, HEADER_FILE)
+    if os.path.exists(header_file):  # Mark an old dump as invalid
+        os.remove(header_file)
+
+    shape = (len(frames), len(selector.keys), len(components))
+    values = np.memmap(os.path.join(directory, 'values.bin'), dtype=dtype,
+                       mode='w+', shape=shape)
+    time = np.empty(len(frames))
+    for frame_ind, (step_ind, step, frame_num) in enumerate(frames):
+        with phase('field_read'):
+            frame = step.frames[frame_num]
+            time[frame_ind] = step.totalTime + frame.frameValue
+            field = frame.fieldOutputs[field_name]
+            if len(field.componentLabels) == 0:
+                comp_inds = [0]
+            else:
+                comp_inds = get_component_indices(field, components)
+            blocks = field.getSubset(region=odb_region).bulkDataBlocks
+            selector.fill(blocks, comp_inds, values[frame_ind])
+            count('bulk_blocks_read', len(blocks))
+        count('frames_read')
+    with phase('write'):
+        values.flush()
+        del values
+        count('bytes_produced', int(np.prod(shape))*np.dtype(dtype).itemsize)
+
+        header = {'format_version': FORMAT_VERSION,
+                  'odb': getattr(odb, 'path', odb.name),
+                  'instance': inst_name,
+                  'field': field_name,
+                  'position': 'nodal' if nodal else 'integration_point',
+                  'region': region,
+                  'section_point': section_point,
+                  'components': components,
+                  'step': [frame[0] for frame in frames],
+                  'incr': [frame[2] for frame in frames],
+                  'time': time.tolist(),
+                  'arrays': {'values': _array_spec('values.bin', dtype,
+                                                   shape)}}
+        for name, array in arrays.items():
+            header['arrays'][name] = _array_spec(name + '.bin', array.dtype,
+                                                 array.shape)
+            array.tofile(os.path.join(directory, name + '.bin'))
+
+        # The header is written last, such that an interrupted dump has
+        # no header and cannot be opened
+        with open(header_file + '.tmp', 'w') as fid:
+            json.dump(header, fid, indent=1)
+        if os.path.exists(header_file):
+            os.remove(header_file)
+        os.rename(header_file + '.tmp', header_file)
+
+    return header
+
+
+def _is_nodal(field):
+    """ Check if the values of a field output are given at the nodes """
+    for block in field.bulkDataBlocks:
+        return block.elementLabels is None
+    raise ValueError('The field output ' + field.name + ' has no values')
+
+
+def _array_spec(file_name, dtype, shape):
+    """ Describe a raw binary array file in the header """
+    return {'file': file_name, 'dtype': np.dtype(dtype).str,
+            'shape': [int(n) for n in shape]}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Dump a field output to memory mapped binary files')
+    parser.add_argument('odb_path', help='the odb file')
+    parser.add_argument('inst_name', help='the instance name')
+    parser.add_argument('field_name', help='the field output, e.g. U')
+    parser.add_argument('directory', help='the output directory')
+    parser.add_argument('-s', '--steps', type=int, nargs='+', default=[0],
+                        help='step numbers (default 0)')
+    parser.add_argument('-i', '--increments', nargs='+', default=['0:-1'],
+                        help='increments (default all)')
+    parser.add_argument('--region', help='node or element set name')
+    parser.add_argument('--dtype', default='float32')
+    parser.add_argument('--section-point', type=int, default=None,
+                        help='section point number, e.g. for shells')
+    parser.add_argument('--odb-module', default='odbAccess',
+                        help='module providing openOdb')
+    args = parser.parse_args(args)
+
+    increments = [int(incr) if ':' not in incr else incr
+                  for incr in args.increments]
+    open_odb = importlib.import_module(args.odb_module).openOdb
+    odb = open_odb(args.odb_path, readOnly=True)
+    try:
+        dump_field(odb, args.inst_name, args.field_name, args.directory,
+                   args.steps, increments, region=args.region,
+                   dtype=args.dtype, section_point=args.section_point)
+    finally:
+        odb.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
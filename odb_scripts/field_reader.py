@@ -0,0 +1,163 @@
+""" Reader for field dumps written by :py:mod:`odb_scripts.field_dump`.
+This module only depends on numpy, and is intended to be used outside
+Abaqus, e.g. to train surrogate models on the dumped fields. The arrays
+are memory mapped, such that slicing frames or points only reads the
+requested parts from disk::
+
+    from odb_scripts.field_reader import FieldDump
+    dump = FieldDump('out_dir')
+    u_last = dump.values[-1]                      # points x components
+    u_node = dump.values[:, dump.indices([17])]   # frames x 1 x components
+"""
+from __future__ import print_function, division
+import os
+import json
+import numpy as np
+
+
+HEADER_FILE = 'header.json'
+FORMAT_VERSION = 1
+
+
+class FieldDump(object):
+    """ A field dump, opened without copying the arrays into memory
+
+    :param directory: The dump directory
+    :type directory: str
+
+    :param mode: The memory map mode, 'r' (read only), 'r+' (read and
+                 write) or 'c' (copy on write), see :py:class:`numpy.memmap`
+    :type mode: str
+
+    """
+
+    def __init__(self, directory, mode='r'):
+        self.directory = directory
+        self.mode = mode
+        header_file = os.path.join(directory, HEADER_FILE)
+        if not os.path.exists(header_file):
+            raise IOError('No field dump header in "' + directory + '", '
+                          + 'the dump is missing or incomplete')
+        with open(header_file, 'r') as fid:
+            self.header = json.load(fid)
+        if self.header['format_version'] > FORMAT_VERSION:
+            raise IOError('The field dump format version '
+                          + str(self.header['format_version'])
+                          + ' is not supported, upgrade odb_scripts')
+        self._arrays = {}
+
+    @property
+    def field(self):
+        """ The name of the field output, e.g. 'U' """
+        return self.header['field']
+
+    @property
+    def position(self):
+        """ 'nodal' or 'integration_point' """
+        return self.header['position']
+
+    @property
+    def components(self):
+        """ The component names, e.g. ['U1', 'U2', 'U3'] """
+        return self.header['components']
+
+    @property
+    def step(self):
+        """ The step index of each frame """
+        return np.array(self.header['step'], dtype=np.int64)
+
+    @property
+    def incr(self):
+        """ The increment (frame number) of each frame """
+        return np.array(self.header['incr'], dtype=np.int64)
+
+    @property
+    def time(self):
+        """ The total time of each frame """
+        return np.array(self.header['time'])
+
+    @property
+    def values(self):
+        """ The values, frames x points x components """
+        return self.array('values')
+
+    @property
+    def labels(self):
+        """ The node label (nodal fields) or element label (integration
+        point fields) of each point, sorted
+        """
+        return self.array('labels')
+
+    @property
+    def ip(self):
+        """ The integration point number of each point """
+        return self.array('ip')
+
+    @property
+    def coords(self):
+        """ The node coordinates, points x 3 """
+        return self.array('coords')
+
+    def array(self, name):
+        """ Get a memory mapped array from the dump
+
+        :param name: The array name, e.g. 'values' or 'labels'
+        :type name: str
+
+        :rtype: np.memmap
+
+        """
+        if name not in self._arrays:
+            arrays = self.header['arrays']
+            if name not in arrays:
+                raise KeyError('The field dump has no array "' + name
+                               + '", available arrays are '
+                               + str(sorted(arrays)))
+            spec = arrays[name]
+            self._arrays[name] = np.memmap(
+                os.path.join(self.directory, spec['file']),
+                dtype=np.dtype(spec['dtype']), mode=self.mode,
+                shape=tuple(spec['shape']))
+        return self._arrays[name]
+
+    def indices(self, labels):
+        """ Get the point indices for node labels (nodal fields) or
+        element labels (integration point fields, all integration points
+        of each element in order)
+
+        :param labels: The node or element labels
+        :type labels: list[ int ]
+
+        :returns: The point indices, e.g. for dump.values[:, indices]
+        :rtype: np.array
+
+        """
+        labels = np.asarray(labels, dtype=np.int64).ravel()
+        all_labels = self.labels
+        start = np.searchsorted(all_labels, labels, side='left')
+        stop = np.searchsorted(all_labels, labels, side='right')
+        missing = start == stop
+        if np.any(missing):
+            raise ValueError('Labels not in the field dump: '
+                             + str(labels[missing].tolist()))
+        counts = stop - start
+        offsets = np.repeat(start - np.cumsum(counts) + counts, counts)
+        return np.arange(np.sum(counts)) + offsets
+
+    def frame_index(self, step, incr):
+        """ Get the frame index for a step index and increment
+
+        :param step: The step index
+        :type step: int
+
+        :param incr: The increment (frame number) in the step
+        :type incr: int
+
+        :rtype: int
+
+        """
+        matches = np.nonzero((self.step == step) & (self.incr == incr))[0]
+        if len(matches) == 0:
+            raise ValueError('Step ' + str(step) + ', increment '
+                             + str(incr) + ' not in the field dump')
+        return int(matches[0])
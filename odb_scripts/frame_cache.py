@@ -0,0 +1,233 @@
+""" In-process cache of field output bulk data for single frames, shared
+by all extraction calls. Interactive sessions often repeat extractions
+for the same frames and variables with different nodes, and with the
+cache enabled, such repeated calls only index numpy arrays instead of
+reading the field output from the odb again.
+
+The cache is disabled by default, and is enabled by giving it a memory
+budget::
+
+    from odb_scripts import frame_cache, node_data
+    frame_cache.default_cache.max_bytes = 2*1024**3
+    data = node_data.get_multiple_positions(odb, ..., engine='bulk')
+    print(frame_cache.default_cache.stats())
+
+The values of one field output in one frame are cached for the region
+that was read, i.e. for the instance when nodes are given by
+coordinates and for the node set otherwise. All components are kept as
+one array, such that different variables of the same field output share
+the entry. The least recently used entries are removed when the budget
+is exceeded.
+"""
+from __future__ import print_function, division
+from collections import OrderedDict
+import numpy as np
+
+from odb_scripts.instrumentation import count
+
+
+class CachedBlock(object):
+    """ The bulk data blocks of a field output subset merged into one
+    block, with the same attributes as the FieldBulkData object
+    (Abaqus) used by the extraction functions
+
+    :param blocks: The bulk data blocks
+    :type blocks: list[ FieldBulkData object (Abaqus) ]
+
+    """
+
+    def __init__(self, blocks):
+        blocks = list(blocks)
+
+        def merge(name, dtype=None):
+            arrays = [getattr(block, name) for block in blocks]
+            if len(arrays) == 0 or any(array is None for array in arrays):
+                return None
+            return np.concatenate([np.asarray(array, dtype=dtype)
+                                   for array in arrays])
+
+        self.nodeLabels = merge('nodeLabels', np.int64)
+        self.elementLabels = merge('elementLabels', np.int64)
+        self.integrationPoints = merge('integrationPoints', np.int64)
+        self.data = merge('data')
+        if self.data is None:
+            self.data = np.zeros((0, 0), dtype=np.float32)
+        self.componentLabels = (tuple(blocks[0].componentLabels)
+                                if len(blocks) > 0 else ())
+
+    @property
+    def nbytes(self):
+        """ The memory used by the arrays of the block
+
+        :rtype: int
+
+        """
+        return sum(array.nbytes for array in (self.nodeLabels,
+                                              self.elementLabels,
+                                              self.integrationPoints,
+                                              self.data)
+                   if array is not None)
+
+
+class FrameCache(object):
+    """ Least recently used cache of field output values per frame
+
+    :param max_bytes: The memory budget. Entries larger than the budget
+                      are not cached. 0 disables the cache.
+    :type max_bytes: int
+
+    """
+
+    def __init__(self, max_bytes=0):
+        self.max_bytes = max_bytes
+        self._blocks = OrderedDict()
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @property
+    def enabled(self):
+        """ True if the cache has a memory budget
+
+        :rtype: bool
+
+        """
+        return self.max_bytes > 0
+
+    def get_blocks(self, key, field, region):
+        """ Get the bulk data of a field output subset from the cache,
+        reading and caching it if missing
+
+        :param key: Key identifying the odb, region, frame and field
+                    output, see :py:func:`frame_key`
+        :type key: tuple
+
+        :param field: The field output, read if the key is missing
+        :type field: FieldOutput object (Abaqus)
+
+        :param region: The region to get the subset for
+        :type region: OdbInstance or OdbSet object (Abaqus)
+
+        :returns: The bulk data, as a list with one merged block
+        :rtype: list[ :py:class:`CachedBlock` ]
+
+        """
+        if key in self._blocks:
+            self._stats['hits'] += 1
+            count('frame_cache_hits')
+            block = self._blocks.pop(key)
+            self._blocks[key] = block  # Most recently used last
+            return [block]
+
+        self._stats['misses'] += 1
+        count('frame_cache_misses')
+        block = CachedBlock(field.getSubset(region=region).bulkDataBlocks)
+        self._share_labels(key, block)
+        if block.nbytes <= self.max_bytes:
+            self._blocks[key] = block
+            self._bytes += block.nbytes
+            self._evict()
+        return [block]
+
+    def clear(self, odb_name=None):
+        """ Remove the entries of one odb, or all entries
+
+        :param odb_name: The name of the odb (the path of the odb file).
+                         If None, all entries are removed.
+        :type odb_name: str
+
+        """
+        for key in list(self._blocks):
+            if odb_name is None or key[0] == odb_name:
+                self._bytes -= self._blocks.pop(key).nbytes
+
+    def memory(self):
+        """ Get the memory used by the cached arrays
+
+        :rtype: int
+
+        """
+        return self._bytes
+
+    def stats(self):
+        """ Get the cache statistics
+
+        :returns: The number of hits, misses and evictions, the number
+                  of entries and their memory
+        :rtype: dict
+
+        """
+        return dict(self._stats, entries=len(self._blocks),
+                    bytes=self.memory())
+
+    def reset_stats(self):
+        """ Set the hit, miss and eviction counts to zero """
+        for key in self._stats:
+            self._stats[key] = 0
+
+    def _share_labels(self, key, block):
+        """ Reuse the label arrays of the most recent entry for the same
+        region and field output if the labels are equal, such that the
+        node selectors can reuse their mapping without comparing labels
+        """
+        for other_key in reversed(self._blocks):
+            if other_key[:2] + other_key[4:] == key[:2] + key[4:]:
+                other = self._blocks[other_key]
+                for name in ('nodeLabels', 'elementLabels'):
+                    labels = getattr(block, name)
+                    other_labels = getattr(other, name)
+                    if (labels is not None and other_labels is not None
+                            and np.array_equal(labels, other_labels)):
+                        setattr(block, name, other_labels)
+                return
+
+    def _evict(self):
+        """ Remove the least recently used entries until the budget is
+        respected
+        """
+        while self._bytes > self.max_bytes and len(self._blocks) > 0:
+            self._stats['evictions'] += 1
+            self._bytes -= self._blocks.popitem(last=False)[1].nbytes
+
+
+default_cache = FrameCache()
+
+
+def region_key(odb, inst_name, set_name=None):
+    """ Get the key identifying a region in the cache
+
+    :param odb: The odb object
+    :type odb: Odb object (Abaqus)
+
+    :param inst_name: The name of the instance
+    :type inst_name: str
+
+    :param set_name: The name of the node set in the instance, None for
+                     the whole instance
+    :type set_name: str
+
+    :rtype: tuple
+
+    """
+    return (odb.name, (inst_name, set_name))
+
+
+def frame_key(region, step, frame_num, field_name):
+    """ Get the key identifying the values of a field output for a region
+    in a frame
+
+    :param region: The region key, see :py:func:`region_key`
+    :type region: tuple
+
+    :param step: The step
+    :type step: OdbStep object (Abaqus)
+
+    :param frame_num: The frame number in the step
+    :type frame_num: int
+
+    :param field_name: The field output name
+    :type field_name: str
+
+    :rtype: tuple
+
+    """
+    return region + (step.name, frame_num, field_name)
@@ -0,0 +1,175 @@
+""" Opt-in timing and counters for the extraction functions. When
+enabled, each call to an instrumented function produces a report with
+the total wall time, the time spent in each phase (e.g. node lookup,
+frame selection and field reading) and counters (e.g. number of frames
+and bytes produced). When disabled, the overhead is one dictionary
+lookup per phase.
+
+Usage::
+
+    from odb_scripts import instrumentation
+    instrumentation.enable(log=True)
+    data = node_data.get_multiple_positions(odb, ...)
+    print(instrumentation.format_report(instrumentation.get_reports()[-1]))
+
+Nested calls to instrumented functions are included in the report of
+the outermost call. The time of a phase excludes the time of the phases
+nested in it, such that the phase times add up to at most the wall time.
+"""
+from __future__ import print_function, division
+import logging
+import functools
+from timeit import default_timer
+
+
+logger = logging.getLogger('odb_scripts.instrumentation')
+
+_settings = {'enabled': False, 'log': False, 'max_reports': 1000}
+_reports = []
+_active = []
+_phases = []
+
+
+def enable(log=False, max_reports=1000):
+    """ Enable instrumentation
+
+    :param log: Should each report be logged (level INFO) to the logger
+                'odb_scripts.instrumentation'?
+    :type log: bool
+
+    :param max_reports: The number of reports to keep, older reports are
+                        discarded. If 0, no reports are kept (e.g. to
+                        only log them).
+    :type max_reports: int
+
+    """
+    _settings['enabled'] = True
+    _settings['log'] = log
+    _settings['max_reports'] = max_reports
+
+
+def disable():
+    """ Disable instrumentation """
+    _settings['enabled'] = False
+
+
+def get_reports():
+    """ Get the reports of the instrumented calls. Each report is a dict
+    with the items 'function', 'wall_time', 'phases' (dict of phase name
+    to time in seconds) and 'counts' (dict of counter name to value).
+
+    :returns: The reports, the latest last
+    :rtype: list[ dict ]
+
+    """
+    return list(_reports)
+
+
+def clear():
+    """ Remove all reports """
+    del _reports[:]
+
+
+def format_report(report):
+    """ Format a report as a single line
+
+    :param report: The report, see :py:func:`get_reports`
+    :type report: dict
+
+    :rtype: str
+
+    """
+    items = ['%s: %.3f s' % (report['function'], report['wall_time'])]
+    items += ['%s=%.3f s' % item for item in sorted(report['phases'].items())]
+    items += ['%s=%d' % item for item in sorted(report['counts'].items())]
+    return ', '.join(items)
+
+
+def instrumented(function):
+    """ Decorator creating a report for each call to function when the
+    instrumentation is enabled
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _settings['enabled'] or len(_active) > 0:
+            return function(*args, **kwargs)
+
+        report = {'function': function.__name__, 'phases': {}, 'counts': {}}
+        _active.append(report)
+        start = default_timer()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            report['wall_time'] = default_timer() - start
+            _active.pop()
+            _reports.append(report)
+            if _settings['max_reports'] > 0:
+                del _reports[:-_settings['max_reports']]
+            else:
+                del _reports[:]
+            if _settings['log']:
+                logger.info(format_report(report))
+
+    return wrapper
+
+
+def phase(name):
+    """ Get a context manager timing a phase of the current instrumented
+    call. The time is added to earlier time for the same phase. The time
+    spent in phases nested in this phase is only added to those phases.
+
+    :param name: The name of the phase
+    :type name: str
+
+    :rtype: context manager
+
+    """
+    if len(_active) == 0:
+        return _null_phase
+    return _Phase(_active[-1], name)
+
+
+def count(name, value=1):
+    """ Add to a counter of the current instrumented call
+
+    :param name: The name of the counter
+    :type name: str
+
+    :param value: The value to add
+    :type value: int
+
+    """
+    if len(_active) > 0:
+        counts = _active[-1]['counts']
+        counts[name] = counts.get(name, 0) + value
+
+
+class _Phase(object):
+    def __init__(self, report, name):
+        self.report = report
+        self.name = name
+
+    def __enter__(self):
+        self.nested_time = 0.0
+        self.start = default_timer()
+        _phases.append(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = default_timer() - self.start
+        _phases.pop()
+        if len(_phases) > 0:
+            _phases[-1].nested_time += elapsed
+        phases = self.report['phases']
+        phases[self.name] = (phases.get(self.name, 0.0)
+                             + elapsed - self.nested_time)
+
+
+class _NullPhase(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_null_phase = _NullPhase()
@@ -0,0 +1,157 @@
+""" Opt-in on-disk cache of mesh tables. When enabled, the complete mesh
+table of an instance (node labels and coordinates, element connectivity
+and set memberships) is saved to an npz sidecar file the first time it
+is requested. Later runs load the table from this file instead of
+reading it through the odb api. A cache file is rebuilt automatically if
+the size or modification time of the odb file has changed.
+
+Usage::
+
+    from odb_scripts import mesh_cache
+    mesh_cache.enable()
+    data = node_data.get_multiple_positions(odb, ...)
+
+"""
+from __future__ import print_function, division
+import os
+import re
+import hashlib
+import numpy as np
+
+
+_settings = {'enabled': False, 'directory': None}
+
+
+def enable(directory=None):
+    """ Enable the mesh cache
+
+    :param directory: The directory to save cache files in. If None,
+                      the cache files are saved next to the odb files.
+    :type directory: str
+
+    """
+    _settings['enabled'] = True
+    _settings['directory'] = directory
+
+
+def disable():
+    """ Disable the mesh cache """
+    _settings['enabled'] = False
+
+
+def is_enabled():
+    """ Check if the mesh cache is enabled
+
+    :rtype: bool
+
+    """
+    return _settings['enabled']
+
+
+def get_cache_file(odb_path, inst_name):
+    """ Get the cache file name for an instance in an odb
+
+    :param odb_path: Path to the odb file
+    :type odb_path: str
+
+    :param inst_name: The name of the instance
+    :type inst_name: str
+
+    :returns: The path to the cache file
+    :rtype: str
+
+    """
+    odb_path = os.path.abspath(odb_path)
+    safe_inst_name = re.sub(r'[^\w\-]', '_', inst_name)
+    if _settings['directory'] is None:
+        return odb_path + '.' + safe_inst_name + '.meshcache.npz'
+
+    # Include a hash of the full path to separate odbs with the same name
+    path_hash = hashlib.md5(odb_path.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(_settings['directory'],
+                        (os.path.basename(odb_path) + '.' + path_hash + '.'
+                         + safe_inst_name + '.meshcache.npz'))
+
+
+def load_mesh_table(odb, inst_name):
+    """ Load the mesh table for an instance from its cache file. If the
+    cache file is missing or outdated, the mesh table is read from the
+    odb and saved to the cache file.
+
+    :param odb: The odb object containing the instance
+    :type odb: Odb object (Abaqus)
+
+    :param inst_name: The name of the instance
+    :type inst_name: str
+
+    :returns: The mesh table
+    :rtype: :py:class:`odb_scripts.mesh_table.MeshTable`
+
+    """
+    from odb_scripts.mesh_table import MeshTable
+
+    odb_path = getattr(odb, 'path', odb.name)
+    cache_file = get_cache_file(odb_path, inst_name)
+    file_id = _get_file_id(odb_path)
+
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as fid:
+                npz = np.load(fid)
+                cached_id = npz['odb_file_id']
+                npz.close()
+                if np.array_equal(cached_id, file_id):
+                    fid.seek(0)
+                    return MeshTable.load(fid)
+        except (IOError, OSError, KeyError, ValueError) as e:
+            print('Could not read mesh cache file "' + cache_file + '": '
+                  + str(e))
+
+    odb_inst = odb.rootAssembly.instances[inst_name]
+    table = MeshTable.from_instance(odb_inst)
+    _save(table, cache_file, file_id)
+    return table
+
+
+def get_odb_file_id(odb):
+    """ Get an array identifying the current version of the file of an
+    odb, from the size and modification time of the file
+
+    :param odb: The odb object
+    :type odb: Odb object (Abaqus)
+
+    :returns: The file id, None if the odb file cannot be accessed
+    :rtype: np.array
+
+    """
+    try:
+        return _get_file_id(getattr(odb, 'path', odb.name))
+    except (IOError, OSError):
+        return None
+
+
+def _get_file_id(odb_path):
+    """ Get an array identifying the current version of the odb file """
+    stat = os.stat(odb_path)
+    return np.array([stat.st_size, stat.st_mtime], dtype=np.float64)
+
+
+def _save(table, cache_file, file_id):
+    """ Save the mesh table via a temporary file, such that other
+    processes never read a partially written cache file.
+    """
+    cache_dir = os.path.dirname(cache_file)
+    if cache_dir != '' and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    tmp_file = cache_file + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(tmp_file, 'wb') as fid:
+            table.save(fid, odb_file_id=file_id)
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+        os.rename(tmp_file, cache_file)
+    except (IOError, OSError) as e:
+        print('Could not write mesh cache file "' + cache_file + '": '
+              + str(e))
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
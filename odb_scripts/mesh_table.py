@@ -0,0 +1,396 @@
+from __future__ import print_function, division
+import numpy as np
+
+from odb_scripts.spatial_index import NodeGrid, ElementGrid
+from odb_scripts import mesh_cache
+from odb_scripts.instrumentation import count
+
+
+_mesh_tables = {}
+
+
+def get_mesh_table(odb, inst_name):
+    """ Get the mesh table for an instance. The table is built on the
+    first call and then reused for later calls with the same odb and
+    instance, as long as the size and modification time of the odb file
+    are unchanged.
+
+    :param odb: The odb object containing the instance
+    :type odb: Odb object (Abaqus)
+
+    :param inst_name: The name of the instance
+    :type inst_name: str
+
+    :returns: The mesh table for the instance
+    :rtype: :py:class:`MeshTable`
+
+    """
+    key = (odb.name, inst_name)
+    file_id = mesh_cache.get_odb_file_id(odb)
+    if key in _mesh_tables:
+        cached_id, table = _mesh_tables[key]
+        if np.array_equal(cached_id, file_id):
+            return table
+
+    if mesh_cache.is_enabled():
+        table = mesh_cache.load_mesh_table(odb, inst_name)
+    else:
+        odb_inst = odb.rootAssembly.instances[inst_name]
+        table = MeshTable.from_instance(odb_inst)
+    _mesh_tables[key] = (file_id, table)
+    return table
+
+
+def clear_cache(odb_name=None):
+    """ Clear all cached mesh tables. Tables of modified odb files are
+    rebuilt automatically, but clearing is required if a different odb
+    is opened with the same name and file signature as a previous one.
+
+    :param odb_name: If given, only clear the tables for the odb with
+                     this name (odb.name)
+    :type odb_name: str
+
+    """
+    if odb_name is None:
+        _mesh_tables.clear()
+    else:
+        for key in [key for key in _mesh_tables if key[0] == odb_name]:
+            del _mesh_tables[key]
+
+
+def is_cached(odb_name):
+    """ Check if any mesh table is cached for an odb
+
+    :param odb_name: The name of the odb (odb.name)
+    :type odb_name: str
+
+    :rtype: bool
+
+    """
+    return any(key[0] == odb_name for key in _mesh_tables)
+
+
+class MeshTable(object):
+    """ Node labels and coordinates for an instance, stored as numpy
+    arrays sorted by node label such that labels can be converted to
+    indices with a vectorized ``searchsorted``. Element connectivity and
+    set memberships are read from the odb instance when first requested.
+
+    :param labels: The node labels
+    :type labels: np.array (N)
+
+    :param coords: The node coordinates, one row per node
+    :type coords: np.array (N x dim)
+
+    """
+
+    def __init__(self, labels, coords):
+        labels = np.asarray(labels, dtype=np.int64)
+        coords = np.asarray(coords, dtype=np.float64).reshape(len(labels),
+                                                              -1)
+        sort_ind = np.argsort(labels, kind='mergesort')
+        self.labels = labels[sort_ind]
+        self.coords = coords[sort_ind]
+        self.node_sets = {}
+        self.element_sets = {}
+        self._elements = None
+        self._grid = None
+        self._element_grid = None
+        self._instance = None
+
+    @classmethod
+    def from_instance(cls, odb_inst):
+        """ Create a mesh table by reading the nodes of an odb instance
+
+        :param odb_inst: The instance to read nodes from
+        :type odb_inst: OdbInstance object (Abaqus)
+
+        :returns: The mesh table
+        :rtype: :py:class:`MeshTable`
+
+        """
+        nodes = odb_inst.nodes
+        labels = [n.label for n in nodes]
+        coords = [n.coordinates for n in nodes]
+        table = cls(labels, coords)
+        table._instance = odb_inst
+        count('nodes_scanned', len(labels))
+        return table
+
+    @property
+    def element_labels(self):
+        """ The element labels, sorted """
+        return self._get_elements()[0]
+
+    @property
+    def connectivity(self):
+        """ The node labels of each element, one row per element in
+        :py:attr:`element_labels`. Rows for elements with fewer nodes
+        than the largest element are padded with -1.
+        """
+        return self._get_elements()[1]
+
+    @property
+    def element_types(self):
+        """ The element type of each element in :py:attr:`element_labels`
+        """
+        return self._get_elements()[2]
+
+    def set_elements(self, labels, connectivity, types):
+        """ Set the element data
+
+        :param labels: The element labels
+        :type labels: list[ int ]
+
+        :param connectivity: The node labels of each element
+        :type connectivity: list[ list[ int ] ]
+
+        :param types: The element type of each element, e.g. 'C3D8R'
+        :type types: list[ str ]
+
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        sort_ind = np.argsort(labels, kind='mergesort')
+        if isinstance(connectivity, np.ndarray):
+            conn = connectivity.astype(np.int64)
+        else:
+            num_nodes = max([len(c) for c in connectivity] + [0])
+            conn = -np.ones((len(labels), num_nodes), dtype=np.int64)
+            for row, elem_conn in enumerate(connectivity):
+                conn[row, :len(elem_conn)] = elem_conn
+        self._elements = (labels[sort_ind], conn[sort_ind],
+                          np.asarray(types, dtype=str)[sort_ind])
+
+    def _get_elements(self):
+        if self._elements is None:
+            if self._instance is None:
+                raise KeyError('The elements are not available in the '
+                               + 'mesh table')
+            elements = self._instance.elements
+            self.set_elements([e.label for e in elements],
+                              [e.connectivity for e in elements],
+                              [e.type for e in elements])
+        return self._elements
+
+    def read_all(self):
+        """ Read the elements and all node and element sets of the
+        instance, such that the mesh table no longer depends on the odb.
+        """
+        self._get_elements()
+        if self._instance is not None:
+            for set_name in self._instance.nodeSets.keys():
+                self.node_set_labels(set_name)
+            for set_name in self._instance.elementSets.keys():
+                self.element_set_labels(set_name)
+
+    def save(self, file, **extra_arrays):
+        """ Save the complete mesh table to a compressed npz file, see
+        :py:func:`numpy.savez_compressed`. All elements and sets are read
+        from the odb first.
+
+        :param file: The file to save to
+        :type file: str or file object
+
+        :param extra_arrays: Additional arrays to save in the file
+        :type extra_arrays: np.array
+
+        """
+        self.read_all()
+        arrays = {'labels': self.labels,
+                  'coords': self.coords,
+                  'element_labels': self.element_labels,
+                  'connectivity': self.connectivity,
+                  'element_types': self.element_types}
+        for set_name, set_labels in self.node_sets.items():
+            arrays['node_set:' + set_name] = set_labels
+        for set_name, set_labels in self.element_sets.items():
+            arrays['element_set:' + set_name] = set_labels
+        arrays.update(extra_arrays)
+        np.savez_compressed(file, **arrays)
+
+    @classmethod
+    def load(cls, file):
+        """ Load a mesh table saved with :py:meth:`save`
+
+        :param file: The file to load
+        :type file: str or file object
+
+        :returns: The mesh table
+        :rtype: :py:class:`MeshTable`
+
+        """
+        npz = np.load(file)
+        try:
+            table = cls(npz['labels'], npz['coords'])
+            table._elements = (npz['element_labels'], npz['connectivity'],
+                               npz['element_types'])
+            for key in npz.files:
+                if key.startswith('node_set:'):
+                    table.node_sets[key[len('node_set:'):]] = npz[key]
+                elif key.startswith('element_set:'):
+                    table.element_sets[key[len('element_set:'):]] = npz[key]
+        finally:
+            npz.close()
+        return table
+
+    @property
+    def grid(self):
+        """ The spatial index of the nodes, built on first access. The
+        point indices correspond to the rows in :py:attr:`coords`.
+        """
+        if self._grid is None:
+            self._grid = NodeGrid(self.coords)
+        return self._grid
+
+    def get_grid(self, tol):
+        """ Get a spatial index of the nodes suitable for the search
+        radius tol. The index is rebuilt with a larger cell size if its
+        cells are smaller than tol, see
+        :py:class:`odb_scripts.spatial_index.NodeGrid`.
+
+        :param tol: The search radius
+        :type tol: float
+
+        :rtype: :py:class:`odb_scripts.spatial_index.NodeGrid`
+
+        """
+        if self.grid.cell_size < tol:
+            self._grid = NodeGrid(self.coords, min_cell_size=tol)
+        return self._grid
+
+    @property
+    def element_grid(self):
+        """ The spatial index of the element bounding boxes, built on
+        first access. The element indices correspond to the rows in
+        :py:attr:`element_labels`.
+        """
+        if self._element_grid is None:
+            node_inds = self.element_node_indices()
+            corners = self.coords[node_inds]
+            corners[node_inds < 0] = np.nan
+            self._element_grid = ElementGrid(np.nanmin(corners, axis=1),
+                                             np.nanmax(corners, axis=1))
+        return self._element_grid
+
+    def element_node_indices(self):
+        """ Get the node indices (rows in :py:attr:`coords`) of the nodes
+        of each element, with -1 for the padding in
+        :py:attr:`connectivity`
+
+        :rtype: np.array
+
+        """
+        conn = self.connectivity
+        node_inds = -np.ones(conn.shape, dtype=np.int64)
+        node_inds[conn >= 0] = self.indices(conn[conn >= 0])
+        return node_inds
+
+    def indices(self, labels):
+        """ Get the row indices for the given node labels
+
+        :param labels: The node labels to find
+        :type labels: list[ int ]
+
+        :returns: The indices in :py:attr:`labels` and :py:attr:`coords`
+        :rtype: np.array
+
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        inds = np.searchsorted(self.labels, labels)
+        found = inds < len(self.labels)
+        found[found] = self.labels[inds[found]] == labels[found]
+        if not np.all(found):
+            raise ValueError('The node labels ' + str(labels[~found].tolist())
+                             + ' are not found in the instance')
+        return inds
+
+    def coordinates(self, labels):
+        """ Get the coordinates for the given node labels
+
+        :param labels: The node labels
+        :type labels: list[ int ]
+
+        :returns: The coordinates, one row per label
+        :rtype: np.array
+
+        """
+        return self.coords[self.indices(labels)]
+
+    def find_labels(self, pos, tol):
+        """ Get the labels of the nodes located at the given positions
+
+        :param pos: List of positions to find nodes at
+        :type pos: list[ list[ float ] ]
+
+        :param tol: Tolerance for node position
+        :type tol: float
+
+        :returns: A list of node labels
+        :rtype: list[ int ]
+
+        """
+        # Pad 2d positions if the instance has 3d coordinates
+        pos_ = np.atleast_2d(np.array(pos, dtype=np.float64))
+        if pos_.shape[1] < self.coords.shape[1]:
+            pos_ = np.hstack((pos_, np.zeros((pos_.shape[0],
+                                              self.coords.shape[1]
+                                              - pos_.shape[1]))))
+
+        node_inds, num_found = self.get_grid(tol).query(pos_, tol)
+
+        if np.any(num_found != 1):
+            msg = ''
+            for n, the_pos in zip(num_found, pos):
+                if n == 0:
+                    msg += '\nCould not find the position: ' + str(the_pos)
+                elif n > 1:
+                    msg += ('\nFound ' + str(n) + ' nodes within tol of the '
+                            + 'position: ' + str(the_pos))
+            raise ValueError('Could not find all node positions or multiple '
+                             + 'nodes found' + msg)
+
+        return [int(label) for label in self.labels[node_inds]]
+
+    def node_set_labels(self, set_name):
+        """ Get the labels of the nodes in a node set of the instance.
+        The labels are read from the odb on the first call and then
+        cached.
+
+        :param set_name: Name of the node set
+        :type set_name: str
+
+        :returns: The node labels, in the order given by the odb
+        :rtype: np.array
+
+        """
+        if set_name not in self.node_sets:
+            if self._instance is None:
+                raise KeyError('The node set "' + set_name + '" is not '
+                               + 'available in the mesh table')
+            nodes = self._instance.nodeSets[set_name].nodes
+            self.node_sets[set_name] = np.array([n.label for n in nodes],
+                                                dtype=np.int64)
+            count('nodes_scanned', len(self.node_sets[set_name]))
+        return self.node_sets[set_name]
+
+    def element_set_labels(self, set_name):
+        """ Get the labels of the elements in an element set of the
+        instance. The labels are read from the odb on the first call and
+        then cached.
+
+        :param set_name: Name of the element set
+        :type set_name: str
+
+        :returns: The element labels, in the order given by the odb
+        :rtype: np.array
+
+        """
+        if set_name not in self.element_sets:
+            if self._instance is None:
+                raise KeyError('The element set "' + set_name + '" is not '
+                               + 'available in the mesh table')
+            elements = self._instance.elementSets[set_name].elements
+            self.element_sets[set_name] = np.array([e.label
+                                                    for e in elements],
+                                                   dtype=np.int64)
+        return self.element_sets[set_name]
@@ -3,18 +3,24 @@ import sys
 import numpy as np
 import re
 
-from abaqusConstants import *
-from abaqus import session
-import visualization
+from odb_scripts.mesh_table import get_mesh_table, clear_cache
+from odb_scripts.results import ResultArray
+from odb_scripts import bulk_data
+from odb_scripts import backends
+from odb_scripts import derived
+from odb_scripts.odb_pool import get_odb
+from odb_scripts.instrumentation import instrumented, phase, count
 
 
+@instrumented
 def get_multiple_positions(odb, inst_name, positions, variable, step_numbers, 
-                           increments=['0:-1'], tol=1.e-2):
+                           increments=['0:-1'], tol=1.e-2, engine='auto'):
     """ Get given variable from odb at given positions for specified steps and 
     increments
     
-    :param odb: The odb object to extract results from
-    :type odb: Odb object (Abaqus)
+    :param odb: The odb object to extract results from, or the path to 
+                the odb file, see :py:mod:`odb_scripts.odb_pool`
+    :type odb: Odb object (Abaqus) or str
     
     :param inst_name: The name of the instance to get results for
     :type inst_name: str
@@ -25,7 +31,9 @@ def get_multiple_positions(odb, inst_name, positions, variable, step_numbers,
                      extracted. 
     :type position: list[ list[ float ] ] or str
     
-    :param variable: Variable to extract
+    :param variable: Variable to extract, e.g. 'U2', or a derived 
+                     quantity, e.g. 'UMAG' or 'MISES', see 
+                     :py:mod:`odb_scripts.derived`
     :type variable: str
     
     :param step_numbers: List of step numbers from which to extract results
@@ -41,6 +49,14 @@ def get_multiple_positions(odb, inst_name, positions, variable, step_numbers,
     :param tol: Tolerance for node position
     :type tol: float
     
+    :param engine: The extraction engine. 'xy' uses the session and 
+                   xyDataListFromField (requires CAE), 'bulk' reads the 
+                   field output bulk data directly, see 
+                   :py:mod:`odb_scripts.bulk_data`. 'auto' uses 'xy' 
+                   if the CAE kernel is available, and 'bulk' otherwise, 
+                   see :py:mod:`odb_scripts.backends`.
+    :type engine: str
+    
     :returns: Dictionary describing the results with fields containing 
               numpy arrays. Each row describe new time points
               
@@ -55,19 +71,34 @@ def get_multiple_positions(odb, inst_name, positions, variable, step_numbers,
               
               Where the number 0-(N-1) is the index in the position list
               describing the node. The "node" entry is a Nx3 array with 
-              the node coordinates. 
+              the node coordinates. The series are columns of one 
+              array, see :py:class:`odb_scripts.results.ResultArray`.
               
-    :rtype: dict
+    :rtype: :py:class:`odb_scripts.results.ResultArray`
     
     """
-    
-    odb_inst = odb.rootAssembly.instances[inst_name]
+    odb = get_odb(odb)
+    engine = backends.resolve_engine(engine)
+    if engine == 'bulk':
+        return bulk_data.get_multiple_positions(odb, inst_name, positions, 
+                                                variable, step_numbers, 
+                                                increments, tol)
+    if derived.is_derived(variable):
+        data = get_multiple_positions_variables(odb, inst_name, positions, 
+                                                [variable], step_numbers, 
+                                                increments, tol, engine)
+        return ResultArray(data['values'][:, :, 0], 
+                           range(len(data['label'])), data['step'], 
+                           data['incr'], data['time'], node=data['node'])
     
     # Get node labels based on the positions
-    if isinstance(positions, str):
-        node_labels = [n.label for n in odb_inst.nodeSets[positions].nodes]
-    else:
-        node_labels = get_node_labels(odb, inst_name, positions, tol)
+    with phase('node_lookup'):
+        mesh_table = get_mesh_table(odb, inst_name)
+        if isinstance(positions, (str, type(u''))):
+            node_labels = [int(label) for label in 
+                           mesh_table.node_set_labels(positions)]
+        else:
+            node_labels = get_node_labels(odb, inst_name, positions, tol)
     
     node_spec = ((inst_name, tuple(node_labels)),)
     
@@ -76,43 +107,44 @@ def get_multiple_positions(odb, inst_name, positions, variable, step_numbers,
     variable_list = get_variable_list([variable])
     
     # Set the active frames
-    step_data, incr_data = set_active_frames(odb, step_numbers, increments)
+    with phase('set_active_frames'):
+        step_data, incr_data = set_active_frames(odb, step_numbers, 
+                                                 increments)
+    count('frames_activated', len(step_data))
     
     # Get xy_data_list
     # Need to set odb active, otherwise the xyDataListFromField will fail!
-    viewport = session.viewports[session.viewports.keys()[0]]
-    viewport.setValues(displayedObject=odb)
-    xy_data_list = session.xyDataListFromField(odb=odb, 
-                                               outputPosition=NODAL,
-                                               variable=variable_list, 
-                                               nodeLabels=node_spec)
-    
-    node_data = {'step': step_data,
-                 'incr': incr_data,
-                 'node': []}
-    
-    odb_inst_node_labels = [n.label for n in odb_inst.nodes]
-
-    for node_ind, xy_data in enumerate(xy_data_list):
-        data = np.array(xy_data.data)
-        if not 'time' in node_data:
-            node_data['time'] = data[:,0]
-        node_data[node_ind] = data[:,1]
-        odb_node_ind = odb_inst_node_labels.index(node_labels[node_ind])
-        node_data['node'].append(odb_inst.nodes[odb_node_ind].coordinates)
-
-    node_data['node'] = np.array(node_data['node'])
-    
-    return node_data
+    with phase('xy_data'):
+        session = backends.get_session()
+        nodal = backends.get_constants().NODAL
+        viewport = session.viewports[session.viewports.keys()[0]]
+        viewport.setValues(displayedObject=odb)
+        xy_data_list = session.xyDataListFromField(odb=odb, 
+                                                   outputPosition=nodal,
+                                                   variable=variable_list, 
+                                                   nodeLabels=node_spec)
+    count('xy_data_objects', len(xy_data_list))
+    
+    with phase('assembly'):
+        time, values = _assemble_xy_data(xy_data_list, node_labels, 
+                                         [variable], len(step_data))
+        values = values[:, :, 0]
+        count('bytes_produced', values.nbytes)
+    
+    return ResultArray(values, range(len(node_labels)), step_data, 
+                       incr_data, time, 
+                       node=mesh_table.coordinates(node_labels))
     
 
+@instrumented
 def get_multiple_variables(odb, inst_name, position, variables, step_numbers,
-                           increments=['0:-1'], tol=1.e-2):
+                           increments=['0:-1'], tol=1.e-2, engine='auto'):
     """ Get given variables from odb at given position for specified 
     steps and increments
     
-    :param odb: The odb object to extract results from
-    :type odb: Odb object (Abaqus)
+    :param odb: The odb object to extract results from, or the path to 
+                the odb file, see :py:mod:`odb_scripts.odb_pool`
+    :type odb: Odb object (Abaqus) or str
     
     :param inst_name: The name of the instance to get results for
     :type inst_name: str
@@ -120,7 +152,9 @@ def get_multiple_variables(odb, inst_name, position, variables, step_numbers,
     :param position: Node coordinates where results will be extracted
     :type position: list[ float ]
     
-    :param variables: List of variables to extract
+    :param variables: List of variables to extract. Derived quantities, 
+                      e.g. 'UMAG' or 'MISES', are computed from the 
+                      components, see :py:mod:`odb_scripts.derived`.
     :type variables: list[ str ]
     
     :param step_numbers: List of step numbers from which to extract results
@@ -136,6 +170,14 @@ def get_multiple_variables(odb, inst_name, position, variables, step_numbers,
     :param tol: Tolerance for node position
     :type tol: float
     
+    :param engine: The extraction engine. 'xy' uses the session and 
+                   xyDataListFromField (requires CAE), 'bulk' reads the 
+                   field output bulk data directly, see 
+                   :py:mod:`odb_scripts.bulk_data`. 'auto' uses 'xy' 
+                   if the CAE kernel is available, and 'bulk' otherwise, 
+                   see :py:mod:`odb_scripts.backends`.
+    :type engine: str
+    
     :returns: Dictionary describing the results with fields containing numpy 
               arrays. Each row describe new time points
               
@@ -148,13 +190,28 @@ def get_multiple_variables(odb, inst_name, position, variables, step_numbers,
               - "var_N"
               
               Where "var_i" is the ith variable of the N variables given 
-              in the list var.
+              in the list var. The series are columns of one array, 
+              see :py:class:`odb_scripts.results.ResultArray`.
               
-    :rtype: dict
+    :rtype: :py:class:`odb_scripts.results.ResultArray`
     
     """
+    odb = get_odb(odb)
+    engine = backends.resolve_engine(engine)
+    if engine == 'bulk':
+        return bulk_data.get_multiple_variables(odb, inst_name, position, 
+                                                variables, step_numbers, 
+                                                increments, tol)
+    if any(derived.is_derived(variable) for variable in variables):
+        data = get_multiple_positions_variables(odb, inst_name, [position], 
+                                                variables, step_numbers, 
+                                                increments, tol, engine)
+        return ResultArray(data['values'][:, 0, :], variables, data['step'], 
+                           data['incr'], data['time'])
+    
     # Get node labels based on the positions
-    node_label = get_node_labels(odb, inst_name, [position], tol)[0]
+    with phase('node_lookup'):
+        node_label = get_node_labels(odb, inst_name, [position], tol)[0]
     node_spec = ((inst_name, (node_label,)),)
     
     # Translate the var list to the variable list format 
@@ -162,35 +219,228 @@ def get_multiple_variables(odb, inst_name, position, variables, step_numbers,
     variable_list = get_variable_list(variables)
     
     # Set the active frames
-    step_data, incr_data = set_active_frames(odb, step_numbers, increments)
+    with phase('set_active_frames'):
+        step_data, incr_data = set_active_frames(odb, step_numbers, 
+                                                 increments)
+    count('frames_activated', len(step_data))
     
     # Get xy_data_list
     # Need to set odb active, otherwise the xyDataListFromField will fail!
-    viewport = session.viewports[session.viewports.keys()[0]]
-    viewport.setValues(displayedObject=odb)
-    xy_data_list = session.xyDataListFromField(odb=odb, 
-                                               outputPosition=NODAL,
-                                               variable=variable_list, 
-                                               nodeLabels=node_spec)
-    time_set = False
-    node_data = {'step': step_data,
-                 'incr': incr_data}
-
-    for xy_data, variable in zip(xy_data_list, variables):
-        data = np.array(xy_data.data)
-        if not time_set:
-            node_data['time'] = data[:,0]
-            time_set = True
-        node_data[variable] = data[:,1]
+    with phase('xy_data'):
+        session = backends.get_session()
+        nodal = backends.get_constants().NODAL
+        viewport = session.viewports[session.viewports.keys()[0]]
+        viewport.setValues(displayedObject=odb)
+        xy_data_list = session.xyDataListFromField(odb=odb, 
+                                                   outputPosition=nodal,
+                                                   variable=variable_list, 
+                                                   nodeLabels=node_spec)
+    count('xy_data_objects', len(xy_data_list))
+    with phase('assembly'):
+        time, values = _assemble_xy_data(xy_data_list, [node_label], 
+                                         variables, len(step_data))
+        values = values[:, 0, :]
+        count('bytes_produced', values.nbytes)
         
-    return node_data
+    return ResultArray(values, variables, step_data, incr_data, time)
+    
+    
+@instrumented
+def get_multiple_positions_variables(odb, inst_name, positions, variables, 
+                                     step_numbers, increments=['0:-1'], 
+                                     tol=1.e-2, engine='auto'):
+    """ Get given variables from odb at given positions for specified 
+    steps and increments. All variables at all positions are extracted 
+    in a single pass over the frames.
+    
+    :param odb: The odb object to extract results from, or the path to 
+                the odb file, see :py:mod:`odb_scripts.odb_pool`
+    :type odb: Odb object (Abaqus) or str
+    
+    :param inst_name: The name of the instance to get results for
+    :type inst_name: str
+    
+    :param positions: Node coordinates where results will be extracted. 
+                      Alternatively, name of set in odb instance 
+                      containing nodes from which results shall be 
+                      extracted. 
+    :type positions: list[ list[ float ] ] or str
+    
+    :param variables: List of variables to extract. Derived quantities, 
+                      e.g. 'UMAG' or 'MISES', are computed from the 
+                      components, see :py:mod:`odb_scripts.derived`.
+    :type variables: list[ str ]
+    
+    :param step_numbers: List of step numbers from which to extract results
+    :type step_numbers: list[ int ]
+    
+    :param increments: List of increments from which to extract results. 
+                       ['0:-1'] implies all increments. 
+                       Note that python negative numbering can be used, 
+                       such that -1 implies last increment. Opposed to 
+                       python lists, the last given index is included.
+    :type increments: list[ int ]
+    
+    :param tol: Tolerance for node position
+    :type tol: float
+    
+    :param engine: The extraction engine, 'xy', 'bulk' or 'auto', see 
+                   :py:func:`get_multiple_positions`
+    :type engine: str
+    
+    :returns: Dictionary describing the results with fields
+              
+              - "step"
+              - "incr"
+              - "time"
+              - "label": The node labels (N)
+              - "node": The node coordinates (N x 3)
+              - "variables": The variable names (M)
+              - "values": Contiguous array with the values, with 
+                dimensions frames x N x M
+              
+    :rtype: dict
+    
+    """
+    odb = get_odb(odb)
+    engine = backends.resolve_engine(engine)
+    if engine == 'bulk':
+        return bulk_data.get_multiple_positions_variables(
+            odb, inst_name, positions, variables, step_numbers, increments, 
+            tol)
+    
+    # Get node labels based on the positions
+    with phase('node_lookup'):
+        mesh_table = get_mesh_table(odb, inst_name)
+        if isinstance(positions, (str, type(u''))):
+            node_labels = [int(label) for label in 
+                           mesh_table.node_set_labels(positions)]
+        else:
+            node_labels = get_node_labels(odb, inst_name, positions, tol)
+    
+    node_spec = ((inst_name, tuple(node_labels)),)
+    
+    # Derived quantities are computed from the raw components
+    raw_variables = derived.expand_variables(
+        variables, lambda field_name: _get_component_labels(
+            odb, step_numbers[0], field_name))
+    variable_list = get_variable_list(raw_variables)
+    
+    # Set the active frames
+    with phase('set_active_frames'):
+        step_data, incr_data = set_active_frames(odb, step_numbers, 
+                                                 increments)
+    count('frames_activated', len(step_data))
+    
+    # Get xy_data_list for all variables and nodes in one call
+    # Need to set odb active, otherwise the xyDataListFromField will fail!
+    with phase('xy_data'):
+        session = backends.get_session()
+        nodal = backends.get_constants().NODAL
+        viewport = session.viewports[session.viewports.keys()[0]]
+        viewport.setValues(displayedObject=odb)
+        xy_data_list = session.xyDataListFromField(odb=odb, 
+                                                   outputPosition=nodal,
+                                                   variable=variable_list, 
+                                                   nodeLabels=node_spec)
+    count('xy_data_objects', len(xy_data_list))
+    
+    # The xy data objects are identified by their names, 
+    # e.g. 'U:U1 PI: PART-1-1 N: 12'
+    with phase('assembly'):
+        time, values = _assemble_xy_data(xy_data_list, node_labels, 
+                                         raw_variables, len(step_data))
+    if raw_variables != list(variables):
+        with phase('derived'):
+            values = derived.evaluate_variables(variables, raw_variables,
+                                                values)
+    count('bytes_produced', values.nbytes)
+    
+    return {'step': step_data,
+            'incr': incr_data,
+            'time': time,
+            'label': np.array(node_labels),
+            'node': mesh_table.coordinates(node_labels),
+            'variables': list(variables),
+            'values': values}
+    
+    
+def _assemble_xy_data(xy_data_list, node_labels, variables, num_frames):
+    """ Assemble the values of nodal xy data objects created by 
+    xyDataListFromField into one array. The xy data objects are 
+    identified by their names, e.g. 'U:U1 PI: PART-1-1 N: 12', such that
+    their order does not matter. Several positions can give the same 
+    node, with one xy data object for all of them.
+    
+    :param xy_data_list: The xy data objects
+    :type xy_data_list: list[ XYData object (Abaqus) ]
+    
+    :param node_labels: The node label of each position
+    :type node_labels: list[ int ]
+    
+    :param variables: The variables, e.g. ['U1', 'RF2']
+    :type variables: list[ str ]
+    
+    :param num_frames: The number of active frames
+    :type num_frames: int
+    
+    :returns: The time of each frame, and the values (frames x 
+              positions x variables). Values missing in the xy data are
+              NaN.
+    :rtype: (np.array, np.array)
+    
+    """
+    node_columns = {}
+    for ind, label in enumerate(node_labels):
+        node_columns.setdefault(int(label), []).append(ind)
+    var_inds = dict((var, ind) for ind, var in enumerate(variables))
+    values = np.nan*np.ones((num_frames, len(node_labels), len(variables)))
+    time = None
+    for xy_data in xy_data_list:
+        component, label = _parse_xy_data_name(xy_data.name)
+        data = np.array(xy_data.data)
+        if time is None:
+            time = data[:,0]
+        values[:, node_columns[label], var_inds[component]] = data[:,1:2]
+    if time is None:
+        raise ValueError('No xy data found for the variables ' 
+                         + str(list(variables)) + ' at the nodes ' 
+                         + str(sorted(node_columns)))
+    return time, values
+    
+    
+def _get_component_labels(odb, step_number, field_name):
+    """ Get the component labels of a field output in the last frame
+    of a step
+    """
+    step = odb.steps[odb.steps.keys()[step_number]]
+    return list(step.frames[-1].fieldOutputs[field_name].componentLabels)
+    
+    
+def _parse_xy_data_name(name):
+    """ Get the component and node label from the name of a nodal xy data
+    object created by xyDataListFromField
+    """
+    match = re.match(r'^\w+:(\w+) PI: .* N: (\d+)', name)
+    if match is None:
+        raise ValueError('Could not interpret the xy data name "' + name 
+                         + '"')
+    return match.group(1), int(match.group(2))
+    
+    
+# Streaming variants, reading one frame at a time with constant memory
+iter_multiple_positions = bulk_data.iter_multiple_positions
+iter_multiple_variables = bulk_data.iter_multiple_variables
     
     
 def get_node_labels(odb, inst, pos, tol):
-    """ 
+    """ Get the labels of the nodes located at the given positions. 
+    A spatial index of the instance nodes is built on the first call 
+    and reused for later calls with the same odb and instance.
     
-    :param odb: The odb object to get node labels from
-    :type odb: Odb object (Abaqus)
+    :param odb: The odb object to get node labels from, or the path to 
+                the odb file, see :py:mod:`odb_scripts.odb_pool`
+    :type odb: Odb object (Abaqus) or str
     
     :param inst: The name of the instance to get node labels from
     :type inst: str
@@ -205,33 +455,55 @@ def get_node_labels(odb, inst, pos, tol):
     :rtype: list[ int ]
     
     """
-    # Convert pos to (tranposed) numpy array internally
-    pos_ = np.transpose(pos)
-    
-    labels = np.zeros((len(pos),), dtype=np.int)
-    n_missing = -len(pos)
-    for node in odb.rootAssembly.instances[inst].nodes:
-        coord = np.array(node.coordinates)
-        d2 = 0.0
-        for coord_comp, pos_comp in zip(coord, pos_):
-            d2 += (coord_comp - pos_comp)**2
-
-        log_vec = d2 < tol**2
-        if any(log_vec):
-            labels[log_vec] = node.label
-            n_missing += 1
-            
-        if n_missing >= 0:
-            break   # Should be done, but check ensures that a label not 
-                    # written multiple times
-            
-    if any(labels==0):
-        for label, the_pos in zip(labels, pos):
-            if label == 0:
-                print('Could not find the position: ' + str(the_pos))
-        ValueError('Could not find all node positions or multiple nodes found')
+    return get_mesh_table(get_odb(odb), inst).find_labels(pos, tol)
+    
+    
+def get_node_coordinates(odb, inst):
+    """ Get the labels and coordinates of all nodes in an instance, 
+    sorted by label. The arrays are read once and then cached for the 
+    given odb and instance, see :py:mod:`odb_scripts.mesh_table`.
+    
+    :param odb: The odb object to get nodes from, or the path to the odb
+                file
+    :type odb: Odb object (Abaqus) or str
+    
+    :param inst: The name of the instance to get nodes from
+    :type inst: str
+    
+    :returns: Array of node labels (N) and array of coordinates (N x 3)
+    :rtype: (np.array, np.array)
+    
+    """
+    mesh_table = get_mesh_table(get_odb(odb), inst)
+    return mesh_table.labels, mesh_table.coords
+    
+    
+def get_node_grid(odb, inst):
+    """ Get the spatial index for the nodes in an instance. The index is
+    built once and then cached for the given odb and instance.
+    
+    :param odb: The odb object to get nodes from, or the path to the odb
+                file
+    :type odb: Odb object (Abaqus) or str
+    
+    :param inst: The name of the instance to get nodes from
+    :type inst: str
     
-    return list(labels)
+    :returns: The spatial index, with point indices corresponding to the 
+              arrays returned by :py:func:`get_node_coordinates`
+    :rtype: :py:class:`odb_scripts.spatial_index.NodeGrid`
+    
+    """
+    return get_mesh_table(get_odb(odb), inst).grid
+    
+    
+def clear_node_cache():
+    """ Clear the cached node coordinates and spatial indices. Required
+    if an odb is modified, or if a different odb is opened with the same
+    name as a previous one. See 
+    :py:func:`odb_scripts.mesh_table.clear_cache`.
+    """
+    clear_cache()
     
     
 def get_variable_list(variables):
@@ -264,6 +536,7 @@ def get_variable_list(variables):
         
         return all_ok
     
+    constants = backends.get_constants()
     var_list = []
     for variable in variables:
         var_label = re.search('\D+', variable).group()
@@ -274,7 +547,8 @@ def get_variable_list(variables):
                              + variable + '". Got var_label = "' + var_label 
                              + '", and var_num = "' + var_num + '".')
                              
-        var_list.append((var_label, NODAL, ((COMPONENT, variable),),))
+        var_list.append((var_label, constants.NODAL, 
+                         ((constants.COMPONENT, variable),),))
     
     return var_list
 
@@ -302,6 +576,7 @@ def set_active_frames(odb, steps, incr):
     
     
     
+    session = backends.get_session()
     all_step_names = odb.steps.keys()
     active_step_names = [all_step_names[step] for step in steps]
     odb_data = session.odbData[odb.name]
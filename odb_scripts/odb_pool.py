@@ -0,0 +1,167 @@
+""" Pool of open odb files, such that scripts looping over many odb files
+can pass paths instead of odb objects. Open read only odb files are
+reused, and the least recently used odb files are closed when the
+number of open files or their estimated memory exceeds the limits.
+
+Usage::
+
+    from odb_scripts import node_data, odb_pool
+    odb_pool.default_pool.max_open = 4
+    for odb_path in odb_paths:
+        data = node_data.get_multiple_positions(odb_path, ...)
+    print(odb_pool.default_pool.stats())
+    odb_pool.default_pool.close_all()
+
+The memory of an open odb cannot be queried through the odb api, and is
+estimated from the size of the odb file by default. A different
+estimate can be given as the size_function of the pool.
+"""
+from __future__ import print_function, division
+import os
+import importlib
+from collections import OrderedDict
+
+from odb_scripts import mesh_table
+from odb_scripts import frame_cache
+
+
+class OdbPool(object):
+    """ Least recently used pool of odb files opened read only
+
+    :param max_open: The maximum number of open odb files
+    :type max_open: int
+
+    :param max_bytes: The maximum estimated memory of the open odb
+                      files. If None, there is no memory limit. The most
+                      recently used odb is always kept open, even if it
+                      alone exceeds the limit.
+    :type max_bytes: int
+
+    :param odb_module: The name of the module providing the function
+                       openOdb. Can be changed to use a stand-in for
+                       odbAccess.
+    :type odb_module: str
+
+    :param size_function: Function giving the estimated memory of an
+                          open odb, called as size_function(odb_path).
+                          If None, the size of the odb file is used.
+    :type size_function: callable
+
+    """
+
+    def __init__(self, max_open=8, max_bytes=None, odb_module='odbAccess',
+                 size_function=None):
+        self.max_open = max_open
+        self.max_bytes = max_bytes
+        self.odb_module = odb_module
+        self.size_function = size_function
+        self._odbs = OrderedDict()
+        self._sizes = {}
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, odb_path):
+        """ Get an open odb, opening it if it is not in the pool
+
+        :param odb_path: Path to the odb file
+        :type odb_path: str
+
+        :rtype: Odb object (Abaqus)
+
+        """
+        odb_path = os.path.abspath(odb_path)
+        if odb_path in self._odbs:
+            self._stats['hits'] += 1
+            odb = self._odbs.pop(odb_path)
+        else:
+            self._stats['misses'] += 1
+            open_odb = importlib.import_module(self.odb_module).openOdb
+            odb = open_odb(odb_path, readOnly=True)
+            if self.size_function is None:
+                self._sizes[odb_path] = os.path.getsize(odb_path)
+            else:
+                self._sizes[odb_path] = self.size_function(odb_path)
+        self._odbs[odb_path] = odb  # Most recently used last
+        self._evict()
+        return odb
+
+    def close(self, odb_path):
+        """ Close an odb, if it is in the pool
+
+        :param odb_path: Path to the odb file
+        :type odb_path: str
+
+        """
+        odb_path = os.path.abspath(odb_path)
+        odb = self._odbs.pop(odb_path, None)
+        self._sizes.pop(odb_path, None)
+        if odb is not None:
+            mesh_table.clear_cache(odb.name)
+            frame_cache.default_cache.clear(odb.name)
+            odb.close()
+
+    def close_all(self):
+        """ Close all odb files in the pool """
+        for odb_path in list(self._odbs):
+            self.close(odb_path)
+
+    def open_paths(self):
+        """ Get the paths of the open odb files, least recently used first
+
+        :rtype: list[ str ]
+
+        """
+        return list(self._odbs)
+
+    def memory(self):
+        """ Get the estimated memory of the open odb files
+
+        :rtype: int
+
+        """
+        return sum(self._sizes.values())
+
+    def stats(self):
+        """ Get the pool statistics
+
+        :returns: The number of hits (odb already open), misses (odb
+                  opened), evictions (odb closed to respect the limits),
+                  the number of open odb files and their estimated
+                  memory
+        :rtype: dict
+
+        """
+        return dict(self._stats, open=len(self._odbs), bytes=self.memory())
+
+    def reset_stats(self):
+        """ Set the hit, miss and eviction counts to zero """
+        for key in self._stats:
+            self._stats[key] = 0
+
+    def _evict(self):
+        """ Close the least recently used odb files until the limits are
+        respected, always keeping the most recently used odb
+        """
+        while len(self._odbs) > 1 and (
+                len(self._odbs) > self.max_open
+                or (self.max_bytes is not None
+                    and self.memory() > self.max_bytes)):
+            self._stats['evictions'] += 1
+            self.close(next(iter(self._odbs)))
+
+
+default_pool = OdbPool()
+
+
+def get_odb(odb):
+    """ Get an odb object from an odb object or a path. Paths are opened
+    through the :py:data:`default_pool`.
+
+    :param odb: The odb object, or the path to the odb file
+    :type odb: Odb object (Abaqus) or str
+
+    :rtype: Odb object (Abaqus)
+
+    """
+    if isinstance(odb, (str, type(u''))):
+        return default_pool.get(odb)
+    return odb
@@ -0,0 +1,239 @@
+""" Deferred extraction requests, merged into a single pass over the
+frames of each instance. Scripts calling the extraction functions many
+times with overlapping steps, nodes and variables can instead register
+the requests, and get the same results from one traversal::
+
+    from odb_scripts.planner import QueryPlan
+    plan = QueryPlan(odb)
+    top = plan.get_multiple_positions('PART-1-1', 'TOP', 'U2', [0, 1])
+    corner = plan.get_multiple_variables('PART-1-1', [0.0, 0.0, 0.0],
+                                         ['U1', 'RF2'], [1])
+    plan.run()
+    print(top.result['time'], corner.result['RF2'])
+
+For each instance, the planner reads the union of the frames, nodes and
+variables of all requests with the bulk engine, see
+:py:mod:`odb_scripts.bulk_data`, and then splits the values back out to
+the requests. The results are the same as from the corresponding
+functions in :py:mod:`odb_scripts.bulk_data`. The merged values array
+holds all frames x nodes x variables of an instance, and requests with
+little overlap may therefore be better extracted separately.
+"""
+from __future__ import print_function, division
+from collections import OrderedDict
+import numpy as np
+
+from odb_scripts.bulk_data import (get_active_frames, get_label_region,
+                                   read_nodal_values)
+from odb_scripts.mesh_table import get_mesh_table
+from odb_scripts.odb_pool import get_odb
+from odb_scripts.results import ResultArray
+from odb_scripts import frame_cache
+from odb_scripts.instrumentation import instrumented, phase, count
+
+
+class PlannedRequest(object):
+    """ An extraction request, with the result available after the plan
+    has been run
+
+    :param function: The name of the corresponding extraction function,
+                     'get_multiple_positions', 'get_multiple_variables'
+                     or 'get_multiple_positions_variables'
+    :type function: str
+
+    :param inst_name: The name of the instance
+    :type inst_name: str
+
+    :param positions: Node coordinates or name of node set
+    :type positions: list[ list[ float ] ] or str
+
+    :param variables: The variables to extract
+    :type variables: list[ str ]
+
+    :param step_numbers: List of step numbers
+    :type step_numbers: list[ int ]
+
+    :param increments: List of increments
+    :type increments: list[ int or str ]
+
+    :param tol: Tolerance for node position
+    :type tol: float
+
+    """
+
+    def __init__(self, function, inst_name, positions, variables,
+                 step_numbers, increments, tol):
+        self.function = function
+        self.inst_name = inst_name
+        self.positions = positions
+        self.variables = list(variables)
+        self.step_numbers = list(step_numbers)
+        self.increments = list(increments)
+        self.tol = tol
+        self.result = None
+
+
+class QueryPlan(object):
+    """ Collection of extraction requests for one odb
+
+    :param odb: The odb object to extract results from, or the path to
+                the odb file, see :py:mod:`odb_scripts.odb_pool`
+    :type odb: Odb object (Abaqus) or str
+
+    """
+
+    def __init__(self, odb):
+        self.odb = get_odb(odb)
+        self.requests = []
+
+    def get_multiple_positions(self, inst_name, positions, variable,
+                               step_numbers, increments=['0:-1'], tol=1.e-2):
+        """ Request the result of
+        :py:func:`odb_scripts.bulk_data.get_multiple_positions`
+
+        :rtype: :py:class:`PlannedRequest`
+
+        """
+        return self._add(PlannedRequest(
+            'get_multiple_positions', inst_name, positions, [variable],
+            step_numbers, increments, tol))
+
+    def get_multiple_variables(self, inst_name, position, variables,
+                               step_numbers, increments=['0:-1'], tol=1.e-2):
+        """ Request the result of
+        :py:func:`odb_scripts.bulk_data.get_multiple_variables`
+
+        :rtype: :py:class:`PlannedRequest`
+
+        """
+        return self._add(PlannedRequest(
+            'get_multiple_variables', inst_name, [position], variables,
+            step_numbers, increments, tol))
+
+    def get_multiple_positions_variables(self, inst_name, positions,
+                                         variables, step_numbers,
+                                         increments=['0:-1'], tol=1.e-2):
+        """ Request the result of
+        :py:func:`odb_scripts.bulk_data.get_multiple_positions_variables`
+
+        :rtype: :py:class:`PlannedRequest`
+
+        """
+        return self._add(PlannedRequest(
+            'get_multiple_positions_variables', inst_name, positions,
+            variables, step_numbers, increments, tol))
+
+    def run(self):
+        """ Extract the results of all requests that have not been run
+
+        :returns: The result of each request, in the order the requests
+                  were added
+        :rtype: list
+
+        """
+        run_requests(self.odb, [request for request in self.requests
+                                if request.result is None])
+        return [request.result for request in self.requests]
+
+    def _add(self, request):
+        self.requests.append(request)
+        return request
+
+
+@instrumented
+def run_requests(odb, requests):
+    """ Extract the results of requests, with one pass over the frames
+    per instance. The result of each request is stored in its result
+    attribute.
+
+    :param odb: The odb object to extract results from, or the path to
+                the odb file
+    :type odb: Odb object (Abaqus) or str
+
+    :param requests: The requests
+    :type requests: list[ :py:class:`PlannedRequest` ]
+
+    """
+    odb = get_odb(odb)
+    instances = OrderedDict()
+    for request in requests:
+        instances.setdefault(request.inst_name, []).append(request)
+    count('planned_requests', len(requests))
+    for inst_name, inst_requests in instances.items():
+        _run_instance(odb, inst_name, inst_requests)
+
+
+def _run_instance(odb, inst_name, requests):
+    """ Extract the results of requests for one instance """
+    step_nums = dict((name, num) for num, name in enumerate(odb.steps.keys()))
+    node_labels = []
+    frames = []
+    with phase('planning'):
+        mesh_table = get_mesh_table(odb, inst_name)
+        for request in requests:
+            if isinstance(request.positions, (str, type(u''))):
+                labels = mesh_table.node_set_labels(request.positions)
+            else:
+                labels = mesh_table.find_labels(request.positions,
+                                                request.tol)
+            node_labels.append(np.asarray(labels, dtype=np.int64))
+            frames.append(get_active_frames(odb, request.step_numbers,
+                                            request.increments))
+
+        # The union of the frames, identified by (step number, frame
+        # number), nodes and variables
+        all_frames = sorted(set((step_nums[step.name], frame_num)
+                                for request_frames in frames
+                                for _, step, frame_num in request_frames))
+        frame_inds = dict((frame, ind) for ind, frame in enumerate(all_frames))
+        all_labels = np.unique(np.concatenate(node_labels))
+        all_variables = []
+        for request in requests:
+            all_variables += [variable for variable in request.variables
+                              if variable not in all_variables]
+
+        # Read from the node set if all requests use the same set, and
+        # otherwise from a region with the union of the nodes
+        set_names = set(request.positions
+                        if isinstance(request.positions, (str, type(u'')))
+                        else None for request in requests)
+        odb_inst = odb.rootAssembly.instances[inst_name]
+        if len(set_names) == 1 and None not in set_names:
+            set_name = set_names.pop()
+            region = odb_inst.nodeSets[set_name]
+        else:
+            set_name = None
+            region = get_label_region(odb, inst_name, all_labels)
+    count('planned_frames', len(all_frames))
+
+    step_names = odb.steps.keys()
+    values, time = read_nodal_values(
+        [(0, odb.steps[step_names[step_num]], frame_num)
+         for step_num, frame_num in all_frames],
+        all_variables, region, all_labels,
+        cache_key=frame_cache.region_key(odb, inst_name, set_name))
+
+    with phase('split'):
+        for request, labels, request_frames in zip(requests, node_labels,
+                                                   frames):
+            rows = [frame_inds[(step_nums[step.name], frame_num)]
+                    for _, step, frame_num in request_frames]
+            request_values = values[np.ix_(
+                rows, np.searchsorted(all_labels, labels),
+                [all_variables.index(var) for var in request.variables])]
+            step = [frame[0] for frame in request_frames]
+            incr = [frame[2] for frame in request_frames]
+            if request.function == 'get_multiple_positions':
+                request.result = ResultArray(
+                    request_values[:, :, 0], range(len(labels)), step, incr,
+                    time[rows], node=mesh_table.coordinates(labels))
+            elif request.function == 'get_multiple_variables':
+                request.result = ResultArray(request_values[:, 0, :],
+                                             request.variables, step, incr,
+                                             time[rows])
+            else:
+                request.result = {'step': step, 'incr': incr,
+                                  'time': time[rows], 'label': labels,
+                                  'node': mesh_table.coordinates(labels),
+                                  'variables': list(request.variables),
+                                  'values': request_values}
@@ -0,0 +1,330 @@
+""" Extraction of nodal results at arbitrary points, e.g. along a line
+through the mesh, by interpolation with the element shape functions.
+
+The element containing each point is found with the element spatial
+index of the mesh table, and the shape function weights are calculated
+once. The interpolation matrix (points x nodes) has a fixed number of
+nonzeros per row, and is stored as the node column and weight of each
+nonzero. The values for all frames are then interpolated with one
+vectorized product.
+
+Supported elements are the continuum elements C3D8, C3D20 and C3D27
+(hexahedra), C3D4 and C3D10 (tetrahedra) and the 2d elements CPS, CPE,
+CAX and CGAX (quadrilaterals and triangles). Quadratic elements are
+interpolated linearly between their corner nodes. Other elements, e.g.
+beams and shells, are ignored.
+"""
+from __future__ import print_function, division
+import re
+import numpy as np
+
+from odb_scripts.mesh_table import get_mesh_table
+from odb_scripts.odb_pool import get_odb
+from odb_scripts.frame_cache import region_key
+from odb_scripts.bulk_data import get_active_frames, read_nodal_values
+from odb_scripts.instrumentation import instrumented, phase, count
+
+
+@instrumented
+def get_path_values(odb, inst_name, points, variables, step_numbers,
+                    increments=['0:-1'], tol=1.e-6):
+    """ Get given variables from odb, interpolated at given points, for
+    specified steps and increments
+
+    :param odb: The odb object to extract results from, or the path to
+                the odb file, see :py:mod:`odb_scripts.odb_pool`
+    :type odb: Odb object (Abaqus) or str
+
+    :param inst_name: The name of the instance to get results for
+    :type inst_name: str
+
+    :param points: The points to interpolate at, e.g. from
+                   :py:func:`line_points`. Alternatively, a probe
+                   created earlier for the same instance, to reuse the
+                   element search and the weights.
+    :type points: list[ list[ float ] ] or :py:class:`Probe`
+
+    :param variables: List of nodal variables to extract, e.g. ['U1']
+    :type variables: list[ str ]
+
+    :param step_numbers: List of step numbers from which to extract results
+    :type step_numbers: list[ int ]
+
+    :param increments: List of increments from which to extract results.
+                       ['0:-1'] implies all increments. Opposed to
+                       python lists, the last given index is included.
+    :type increments: list[ int ]
+
+    :param tol: Tolerance in natural coordinates for points on the
+                element boundaries
+    :type tol: float
+
+    :returns: Dictionary describing the results with fields
+
+              - "step"
+              - "incr"
+              - "time"
+              - "points": The points (P x 3)
+              - "element": The label of the element containing each
+                point, -1 for points outside the mesh
+              - "variables": The variable names (M)
+              - "values": Array with dimensions frames x P x M. The
+                values for points outside the mesh are NaN.
+
+    :rtype: dict
+
+    """
+    odb = get_odb(odb)
+    mesh_table = get_mesh_table(odb, inst_name)
+    if isinstance(points, Probe):
+        probe = points
+    else:
+        with phase('probe_setup'):
+            probe = Probe(mesh_table, points, tol)
+
+    frames = get_active_frames(odb, step_numbers, increments)
+    odb_inst = odb.rootAssembly.instances[inst_name]
+    nodal_values, time = read_nodal_values(
+        frames, variables, odb_inst, probe.node_labels,
+        cache_key=region_key(odb, inst_name))
+    with phase('interpolation'):
+        values = probe.interpolate(nodal_values)
+
+    return {'step': [frame[0] for frame in frames],
+            'incr': [frame[2] for frame in frames],
+            'time': time,
+            'points': probe.points,
+            'element': probe.element_labels,
+            'variables': list(variables),
+            'values': values}
+
+
+def line_points(start, end, num_points):
+    """ Get equally spaced points on a line, including the end points
+
+    :param start: The start point
+    :type start: list[ float ]
+
+    :param end: The end point
+    :type end: list[ float ]
+
+    :param num_points: The number of points
+    :type num_points: int
+
+    :returns: The points, one row per point
+    :rtype: np.array
+
+    """
+    factor = np.linspace(0.0, 1.0, num_points)[:, np.newaxis]
+    start = np.asarray(start, dtype=np.float64)
+    return start + factor*(np.asarray(end, dtype=np.float64) - start)
+
+
+class Probe(object):
+    """ Interpolation of nodal values at given points in an instance
+
+    :param mesh_table: The mesh table of the instance
+    :type mesh_table: :py:class:`odb_scripts.mesh_table.MeshTable`
+
+    :param points: The points, one row per point. Points with 2
+                   coordinates are padded with z=0.
+    :type points: list[ list[ float ] ]
+
+    :param tol: Tolerance in natural coordinates for points on the
+                element boundaries
+    :type tol: float
+
+    """
+
+    def __init__(self, mesh_table, points, tol=1.e-6):
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        dim = mesh_table.coords.shape[1]
+        if points.shape[1] < dim:
+            points = np.hstack((points, np.zeros((len(points),
+                                                  dim - points.shape[1]))))
+        self.points = points
+        num_points = len(points)
+
+        node_inds = mesh_table.element_node_indices()
+        families = [_element_family(element_type)
+                    for element_type in mesh_table.element_types]
+        point_inds, elem_inds = mesh_table.element_grid.candidates(points)
+        count('probe_candidates', len(point_inds))
+
+        # Locate the points, trying the candidates of one element family
+        # at a time. The first element found is used for each point.
+        element_inds = -np.ones(num_points, dtype=np.int64)
+        self.weights = np.zeros((num_points, 8))
+        columns = np.zeros((num_points, 8), dtype=np.int64)
+        elem_families = np.array([family or '' for family in families])
+        for name, family in _FAMILIES.items():
+            pairs = np.nonzero(elem_families[elem_inds] == name)[0]
+            pairs = pairs[element_inds[point_inds[pairs]] < 0]
+            if len(pairs) == 0:
+                continue
+            num_corners = family['num_nodes']
+            pair_nodes = node_inds[elem_inds[pairs], :num_corners]
+            pair_points = point_inds[pairs]
+            sdim = family['dim']
+            natural, inside = _natural_coordinates(
+                family, mesh_table.coords[pair_nodes][:, :, :sdim],
+                points[pair_points, :sdim], tol)
+            # First inside candidate for each point
+            first = np.unique(pair_points[inside], return_index=True)[1]
+            found = np.nonzero(inside)[0][first]
+            rows = pair_points[found]
+            element_inds[rows] = elem_inds[pairs[found]]
+            self.weights[rows, :num_corners] = family['shape'](natural[found])
+            columns[rows, :num_corners] = pair_nodes[found]
+
+        self.found = element_inds >= 0
+        self.element_labels = -np.ones(num_points, dtype=np.int64)
+        self.element_labels[self.found] = (
+            mesh_table.element_labels[element_inds[self.found]])
+
+        # Nodes used in the interpolation, and the column of each weight
+        nonzero = self.weights != 0
+        node_rows, inverse = np.unique(columns[nonzero], return_inverse=True)
+        self.node_labels = mesh_table.labels[node_rows]
+        self.columns = np.zeros_like(columns)
+        self.columns[nonzero] = inverse
+        count('probe_points_found', int(np.sum(self.found)))
+
+    def interpolate(self, nodal_values):
+        """ Interpolate nodal values at the points
+
+        :param nodal_values: The values at the nodes in
+                             :py:attr:`node_labels`, with the nodes in
+                             the second to last axis, e.g. frames x
+                             nodes x variables
+        :type nodal_values: np.array
+
+        :returns: The interpolated values, with the nodes replaced by
+                  the points. Values for points outside the mesh are
+                  NaN.
+        :rtype: np.array
+
+        """
+        nodal_values = np.asarray(nodal_values)
+        if len(self.node_labels) == 0:  # No points inside the mesh
+            return np.full(nodal_values.shape[:-2] + (len(self.points),)
+                           + nodal_values.shape[-1:], np.nan)
+        gathered = nodal_values[..., self.columns, :]
+        values = np.einsum('pk,...pkv->...pv', self.weights, gathered)
+        values[..., ~self.found, :] = np.nan
+        return values
+
+
+def _element_family(element_type):
+    """ Get the name of the interpolation family for an element type,
+    None for unsupported elements
+    """
+    match = re.match(r'^(C3D|CPS|CPE|CAX|CGAX)(\d+)', str(element_type))
+    if match is None:
+        return None
+    num_nodes = int(match.group(2))
+    if match.group(1) == 'C3D':
+        return {8: 'hex', 20: 'hex', 27: 'hex',
+                4: 'tet', 10: 'tet'}.get(num_nodes)
+    return {4: 'quad', 8: 'quad', 9: 'quad', 3: 'tri', 6: 'tri'}.get(num_nodes)
+
+
+def _hex_shape(xi):
+    signs = np.array([[-1, -1, -1], [1, -1, -1], [1, 1, -1], [-1, 1, -1],
+                      [-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1]])
+    return np.prod(1 + xi[:, np.newaxis, :]*signs, axis=2)/8.0
+
+
+def _hex_derivatives(xi):
+    signs = np.array([[-1, -1, -1], [1, -1, -1], [1, 1, -1], [-1, 1, -1],
+                      [-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1]])
+    factors = 1 + xi[:, np.newaxis, :]*signs
+    deriv = np.empty(factors.shape)
+    for d in range(3):
+        others = [i for i in range(3) if i != d]
+        deriv[:, :, d] = (signs[:, d]*factors[:, :, others[0]]
+                          * factors[:, :, others[1]])/8.0
+    return deriv
+
+
+def _quad_shape(xi):
+    signs = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]])
+    return np.prod(1 + xi[:, np.newaxis, :]*signs, axis=2)/4.0
+
+
+def _quad_derivatives(xi):
+    signs = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]])
+    factors = 1 + xi[:, np.newaxis, :]*signs
+    deriv = np.empty(factors.shape)
+    deriv[:, :, 0] = signs[:, 0]*factors[:, :, 1]/4.0
+    deriv[:, :, 1] = signs[:, 1]*factors[:, :, 0]/4.0
+    return deriv
+
+
+def _simplex_shape(xi):
+    return np.hstack((1 - np.sum(xi, axis=1, keepdims=True), xi))
+
+
+def _simplex_derivatives(xi):
+    dim = xi.shape[1]
+    deriv = np.vstack((-np.ones((1, dim)), np.eye(dim)))
+    return np.tile(deriv, (len(xi), 1, 1))
+
+
+_FAMILIES = {
+    'hex': {'dim': 3, 'num_nodes': 8, 'simplex': False,
+            'shape': _hex_shape, 'derivatives': _hex_derivatives},
+    'tet': {'dim': 3, 'num_nodes': 4, 'simplex': True,
+            'shape': _simplex_shape, 'derivatives': _simplex_derivatives},
+    'quad': {'dim': 2, 'num_nodes': 4, 'simplex': False,
+             'shape': _quad_shape, 'derivatives': _quad_derivatives},
+    'tri': {'dim': 2, 'num_nodes': 3, 'simplex': True,
+            'shape': _simplex_shape, 'derivatives': _simplex_derivatives}}
+
+
+def _natural_coordinates(family, node_coords, points, tol, iterations=10):
+    """ Find the natural coordinates of points in elements with Newton
+    iterations, vectorized over all (point, element) pairs
+
+    :param family: The element family, see _FAMILIES
+    :type family: dict
+
+    :param node_coords: The corner node coordinates, pairs x nodes x dim
+    :type node_coords: np.array
+
+    :param points: The point of each pair, pairs x dim
+    :type points: np.array
+
+    :param tol: Tolerance in natural coordinates
+    :type tol: float
+
+    :returns: The natural coordinates, and if the point is inside the
+              element
+    :rtype: (np.array, np.array)
+
+    """
+    dim = family['dim']
+    if family['simplex']:
+        xi = np.full((len(points), dim), 1.0/(dim + 1))
+    else:
+        xi = np.zeros((len(points), dim))
+    for _ in range(iterations):
+        shape = family['shape'](xi)
+        residual = points - np.einsum('pn,pnd->pd', shape, node_coords)
+        jacobian = np.einsum('pnd,pne->pde', node_coords,
+                             family['derivatives'](xi))
+        singular = np.abs(np.linalg.det(jacobian)) < 1.e-300
+        jacobian[singular] = np.eye(dim)
+        delta = np.linalg.solve(jacobian, residual[:, :, np.newaxis])[:, :, 0]
+        delta[singular] = 0.0
+        xi += delta
+        # Limit the natural coordinates for points far outside the
+        # element, to keep the iterations stable
+        np.clip(xi, -10.0, 10.0, out=xi)
+        if np.all(np.abs(delta) < tol*1.e-3):
+            break
+    if family['simplex']:
+        inside = np.all(family['shape'](xi) >= -tol, axis=1)
+    else:
+        inside = np.all(np.abs(xi) <= 1.0 + tol, axis=1)
+    return xi, inside
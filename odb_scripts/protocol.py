@@ -0,0 +1,148 @@
+""" Message format for the odb query server, see
+:py:mod:`odb_scripts.server` and :py:mod:`odb_scripts.client`. This
+module only depends on numpy, such that it can be used both in Abaqus
+python and in a plain python environment.
+
+Each message consists of
+
+- 8 bytes: The length of the json header, big endian unsigned integer
+- The json header, utf-8 encoded, with the items 'body' (the message
+  content, where numpy arrays are replaced by {'__array__': index}) and
+  'arrays' (dtype, shape and number of bytes for each array)
+- The raw data of each array, C order, in the order given by the header
+
+The arrays are received directly into a buffer, and the numpy arrays
+in the decoded message are views into that buffer.
+"""
+from __future__ import print_function, division
+import json
+import struct
+import numpy as np
+
+from odb_scripts.results import ResultArray
+
+
+_LENGTH = struct.Struct('>Q')
+
+
+def send_message(sock, body):
+    """ Send a message
+
+    :param sock: The connected socket
+    :type sock: socket.socket
+
+    :param body: The message content, containing json compatible values,
+                 numpy arrays and :py:class:`ResultArray` objects
+    :type body: dict
+
+    """
+    arrays = []
+    header = {'body': encode(body, arrays),
+              'arrays': [{'dtype': array.dtype.str,
+                          'shape': list(array.shape),
+                          'nbytes': int(array.nbytes)}
+                         for array in arrays]}
+    header = json.dumps(header).encode('utf-8')
+    sock.sendall(_LENGTH.pack(len(header)) + header)
+    for array in arrays:
+        if array.nbytes > 0:
+            sock.sendall(array.data)
+
+
+def recv_message(sock):
+    """ Receive a message
+
+    :param sock: The connected socket
+    :type sock: socket.socket
+
+    :returns: The message content, or None if the connection was closed
+              before a new message started
+    :rtype: dict
+
+    """
+    length = _recv_exact(sock, _LENGTH.size, allow_eof=True)
+    if length is None:
+        return None
+    header = json.loads(_recv_exact(sock, _LENGTH.unpack(length)[0])
+                        .decode('utf-8'))
+    arrays = []
+    for spec in header['arrays']:
+        buf = _recv_exact(sock, spec['nbytes'])
+        arrays.append(np.frombuffer(buf, dtype=np.dtype(str(spec['dtype'])))
+                      .reshape(spec['shape']))
+    return decode(header['body'], arrays)
+
+
+def encode(obj, arrays):
+    """ Convert an object to json compatible values, replacing numpy
+    arrays by references to the list arrays
+
+    :param obj: The object to encode
+    :type obj: dict, list, np.array, ResultArray, or json compatible
+
+    :param arrays: The arrays to send, encoded arrays are appended
+    :type arrays: list[ np.array ]
+
+    :returns: The json compatible object
+
+    """
+    if isinstance(obj, ResultArray):
+        return {'__result_array__': encode(
+            {'values': obj.data, 'keys': obj.column_keys,
+             'step': obj.step, 'incr': obj.incr, 'time': obj.time,
+             'info': obj.info}, arrays)}
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            return obj.tolist()
+        arrays.append(np.ascontiguousarray(obj))
+        return {'__array__': len(arrays) - 1}
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    elif isinstance(obj, dict):
+        return dict((key, encode(value, arrays))
+                    for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        return [encode(value, arrays) for value in obj]
+    return obj
+
+
+def decode(obj, arrays):
+    """ Reverse :py:func:`encode`
+
+    :param obj: The json compatible object
+    :type obj: dict, list, or json compatible
+
+    :param arrays: The received arrays
+    :type arrays: list[ np.array ]
+
+    :returns: The decoded object
+
+    """
+    if isinstance(obj, dict):
+        if '__array__' in obj:
+            return arrays[obj['__array__']]
+        elif '__result_array__' in obj:
+            fields = decode(obj['__result_array__'], arrays)
+            return ResultArray(fields['values'], fields['keys'],
+                               fields['step'], fields['incr'],
+                               fields['time'], **fields['info'])
+        return dict((key, decode(value, arrays))
+                    for key, value in obj.items())
+    elif isinstance(obj, list):
+        return [decode(value, arrays) for value in obj]
+    return obj
+
+
+def _recv_exact(sock, num_bytes, allow_eof=False):
+    """ Receive exactly num_bytes into a new buffer """
+    buf = bytearray(num_bytes)
+    view = memoryview(buf)
+    received = 0
+    while received < num_bytes:
+        num = sock.recv_into(view[received:], num_bytes - received)
+        if num == 0:
+            if allow_eof and received == 0:
+                return None
+            raise EOFError('Connection closed in the middle of a message')
+        received += num
+    return buf
@@ -0,0 +1,240 @@
+""" Reductions of a variable over a node or element set, e.g. the total
+reaction force or the peak stress, computed frame by frame directly
+from the field output bulk data blocks. Opposed to extracting the
+values with :py:func:`odb_scripts.bulk_data.get_multiple_positions` and
+reducing afterwards, only the reduced series are stored, and no per
+node time series is built.
+
+Usage::
+
+    from odb_scripts.reductions import get_set_reduction
+    data = get_set_reduction(odb, 'PART-1-1', 'SUPPORT', 'RF2', [0, 1],
+                             reductions=['sum'])
+    data = get_set_reduction(odb, 'PART-1-1', 'WELD', 'MISES', [1],
+                             reductions=['max', 'p99'])
+    peak, label = data['max'], data['max_label']
+"""
+from __future__ import print_function, division
+import re
+import numpy as np
+
+from odb_scripts.bulk_data import (get_active_frames, get_component_indices,
+                                   split_variable)
+from odb_scripts.odb_pool import get_odb
+from odb_scripts.results import ResultArray
+from odb_scripts import derived
+from odb_scripts.instrumentation import instrumented, phase, count
+
+
+REDUCTIONS = ('sum', 'min', 'max', 'mean')
+
+
+@instrumented
+def get_set_reduction(odb, inst_name, set_name, variable, step_numbers,
+                      increments=['0:-1'], reductions=['sum']):
+    """ Get reductions of a variable over a set, for specified steps and
+    increments
+
+    :param odb: The odb object to extract results from, or the path to
+                the odb file, see :py:mod:`odb_scripts.odb_pool`
+    :type odb: Odb object (Abaqus) or str
+
+    :param inst_name: The name of the instance to get results for
+    :type inst_name: str
+
+    :param set_name: The name of a node or element set in the instance.
+                     If both a node set and an element set have the
+                     name, the node set is used for nodal field outputs
+                     and the element set otherwise. A ValueError is
+                     raised if the field output has no values in the
+                     element set, as the position cannot be determined.
+    :type set_name: str
+
+    :param variable: The variable to reduce, e.g. 'RF2' or 'S22'.
+                     Derived quantities, e.g. 'MISES', are computed from
+                     all components, see :py:mod:`odb_scripts.derived`.
+    :type variable: str
+
+    :param step_numbers: List of step numbers from which to extract results
+    :type step_numbers: list[ int ]
+
+    :param increments: List of increments from which to extract results.
+                       ['0:-1'] implies all increments. Opposed to
+                       python lists, the last given index is included.
+    :type increments: list[ int ]
+
+    :param reductions: The reductions to compute over the values in the
+                       set: 'sum', 'min', 'max', 'mean', or percentiles
+                       formatted as 'p' + percentage, e.g. 'p99' or
+                       'p99.9'. For values at integration points, each
+                       integration point is one value.
+    :type reductions: list[ str ]
+
+    :returns: The reduced series, with one key per reduction. 'min' and
+              'max' add the keys 'min_label' and 'max_label', giving
+              the label of the node (nodal values) or element
+              (integration point values) where the extreme value is
+              found.
+    :rtype: :py:class:`odb_scripts.results.ResultArray`
+
+    """
+    odb = get_odb(odb)
+    odb_inst = odb.rootAssembly.instances[inst_name]
+    keys = []
+    for reduction in reductions:
+        _percentage(reduction)  # Check the reduction before reading
+        keys.append(reduction)
+        if reduction in ('min', 'max'):
+            keys.append(reduction + '_label')
+    frames = get_active_frames(odb, step_numbers, increments)
+    field_names = []
+    if frames:
+        step_ind, step, frame_num = frames[0]
+        field_names = list(step.frames[frame_num].fieldOutputs.keys())
+    field_name, component = split_variable(variable, field_names)
+    values = np.empty((len(frames), len(keys)))
+    time = np.empty(len(frames))
+    region = None
+    for frame_ind, (step_ind, step, frame_num) in enumerate(frames):
+        with phase('field_read'):
+            frame = step.frames[frame_num]
+            time[frame_ind] = step.totalTime + frame.frameValue
+            field = frame.fieldOutputs[field_name]
+            if region is None:
+                region = _get_set_region(odb_inst, set_name, field)
+            blocks = field.getSubset(region=region).bulkDataBlocks
+            reducer = SetReducer(reductions)
+            for block in blocks:
+                reducer.add(_block_values(block, field, component),
+                            _block_labels(block))
+            count('bulk_blocks_read', len(blocks))
+        with phase('reduction'):
+            values[frame_ind] = reducer.result()
+        count('frames_read')
+    count('bytes_produced', values.nbytes + time.nbytes)
+
+    return ResultArray(values, keys, [frame[0] for frame in frames],
+                       [frame[2] for frame in frames], time)
+
+
+class SetReducer(object):
+    """ Accumulate reductions over the values of one frame, given in
+    parts, e.g. one part per bulk data block. Sums, extremes and counts
+    are updated for each part, only percentiles keep the values.
+
+    :param reductions: The reductions, see :py:func:`get_set_reduction`
+    :type reductions: list[ str ]
+
+    """
+
+    def __init__(self, reductions):
+        self.reductions = list(reductions)
+        self.num_values = 0
+        self.total = 0.0
+        self.extremes = {'min': (np.inf, -1), 'max': (-np.inf, -1)}
+        self.parts = []
+        self.keep_values = any(_percentage(reduction) is not None
+                               for reduction in self.reductions)
+
+    def add(self, values, labels):
+        """ Add values to the reductions
+
+        :param values: The values
+        :type values: np.array
+
+        :param labels: The node or element label of each value
+        :type labels: np.array
+
+        """
+        if len(values) == 0:
+            return
+        self.num_values += len(values)
+        self.total += np.sum(values, dtype=np.float64)
+        for name, arg_function, better in (('min', np.argmin, np.less),
+                                           ('max', np.argmax, np.greater)):
+            if name in self.reductions:
+                ind = arg_function(values)
+                if better(values[ind], self.extremes[name][0]):
+                    self.extremes[name] = (values[ind], labels[ind])
+        if self.keep_values:
+            self.parts.append(np.asarray(values, dtype=np.float64))
+
+    def result(self):
+        """ Get the reduced values, in the order of the keys of
+        :py:func:`get_set_reduction`
+
+        :rtype: list[ float ]
+
+        """
+        if self.num_values == 0:
+            raise ValueError('No values found in the set')
+        if self.keep_values:
+            values = np.concatenate(self.parts)
+        result = []
+        for reduction in self.reductions:
+            if reduction == 'sum':
+                result.append(self.total)
+            elif reduction == 'mean':
+                result.append(self.total/self.num_values)
+            elif reduction in self.extremes:
+                result += self.extremes[reduction]
+            else:
+                result.append(np.percentile(values, _percentage(reduction)))
+        return result
+
+
+def _percentage(reduction):
+    """ Get the percentage of a percentile reduction, e.g. 99.9 for
+    'p99.9', None for the other reductions
+    """
+    if reduction in REDUCTIONS:
+        return None
+    match = re.match(r'^p(\d+(\.\d*)?)$', str(reduction))
+    if match is None or float(match.group(1)) > 100.0:
+        raise ValueError('Unknown reduction "' + str(reduction) + '", must '
+                         + 'be one of ' + ', '.join(REDUCTIONS) + ' or a '
+                         + 'percentile, e.g. "p99"')
+    return float(match.group(1))
+
+
+def _get_set_region(odb_inst, set_name, field):
+    """ Get the node or element set to use for a field output """
+    in_node_sets = set_name in odb_inst.nodeSets.keys()
+    in_element_sets = set_name in odb_inst.elementSets.keys()
+    if in_node_sets and in_element_sets:
+        # Use the node set for nodal values
+        element_set = odb_inst.elementSets[set_name]
+        for block in field.getSubset(region=element_set).bulkDataBlocks:
+            if block.elementLabels is None:
+                return odb_inst.nodeSets[set_name]
+            return element_set
+        raise ValueError('The name "' + set_name + '" is both a node set '
+                         + 'and an element set in the instance '
+                         + odb_inst.name + ', and the field output '
+                         + field.name + ' has no values in the element '
+                         + 'set')
+    if in_element_sets:
+        return odb_inst.elementSets[set_name]
+    if in_node_sets:
+        return odb_inst.nodeSets[set_name]
+    raise KeyError('Could not find the set "' + set_name + '" in the '
+                   + 'instance ' + odb_inst.name)
+
+
+def _block_values(block, field, component):
+    """ Get the values of one component or derived quantity in a block """
+    data = np.asarray(block.data)
+    data = data.reshape(data.shape[0], -1)
+    if derived.is_derived(component, [field.name]):
+        with phase('derived'):
+            return derived.evaluate([component], data,
+                                    list(field.componentLabels),
+                                    field.name)[:, 0]
+    return data[:, get_component_indices(field, [component])[0]]
+
+
+def _block_labels(block):
+    """ Get the node (nodal values) or element label of each value """
+    if block.elementLabels is None:
+        return np.asarray(block.nodeLabels, dtype=np.int64)
+    return np.asarray(block.elementLabels, dtype=np.int64)
@@ -0,0 +1,198 @@
+""" Array backed container for time series results, replacing the
+dictionaries with one array per node or variable. The container behaves
+like the dictionaries, such that ``result[0]``, ``result['U1']``,
+``result['time']`` and ``'time' in result`` work as before, but all
+series are stored in one 2d array and ``result[key]`` is a view into it.
+"""
+from __future__ import print_function, division
+import os
+import json
+import numpy as np
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # Python 2
+    from collections import MutableMapping
+
+
+class ResultArray(MutableMapping):
+    """ Time series for a set of keys (nodes or variables)
+
+    The container is a mutable mapping: besides ``result[key]``,
+    ``values()``, ``items()``, ``get()``, ``update()`` and ``pop()`` work
+    as for the dictionary it replaces. Assigning to a column key writes
+    into the data array, assigning to 'step', 'incr' or 'time' replaces
+    that array, and other keys are stored as additional arrays in info.
+
+    :param data: The values, frames x keys
+    :type data: np.array
+
+    :param keys: The key of each column in data, e.g. node indices
+                 0, 1, ..., N-1 or variable names
+    :type keys: list[ int or str ]
+
+    :param step: The step index of each frame
+    :type step: list[ int ]
+
+    :param incr: The increment (frame number) of each frame
+    :type incr: list[ int ]
+
+    :param time: The time of each frame
+    :type time: np.array
+
+    :param info: Additional arrays, e.g. node=<coordinates>, that can be
+                 accessed as result['node']
+    :type info: np.array
+
+    """
+
+    _frame_keys = ('step', 'incr', 'time')
+    _frame_types = {'step': np.int64, 'incr': np.int64, 'time': np.float64}
+
+    def __init__(self, data, keys, step, incr, time, **info):
+        self.data = np.asarray(data)
+        self.column_keys = list(keys)
+        self.step = np.asarray(step, dtype=np.int64)
+        self.incr = np.asarray(incr, dtype=np.int64)
+        self.time = np.asarray(time, dtype=np.float64)
+        self.info = dict((key, np.asarray(value))
+                         for key, value in info.items())
+        if self.data.shape != (len(self.time), len(self.column_keys)):
+            raise ValueError('data must have the shape (frames, keys) = '
+                             + str((len(self.time), len(self.column_keys)))
+                             + ', but has the shape '
+                             + str(self.data.shape))
+        self._columns = dict((key, ind)
+                             for ind, key in enumerate(self.column_keys))
+
+    def __getitem__(self, key):
+        if key in self._frame_keys:
+            return getattr(self, key)
+        elif key in self.info:
+            return self.info[key]
+        elif key in self._columns:
+            return self.data[:, self._columns[key]]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._frame_keys:
+            value = np.asarray(value, dtype=self._frame_types[key])
+            if value.shape != self.time.shape:
+                raise ValueError('"' + str(key) + '" must have the shape '
+                                 + str(self.time.shape) + ', but has the '
+                                 + 'shape ' + str(value.shape))
+            setattr(self, key, value)
+        elif key in self._columns:
+            self.data[:, self._columns[key]] = value
+        else:
+            self.info[key] = np.asarray(value)
+
+    def __delitem__(self, key):
+        if key in self._frame_keys:
+            raise KeyError('The frame key "' + str(key)
+                           + '" cannot be removed')
+        elif key in self.info:
+            del self.info[key]
+        elif key in self._columns:
+            self.data = np.delete(self.data, self._columns[key], axis=1)
+            self.column_keys.remove(key)
+            self._columns = dict((k, ind) for ind, k
+                                 in enumerate(self.column_keys))
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return (key in self._frame_keys or key in self.info
+                or key in self._columns)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._frame_keys) + len(self.info) + len(self._columns)
+
+    def keys(self):
+        """ All keys, as for the dictionary this container replaces
+
+        :rtype: list
+        """
+        return list(self._frame_keys) + list(self.info) + self.column_keys
+
+    def values(self):
+        """ The arrays of all keys, in the order of :py:meth:`keys`
+
+        :rtype: list[ np.array ]
+        """
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self):
+        """ Convert to a dictionary. The series are views into the
+        data array.
+
+        :rtype: dict
+        """
+        return dict(self.items())
+
+    def save(self, directory):
+        """ Save to a directory with one .npy file per array and a json
+        file with the keys. The arrays can be memory mapped when loading.
+
+        :param directory: The directory to save to, created if needed
+        :type directory: str
+
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        arrays = dict(self.info, values=self.data, step=self.step,
+                      incr=self.incr, time=self.time)
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, name + '.npy'), array)
+        with open(os.path.join(directory, 'keys.json'), 'w') as fid:
+            json.dump({'keys': self.column_keys,
+                       'info': sorted(self.info)}, fid)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """ Load from a directory written by :py:meth:`save`
+
+        :param directory: The directory to load from
+        :type directory: str
+
+        :param mmap_mode: The memory map mode for the arrays, see
+                          :py:func:`numpy.load`. None loads the arrays
+                          into memory. The arrays are not copied when
+                          they already have the correct data type.
+        :type mmap_mode: str
+
+        :rtype: :py:class:`ResultArray`
+
+        """
+        with open(os.path.join(directory, 'keys.json'), 'r') as fid:
+            keys = json.load(fid)
+
+        def load_array(name):
+            return np.load(os.path.join(directory, name + '.npy'),
+                           mmap_mode=mmap_mode)
+
+        info = dict((name, load_array(name)) for name in keys['info'])
+        return cls(load_array('values'), keys['keys'], load_array('step'),
+                   load_array('incr'), load_array('time'), **info)
+
+    @classmethod
+    def concatenate(cls, results):
+        """ Concatenate results for consecutive frames
+
+        :param results: The results, with the same keys, in frame order
+        :type results: list[ :py:class:`ResultArray` ]
+
+        :rtype: :py:class:`ResultArray`
+
+        """
+        return cls(np.concatenate([r.data for r in results]),
+                   results[0].column_keys,
+                   np.concatenate([r.step for r in results]),
+                   np.concatenate([r.incr for r in results]),
+                   np.concatenate([r.time for r in results]),
+                   **results[0].info)
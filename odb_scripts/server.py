@@ -0,0 +1,185 @@
+""" Long running server keeping odb files open and serving extraction
+requests over a local socket. This avoids paying the Abaqus startup and
+the time to open large odb files for every script. The results are
+extracted with the headless engine in :py:mod:`odb_scripts.bulk_data`,
+and are sent as raw numpy buffers, see :py:mod:`odb_scripts.protocol`.
+Use :py:class:`odb_scripts.client.OdbClient` to send requests from any
+python with numpy.
+
+The requests are handled one at a time, as the odb api is not thread
+safe. The server only listens on the local host by default, and does
+not authenticate the clients.
+
+Command line usage::
+
+    abaqus python -m odb_scripts.server --port 50007 job1.odb job2.odb
+"""
+from __future__ import print_function, division
+import sys
+import argparse
+import traceback
+try:
+    import socketserver
+except ImportError:  # Python 2
+    import SocketServer as socketserver
+
+from odb_scripts import bulk_data
+from odb_scripts import node_data
+from odb_scripts.odb_pool import OdbPool
+from odb_scripts.protocol import send_message, recv_message
+
+
+DEFAULT_PORT = 50007
+
+
+FUNCTIONS = {
+    'get_multiple_positions': bulk_data.get_multiple_positions,
+    'get_multiple_variables': bulk_data.get_multiple_variables,
+    'get_multiple_positions_variables':
+        bulk_data.get_multiple_positions_variables,
+    'get_node_labels': node_data.get_node_labels}
+
+
+class OdbServer(socketserver.TCPServer):
+    """ Server keeping odb files open between requests
+
+    :param address: The (host, port) to listen on. Port 0 selects a free
+                    port, see :py:attr:`server_address`.
+    :type address: tuple
+
+    :param odb_module: The name of the module providing the function
+                       openOdb. Can be changed to use a stand-in for
+                       odbAccess.
+    :type odb_module: str
+
+    :param odb_paths: Odb files to open when starting the server. Other
+                      odb files are opened on the first request.
+    :type odb_paths: list[ str ]
+
+    :param max_open: The maximum number of open odb files. The least
+                     recently used odb is closed when more odb files are
+                     requested, see :py:class:`odb_scripts.odb_pool.OdbPool`.
+    :type max_open: int
+
+    """
+
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', DEFAULT_PORT),
+                 odb_module='odbAccess', odb_paths=(), max_open=8):
+        socketserver.TCPServer.__init__(self, address, _RequestHandler)
+        self.pool = OdbPool(max_open=max_open, odb_module=odb_module)
+        self.running = False
+        for odb_path in odb_paths:
+            self.get_odb(odb_path)
+
+    def get_odb(self, odb_path):
+        """ Get an open odb, opening it read only if needed
+
+        :param odb_path: Path to the odb file
+        :type odb_path: str
+
+        :rtype: Odb object (Abaqus)
+
+        """
+        return self.pool.get(odb_path)
+
+    def close_odb(self, odb_path):
+        """ Close an odb, if open, and remove its cached mesh tables and
+        frames
+
+        :param odb_path: Path to the odb file
+        :type odb_path: str
+
+        """
+        self.pool.close(odb_path)
+
+    def serve(self):
+        """ Handle requests until a shutdown request is received, and
+        then close all odb files
+        """
+        self.running = True
+        try:
+            while self.running:
+                self.handle_request()
+        finally:
+            self.pool.close_all()
+            self.server_close()
+
+    def handle_command(self, request):
+        """ Handle one request
+
+        :param request: The request, with the item 'command' and the
+                        items required by that command
+        :type request: dict
+
+        :returns: The result of the request
+        :rtype: object
+
+        """
+        command = request['command']
+        if command == 'call':
+            function = request['function']
+            if function not in FUNCTIONS:
+                raise ValueError('Unknown function "' + function + '", '
+                                 + 'must be one of ' + str(sorted(FUNCTIONS)))
+            odb = self.get_odb(request['odb'])
+            return FUNCTIONS[function](odb, **request['kwargs'])
+        elif command == 'open':
+            self.get_odb(request['odb'])
+            return sorted(self.pool.open_paths())
+        elif command == 'close':
+            self.close_odb(request['odb'])
+            return sorted(self.pool.open_paths())
+        elif command == 'list':
+            return sorted(self.pool.open_paths())
+        elif command == 'ping':
+            return 'pong'
+        elif command == 'shutdown':
+            self.running = False
+            return None
+        raise ValueError('Unknown command "' + str(command) + '"')
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """ Handle all requests on one connection, until it is closed """
+
+    def handle(self):
+        while True:
+            request = recv_message(self.request)
+            if request is None:
+                return
+            try:
+                response = {'status': 'ok',
+                            'result': self.server.handle_command(request)}
+            except Exception:
+                response = {'status': 'error',
+                            'error': traceback.format_exc()}
+            send_message(self.request, response)
+            if not self.server.running:
+                return
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Serve extraction requests for open odb files')
+    parser.add_argument('odb_paths', nargs='*',
+                        help='odb files to open at startup')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--odb-module', default='odbAccess',
+                        help='module providing openOdb')
+    parser.add_argument('--max-open', type=int, default=8,
+                        help='maximum number of open odb files')
+    args = parser.parse_args(args)
+
+    server = OdbServer((args.host, args.port), odb_module=args.odb_module,
+                       odb_paths=args.odb_paths, max_open=args.max_open)
+    print('Serving on ' + '%s:%d' % server.server_address)
+    sys.stdout.flush()
+    server.serve()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+from __future__ import print_function, division
+import numpy as np
+
+
+# Relative extent below which a direction is treated as flat
+_NEGLIGIBLE_EXTENT = 1.e-6
+
+
+class _CellGrid(object):
+    """ Conversion of points to the cells of a uniform grid, with the
+    attributes origin, cell_size and num_cells set by the subclasses
+    """
+
+    def _cell_indices(self, points):
+        cells = np.floor((points - self.origin)/self.cell_size)
+        return cells.astype(np.int64) + 1
+
+    def _cell_keys(self, cell_indices):
+        keys = np.zeros(cell_indices.shape[0], dtype=np.int64)
+        stride = 1
+        for dim in range(cell_indices.shape[1]):
+            keys += cell_indices[:, dim]*stride
+            stride *= self.num_cells[dim]
+        return keys
+
+
+class NodeGrid(_CellGrid):
+    """ Uniform grid spatial index for fast nearest node queries.
+
+    The points are binned into cubic cells, with a cell size chosen
+    such that each cell contains on average about one point. The cells
+    are stored as a sorted array of linear cell keys, such that
+    searching many probe points can be done with vectorized
+    ``searchsorted`` calls instead of python loops.
+
+    :param coords: Coordinates of the points to index, one row per point
+    :type coords: np.array (N x dim)
+
+    :param cell_size: The side length of the grid cells. If None, a
+                      value giving approximately one point per cell is
+                      used.
+    :type cell_size: float
+
+    :param min_cell_size: The smallest allowed cell size. Should be set
+                          to the largest search radius used in
+                          :py:meth:`query`, as the number of searched
+                          cells grows with (tol/cell_size)^dim.
+    :type min_cell_size: float
+
+    """
+
+    def __init__(self, coords, cell_size=None, min_cell_size=0.0):
+        self.coords = np.asarray(coords, dtype=np.float64)
+        if self.coords.ndim != 2:
+            raise ValueError('coords must be a 2d array, one row per point')
+
+        num_points = self.coords.shape[0]
+        if num_points > 0:
+            self.origin = self.coords.min(axis=0)
+            extent = self.coords.max(axis=0) - self.origin
+        else:
+            self.origin = np.zeros(self.coords.shape[1])
+            extent = np.zeros(self.coords.shape[1])
+
+        if cell_size is None:
+            cell_size = _default_cell_size(extent, num_points)
+        self.cell_size = float(max(cell_size, min_cell_size))
+
+        # Number of cells in each direction, the outermost layer on each
+        # side is used for padding such that neighbour cells are unique
+        self.num_cells = np.floor(extent/self.cell_size).astype(np.int64) + 3
+
+        cell_keys = self._cell_keys(self._cell_indices(self.coords))
+        self.order = np.argsort(cell_keys, kind='mergesort')
+        self.sorted_keys = cell_keys[self.order]
+
+    def query(self, points, tol):
+        """ Find the nearest point within tol for each of the given
+        probe points
+
+        :param points: The probe points, one row per point
+        :type points: np.array (M x dim)
+
+        :param tol: The search radius
+        :type tol: float
+
+        :returns: Two arrays of length M: The index (row in coords) of
+                  the nearest point within tol (-1 if no point was
+                  found), and the number of points within tol.
+        :rtype: (np.array, np.array)
+
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        if points.shape[1] != self.coords.shape[1]:
+            raise ValueError('The probe points have dimension '
+                             + str(points.shape[1]) + ', but the indexed '
+                             + 'points have dimension '
+                             + str(self.coords.shape[1]))
+
+        num_points = points.shape[0]
+        nearest = -np.ones(num_points, dtype=np.int64)
+        count = np.zeros(num_points, dtype=np.int64)
+        best_d2 = np.inf*np.ones(num_points)
+
+        probe_cells = self._cell_indices(points)
+        rings = int(np.ceil(tol/self.cell_size))
+        offsets = _neighbour_offsets(self.coords.shape[1], rings)
+        for offset in offsets:
+            cells = probe_cells + offset
+            inside = np.all((cells >= 0) & (cells < self.num_cells), axis=1)
+            probe_ind = np.nonzero(inside)[0]
+            keys = self._cell_keys(cells[probe_ind])
+            first = np.searchsorted(self.sorted_keys, keys, side='left')
+            last = np.searchsorted(self.sorted_keys, keys, side='right')
+
+            # Expand the (probe, candidate) pairs
+            num_candidates = last - first
+            probe_ind = np.repeat(probe_ind, num_candidates)
+            if len(probe_ind) == 0:
+                continue
+            starts = np.repeat(first - np.cumsum(num_candidates)
+                               + num_candidates, num_candidates)
+            candidates = self.order[starts + np.arange(len(probe_ind))]
+
+            d2 = np.sum((self.coords[candidates] - points[probe_ind])**2,
+                        axis=1)
+            within = d2 < tol**2
+            probe_ind = probe_ind[within]
+            candidates = candidates[within]
+            d2 = d2[within]
+
+            count += np.bincount(probe_ind, minlength=num_points)
+
+            # Keep the nearest candidate for each probe point. Sorting by
+            # decreasing distance ensures that the nearest candidate is
+            # the one written last for probe points occuring many times
+            sort_ind = np.argsort(-d2, kind='mergesort')
+            probe_ind = probe_ind[sort_ind]
+            candidates = candidates[sort_ind]
+            d2 = d2[sort_ind]
+            better = d2 < best_d2[probe_ind]
+            best_d2[probe_ind[better]] = d2[better]
+            nearest[probe_ind[better]] = candidates[better]
+
+        return nearest, count
+
+
+class ElementGrid(_CellGrid):
+    """ Uniform grid spatial index of element bounding boxes, for finding
+    the candidate elements containing many probe points.
+
+    Each element is added to all cells overlapped by its bounding box,
+    and the (cell, element) pairs are stored as sorted linear cell keys
+    as in :py:class:`NodeGrid`. The candidates of a point are the
+    elements in the cell containing the point.
+
+    :param box_min: The lower corner of the bounding box of each element
+    :type box_min: np.array (E x dim)
+
+    :param box_max: The upper corner of the bounding box of each element
+    :type box_max: np.array (E x dim)
+
+    :param cell_size: The side length of the grid cells. If None, the
+                      median of the largest bounding box side is used.
+    :type cell_size: float
+
+    """
+
+    def __init__(self, box_min, box_max, cell_size=None):
+        box_min = np.asarray(box_min, dtype=np.float64)
+        box_max = np.asarray(box_max, dtype=np.float64)
+        if len(box_min) > 0:
+            self.origin = box_min.min(axis=0)
+            extent = box_max.max(axis=0) - self.origin
+        else:
+            self.origin = np.zeros(box_min.shape[1])
+            extent = np.zeros(box_min.shape[1])
+
+        if cell_size is None:
+            cell_size = 0.0
+            if len(box_min) > 0:
+                cell_size = np.median(np.max(box_max - box_min, axis=1))
+            if not cell_size > 0:
+                cell_size = _default_cell_size(extent, len(box_min))
+        self.cell_size = float(cell_size)
+        self.num_cells = np.floor(extent/self.cell_size).astype(np.int64) + 3
+
+        first = self._cell_indices(box_min)
+        last = self._cell_indices(box_max)
+        span = last - first + 1
+        # Expand each element to the cells of its own span, such that a
+        # few large elements do not make the build loop over the cells of
+        # the largest span for all elements
+        counts = np.prod(span, axis=1)
+        elements = np.repeat(np.arange(len(span)), counts)
+        local = (np.arange(len(elements))
+                 - np.repeat(np.cumsum(counts) - counts, counts))
+        cells = np.empty((len(elements), span.shape[1]), dtype=np.int64)
+        for axis in range(span.shape[1] - 1, -1, -1):
+            axis_span = span[elements, axis]
+            cells[:, axis] = first[elements, axis] + local % axis_span
+            local = local//axis_span
+        keys = self._cell_keys(cells)
+        order = np.argsort(keys, kind='mergesort')
+        self.sorted_keys = keys[order]
+        self.elements = elements[order]
+
+    def candidates(self, points):
+        """ Get the candidate elements for each point
+
+        :param points: The probe points, one row per point
+        :type points: np.array (M x dim)
+
+        :returns: The (point index, element index) pairs, as two arrays.
+                  The pairs are ordered by point index.
+        :rtype: (np.array, np.array)
+
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        cells = self._cell_indices(points)
+        inside = np.all((cells >= 0) & (cells < self.num_cells), axis=1)
+        point_inds = np.nonzero(inside)[0]
+        keys = self._cell_keys(cells[point_inds])
+        first = np.searchsorted(self.sorted_keys, keys, side='left')
+        last = np.searchsorted(self.sorted_keys, keys, side='right')
+        num_candidates = last - first
+        point_inds = np.repeat(point_inds, num_candidates)
+        starts = np.repeat(first - np.cumsum(num_candidates) + num_candidates,
+                           num_candidates)
+        return point_inds, self.elements[starts + np.arange(len(point_inds))]
+
+
+def _default_cell_size(extent, num_points):
+    """ Get a cell size giving approximately one point per cell.
+    Directions without extent (e.g. z for 2d models) are not counted,
+    nor directions with an extent that is negligible compared to the
+    largest extent (e.g. round-off noise in z for planar meshes).
+    """
+    extent = np.asarray(extent, dtype=np.float64)
+    if len(extent) == 0 or num_points < 2 or not np.max(extent) > 0:
+        return 1.0
+    nonzero_extent = extent[extent > _NEGLIGIBLE_EXTENT*np.max(extent)]
+    volume = np.prod(nonzero_extent)
+    return (volume/num_points)**(1.0/len(nonzero_extent))
+
+
+def _neighbour_offsets(dim, rings):
+    """ Get all cell offsets within the given number of rings """
+    ring_range = np.arange(-rings, rings + 1)
+    grids = np.meshgrid(*([ring_range]*dim), indexing='ij')
+    return np.transpose([g.ravel() for g in grids])
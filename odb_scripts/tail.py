@@ -0,0 +1,246 @@
+""" Incremental extraction from odb files of jobs that are still running.
+Each call only reads the frames written since the previous call, and
+appends them to a result store on disk, such that the cost of a poll
+does not grow with the length of the job::
+
+    from odb_scripts.tail import extract_tail, load_tail
+    spec = {'inst_name': 'PART-1-1', 'positions': 'TOP', 'variable': 'U2',
+            'step_numbers': [0, 1]}
+    while job_is_running():
+        extract_tail('job.odb', spec, 'u2_store')
+        time.sleep(60)
+    result = load_tail('u2_store')
+
+The store directory contains one raw binary file per array, with the
+frames appended as rows, and the state file tail.json. The state file
+holds the extraction spec, the number of stored rows and the last
+extracted (step, frame). It is written after the rows are appended, and
+rows beyond the stored row count, e.g. from an interrupted poll, are
+overwritten by the next poll.
+
+Command line usage, polling until the lock file of the job is removed::
+
+    abaqus python -m odb_scripts.tail spec.json u2_store job.odb -i 60
+"""
+from __future__ import print_function, division
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+from odb_scripts.batch import EXTRACTION_FUNCTIONS
+from odb_scripts.bulk_data import get_active_frames
+from odb_scripts.odb_pool import get_odb
+from odb_scripts.results import ResultArray
+from odb_scripts.instrumentation import instrumented, phase, count
+
+
+STATE_FILE = 'tail.json'
+
+
+@instrumented
+def extract_tail(odb, spec, directory):
+    """ Extract the frames written since the previous call, and append
+    them to a store
+
+    :param odb: The odb object to extract results from, or the path to
+                the odb file, see :py:mod:`odb_scripts.odb_pool`. The
+                odb is updated to the latest data written by the job
+                before extracting.
+    :type odb: Odb object (Abaqus) or str
+
+    :param spec: The extraction specification, see
+                 :py:func:`odb_scripts.batch.extract_many`. Steps in
+                 step_numbers that are not yet in the odb are skipped,
+                 and step_numbers should therefore be ascending and
+                 non-negative. Likewise, increments should be ranges
+                 extending to the end of the steps, e.g. ['0:-1'].
+    :type spec: dict
+
+    :param directory: The store directory, created by the first call
+    :type directory: str
+
+    :returns: The number of appended frames
+    :rtype: int
+
+    :raises ValueError: If the store was created with a different spec
+
+    """
+    odb = get_odb(odb)
+    if hasattr(odb, 'update'):  # Read the data written since opening
+        with phase('odb_update'):
+            odb.update()
+
+    spec = json.loads(json.dumps(spec))  # Compare as stored in the state
+    state = read_state(directory)
+    if state is not None and state['spec'] != spec:
+        raise ValueError('The store "' + directory + '" was created with '
+                         + 'the spec ' + str(state['spec']) + ', not '
+                         + str(spec))
+    kwargs = dict(spec)
+    function = kwargs.pop('function', 'get_multiple_positions')
+    if function not in EXTRACTION_FUNCTIONS:
+        raise ValueError('Unknown extraction function "' + function + '", '
+                         + 'must be one of '
+                         + str(sorted(EXTRACTION_FUNCTIONS)))
+
+    num_steps = len(odb.steps.keys())
+    kwargs['step_numbers'] = [step_num for step_num in kwargs['step_numbers']
+                              if step_num < num_steps]
+    frames = get_active_frames(odb, kwargs['step_numbers'],
+                               kwargs.get('increments', ['0:-1']))
+    start = 0
+    if state is not None and state['last'] is not None:
+        last = tuple(state['last'])
+        while start < len(frames) and (frames[start][0],
+                                       frames[start][2]) <= last:
+            start += 1
+    count('tail_frames_skipped', start)
+    if start == len(frames):
+        return 0
+
+    result = EXTRACTION_FUNCTIONS[function](
+        odb, frame_range=(start, len(frames)), **kwargs)
+    with phase('store_append'):
+        append_result(directory, result, spec, state)
+    return len(frames) - start
+
+
+def append_result(directory, result, spec, state=None):
+    """ Append the frames of a result to a store, and update the state
+    file
+
+    :param directory: The store directory
+    :type directory: str
+
+    :param result: The frames to append
+    :type result: :py:class:`odb_scripts.results.ResultArray`
+
+    :param spec: The extraction spec, saved in the state file
+    :type spec: dict
+
+    :param state: The current state, as given by :py:func:`read_state`.
+                  None creates a new store, replacing existing arrays.
+    :type state: dict
+
+    """
+    if state is None:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        state = {'spec': spec, 'rows': 0, 'last': None,
+                 'keys': result.column_keys,
+                 'dtype': np.dtype(result.data.dtype).str,
+                 'info': sorted(result.info)}
+        for name, array in result.info.items():
+            np.save(os.path.join(directory, name + '.npy'), array)
+    elif list(result.column_keys) != state['keys']:
+        raise ValueError('The keys of the result do not match the keys '
+                         + 'in the store "' + directory + '"')
+
+    arrays = {'values': result.data.astype(state['dtype']),
+              'step': result.step, 'incr': result.incr, 'time': result.time}
+    for name, array in arrays.items():
+        filename = os.path.join(directory, name + '.bin')
+        row_bytes = array.itemsize*int(np.prod(array.shape[1:]))
+        mode = 'r+b' if os.path.exists(filename) else 'wb'
+        with open(filename, mode) as fid:
+            # Remove rows not recorded in the state, e.g. from an
+            # interrupted call, before appending
+            fid.truncate(state['rows']*row_bytes)
+            fid.seek(0, os.SEEK_END)
+            np.ascontiguousarray(array).tofile(fid)
+        count('bytes_produced', array.nbytes)
+
+    state = dict(state, rows=state['rows'] + len(result.time),
+                 last=[int(result.step[-1]), int(result.incr[-1])])
+    state_file = os.path.join(directory, STATE_FILE)
+    with open(state_file + '.tmp', 'w') as fid:
+        json.dump(state, fid, indent=1)
+    if os.path.exists(state_file):
+        os.remove(state_file)
+    os.rename(state_file + '.tmp', state_file)
+
+
+def read_state(directory):
+    """ Read the state of a store
+
+    :param directory: The store directory
+    :type directory: str
+
+    :returns: The state, None if there is no store in the directory
+    :rtype: dict
+
+    """
+    state_file = os.path.join(directory, STATE_FILE)
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file, 'r') as fid:
+        return json.load(fid)
+
+
+def load_tail(directory, mmap_mode='r'):
+    """ Load the frames in a store
+
+    :param directory: The store directory
+    :type directory: str
+
+    :param mmap_mode: The memory map mode for the arrays, see
+                      :py:class:`numpy.memmap`. None loads the arrays
+                      into memory.
+    :type mmap_mode: str
+
+    :rtype: :py:class:`odb_scripts.results.ResultArray`
+
+    """
+    state = read_state(directory)
+    if state is None:
+        raise IOError('No tail extraction state in "' + directory + '"')
+    num_rows = state['rows']
+    shapes = {'values': (num_rows, len(state['keys'])), 'step': (num_rows,),
+              'incr': (num_rows,), 'time': (num_rows,)}
+    dtypes = {'values': state['dtype'], 'step': np.int64,
+              'incr': np.int64, 'time': np.float64}
+    arrays = {}
+    for name, shape in shapes.items():
+        filename = os.path.join(directory, name + '.bin')
+        if mmap_mode is None or num_rows == 0:
+            arrays[name] = np.fromfile(
+                filename, dtype=dtypes[name],
+                count=int(np.prod(shape))).reshape(shape)
+        else:
+            arrays[name] = np.memmap(filename, dtype=dtypes[name],
+                                     mode=mmap_mode, shape=shape)
+    info = dict((name, np.load(os.path.join(directory, name + '.npy')))
+                for name in state['info'])
+    return ResultArray(arrays['values'], state['keys'], arrays['step'],
+                       arrays['incr'], arrays['time'], **info)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Append the frames written since the last call')
+    parser.add_argument('spec', help='json file with the extraction spec')
+    parser.add_argument('directory', help='the store directory')
+    parser.add_argument('odb_path', help='the odb file')
+    parser.add_argument('-i', '--interval', type=float, default=None,
+                        help='poll every INTERVAL seconds while the lock '
+                             + 'file of the job exists')
+    args = parser.parse_args(args)
+
+    with open(args.spec, 'r') as fid:
+        spec = json.load(fid)
+    lock_file = os.path.splitext(args.odb_path)[0] + '.lck'
+    while True:
+        running = os.path.exists(lock_file)
+        num_frames = extract_tail(args.odb_path, spec, args.directory)
+        print('Appended ' + str(num_frames) + ' frames to "'
+              + args.directory + '"')
+        if args.interval is None or not running:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,699 @@
+""" Export of instance meshes and field outputs for viewing in ParaView
+or other VTK based viewers, without the CAE kernel. The mesh of each
+instance is written once, and the field outputs are then read and
+appended one frame at a time, such that the memory use does not grow
+with the number of frames. The following formats are supported
+
+- 'binary': An XDMF file (<instance>.xdmf) referring to raw binary
+  files, with one file for the mesh and one file per exported array.
+  The frames are appended to the array files, and ParaView reads only
+  the frames that are shown. Only requires numpy.
+- 'hdf5': An XDMF file referring to an HDF5 file (<instance>.h5).
+  Requires h5py.
+- 'vtu': One VTK unstructured grid file per frame, with raw appended
+  data, and a ParaView collection file (<instance>.pvd) with the times.
+  The mesh is repeated in each file.
+
+Nodal field outputs are exported as point data, and field outputs at
+integration points as cell data, averaged over the integration points
+of each element. Vectors with 2 or 3 components are exported as 3d
+vectors, and other fields as one scalar per component. Derived
+quantities, e.g. 'MISES' or 'UMAG', are computed with
+:py:mod:`odb_scripts.derived`.
+
+Usage::
+
+    from odb_scripts import vtk_export
+    vtk_export.export_odb('job.odb', 'vis', ['U', 'S', 'MISES'], [0, 1],
+                          processes=4)
+    vtk_export.write_colormaps('vis/colormaps.json')
+
+The colormaps in data/colormaps, see
+:py:mod:`odb_scripts.add_colormaps`, can be imported in ParaView from
+the written file ("Choose preset" and "Import").
+"""
+from __future__ import print_function, division
+import os
+import re
+import sys
+import json
+import argparse
+import importlib
+import traceback
+import multiprocessing
+from collections import OrderedDict
+import numpy as np
+
+from odb_scripts.bulk_data import get_active_frames
+from odb_scripts.mesh_table import get_mesh_table
+from odb_scripts import mesh_table as mesh_table_module
+from odb_scripts.odb_pool import get_odb
+from odb_scripts import derived
+from odb_scripts.instrumentation import instrumented, phase, count
+
+
+EXPORT_FORMATS = ('binary', 'hdf5', 'vtu')
+
+COLORMAP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            os.pardir, 'data', 'colormaps')
+
+# Cell types: number of nodes, XDMF mixed topology id and VTK cell type
+CELL_TYPES = {'line': (2, 2, 3),
+              'tri': (3, 4, 5),
+              'quad': (4, 5, 9),
+              'tet': (4, 6, 10),
+              'pyramid': (5, 7, 14),
+              'wedge': (6, 8, 13),
+              'hex': (8, 9, 12),
+              'tri6': (6, 36, 22),
+              'quad8': (8, 37, 23),
+              'tet10': (10, 38, 24),
+              'hex20': (20, 48, 25)}
+
+_SOLID_CELLS = {4: 'tet', 5: 'pyramid', 6: 'wedge', 8: 'hex', 10: 'tet10',
+                15: 'wedge', 20: 'hex20', 27: 'hex'}
+_SURFACE_CELLS = {3: 'tri', 4: 'quad', 6: 'tri6', 8: 'quad8', 9: 'quad'}
+
+
+@instrumented
+def export_instance(odb, inst_name, directory, fields, step_numbers,
+                    increments=['0:-1'], fmt='binary'):
+    """ Export the mesh of an instance and field outputs for the
+    specified steps and increments
+
+    :param odb: The odb object to export results from, or the path to
+                the odb file, see :py:mod:`odb_scripts.odb_pool`
+    :type odb: Odb object (Abaqus) or str
+
+    :param inst_name: The name of the instance
+    :type inst_name: str
+
+    :param directory: The directory to write the files to, created if
+                      needed. The files are named after the instance.
+    :type directory: str
+
+    :param fields: The field outputs, e.g. ['U', 'S'], and derived
+                   quantities, e.g. ['MISES'], to export
+    :type fields: list[ str ]
+
+    :param step_numbers: List of step numbers from which to export results
+    :type step_numbers: list[ int ]
+
+    :param increments: List of increments from which to export results.
+                       ['0:-1'] implies all increments. Opposed to
+                       python lists, the last given index is included.
+    :type increments: list[ int ]
+
+    :param fmt: The format, 'binary', 'hdf5' or 'vtu'
+    :type fmt: str
+
+    :returns: The path of the file to open in the viewer
+    :rtype: str
+
+    """
+    odb = get_odb(odb)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError('Unknown export format "' + str(fmt) + '", must '
+                         + 'be one of ' + str(list(EXPORT_FORMATS)))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    with phase('mesh'):
+        mesh_table = get_mesh_table(odb, inst_name)
+        mesh = ExportMesh(mesh_table)
+    count('cells_skipped', len(mesh_table.element_labels)
+          - len(mesh.element_rows))
+
+    # Group the requested items by field output, to read each once
+    field_items = OrderedDict()
+    for item in fields:
+        split = derived.split_derived(item)
+        field_items.setdefault(item if split is None else split[0],
+                               []).append(item)
+
+    frames = get_active_frames(odb, step_numbers, increments)
+    odb_inst = odb.rootAssembly.instances[inst_name]
+    path = os.path.join(directory, _file_name(inst_name))
+    if fmt == 'vtu':
+        writer = VtuWriter(path, mesh)
+    else:
+        writer = XdmfWriter(path, mesh, hdf5=fmt == 'hdf5')
+    with writer:
+        for step_ind, step, frame_num in frames:
+            attributes = []
+            with phase('field_read'):
+                frame = step.frames[frame_num]
+                for field_name, items in field_items.items():
+                    field = frame.fieldOutputs[field_name]
+                    blocks = field.getSubset(region=odb_inst).bulkDataBlocks
+                    center, data = _read_field(blocks, mesh_table, mesh)
+                    attributes += _attributes(items, field_name,
+                                              list(field.componentLabels),
+                                              center, data)
+                    count('bulk_blocks_read', len(blocks))
+            with phase('write'):
+                writer.write_frame(step.totalTime + frame.frameValue,
+                                   attributes)
+            count('frames_read')
+    return writer.filename
+
+
+def export_odb(odb_path, directory, fields, step_numbers,
+               increments=['0:-1'], fmt='binary', instances=None,
+               processes=1, odb_module='odbAccess'):
+    """ Export the instances of an odb, with one worker process per
+    instance
+
+    :param odb_path: Path to the odb file
+    :type odb_path: str
+
+    :param directory: The directory to write the files to
+    :type directory: str
+
+    :param fields: The field outputs and derived quantities to export,
+                   see :py:func:`export_instance`
+    :type fields: list[ str ]
+
+    :param step_numbers: List of step numbers from which to export results
+    :type step_numbers: list[ int ]
+
+    :param increments: List of increments from which to export results
+    :type increments: list[ int ]
+
+    :param fmt: The format, 'binary', 'hdf5' or 'vtu'
+    :type fmt: str
+
+    :param instances: The names of the instances to export. If None,
+                      all instances are exported.
+    :type instances: list[ str ]
+
+    :param processes: The number of worker processes. If 1, the
+                      instances are exported in the current process.
+    :type processes: int
+
+    :param odb_module: The name of the module providing the function
+                       openOdb. Can be changed to use a stand-in for
+                       odbAccess.
+    :type odb_module: str
+
+    :returns: The path of the exported file for each instance
+    :rtype: dict
+
+    :raises RuntimeError: If the export failed for any instance
+
+    """
+    open_odb = importlib.import_module(odb_module).openOdb
+    if instances is None:
+        odb = open_odb(odb_path, readOnly=True)
+        try:
+            instances = odb.rootAssembly.instances.keys()
+        finally:
+            odb.close()
+
+    tasks = [(odb_path, inst_name, directory, list(fields),
+              list(step_numbers), list(increments), fmt, odb_module)
+             for inst_name in instances]
+    if processes == 1 or len(tasks) == 1:
+        task_results = [_export_task(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(min(processes, len(tasks)))
+        try:
+            task_results = pool.map(_export_task, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    filenames = {}
+    for inst_name, filename, error in task_results:
+        if error is not None:
+            raise RuntimeError('Export failed for the instance "'
+                               + inst_name + '":\n' + error)
+        filenames[inst_name] = filename
+    return filenames
+
+
+class ExportMesh(object):
+    """ The cells of the elements in an instance that can be exported,
+    i.e. continuum, shell, membrane, beam and truss elements. Quadratic
+    elements without a matching cell type, e.g. C3D27, are exported
+    as linear cells.
+
+    :param mesh_table: The mesh table of the instance
+    :type mesh_table: :py:class:`odb_scripts.mesh_table.MeshTable`
+
+    """
+
+    def __init__(self, mesh_table):
+        coords = mesh_table.coords
+        self.points = np.zeros((len(coords), 3))
+        self.points[:, :coords.shape[1]] = coords
+
+        node_inds = mesh_table.element_node_indices()
+        num_nodes = np.sum(node_inds >= 0, axis=1)
+        cell_names = np.empty(len(node_inds), dtype=object)
+        for element_type in np.unique(mesh_table.element_types):
+            is_type = mesh_table.element_types == element_type
+            for nodes in np.unique(num_nodes[is_type]):
+                cell_names[is_type & (num_nodes == nodes)] = cell_type(
+                    element_type, nodes)
+
+        #: The rows in the mesh table elements of the exported cells
+        self.element_rows = np.nonzero([name is not None
+                                        for name in cell_names])[0]
+        cell_names = cell_names[self.element_rows]
+        sizes = np.array([CELL_TYPES[name][0] for name in cell_names],
+                         dtype=np.int64)
+        self.vtk_types = np.array([CELL_TYPES[name][2]
+                                   for name in cell_names], dtype=np.uint8)
+
+        # Node indices of all cells, concatenated, and the offsets of the
+        # XDMF mixed topology, where each cell is preceded by its type id
+        # (and the number of nodes for lines)
+        self.offsets = np.cumsum(sizes)
+        self.connectivity = np.empty(np.sum(sizes), dtype=np.int64)
+        is_line = cell_names == 'line'
+        xdmf_sizes = sizes + 1 + is_line
+        xdmf_offsets = np.cumsum(xdmf_sizes) - xdmf_sizes
+        self.topology = np.empty(np.sum(xdmf_sizes), dtype=np.int64)
+        self.topology[xdmf_offsets] = [CELL_TYPES[name][1]
+                                       for name in cell_names]
+        self.topology[xdmf_offsets[is_line] + 1] = 2
+        for name in np.unique(cell_names):
+            cells = np.nonzero(cell_names == name)[0]
+            rows = self.element_rows[cells]
+            size = CELL_TYPES[name][0]
+            if name == 'line':  # End nodes of beams and trusses
+                cell_nodes = np.transpose([node_inds[rows, 0],
+                                           node_inds[rows, num_nodes[rows]
+                                                     - 1]])
+            else:
+                cell_nodes = node_inds[rows, :size]
+            columns = np.arange(size)
+            self.connectivity[(self.offsets[cells] - size)[:, np.newaxis]
+                              + columns] = cell_nodes
+            self.topology[(xdmf_offsets[cells] + 1 + (name == 'line'))
+                          [:, np.newaxis] + columns] = cell_nodes
+
+    @property
+    def num_cells(self):
+        """ The number of cells
+
+        :rtype: int
+
+        """
+        return len(self.element_rows)
+
+
+def cell_type(element_type, num_nodes):
+    """ Get the cell type of an element
+
+    :param element_type: The Abaqus element type, e.g. 'C3D8R'
+    :type element_type: str
+
+    :param num_nodes: The number of nodes of the element
+    :type num_nodes: int
+
+    :returns: The cell type, a key in :py:data:`CELL_TYPES`, or None if
+              the element is not exported, e.g. for connectors, springs
+              and point masses
+    :rtype: str
+
+    """
+    element_type = str(element_type)
+    if re.match(r'^(B\d|PIPE|FRAME|T\dD)', element_type):
+        return 'line' if num_nodes >= 2 else None
+    if re.match(r'^(C3D|DC3D|DCC3D|SC\d|COH3D|GK3D)', element_type):
+        return _SOLID_CELLS.get(num_nodes)
+    if re.match(r'^(CONN|SPRING|DASHPOT|MASS|ROTARYI|JOINT)', element_type):
+        return None
+    return _SURFACE_CELLS.get(num_nodes)
+
+
+class XdmfWriter(object):
+    """ Write a mesh and frames of point and cell data to an XDMF file,
+    with the arrays in raw binary files or in an HDF5 file. The XDMF
+    file is written when the writer is closed.
+
+    :param path: The path of the files, without extension
+    :type path: str
+
+    :param mesh: The mesh
+    :type mesh: :py:class:`ExportMesh`
+
+    :param hdf5: Should the arrays be written to an HDF5 file? Requires
+                 h5py.
+    :type hdf5: bool
+
+    """
+
+    def __init__(self, path, mesh, hdf5=False):
+        self.path = path
+        self.filename = path + '.xdmf'
+        self.mesh = mesh
+        self.frames = []
+        self.h5_file = None
+        self._binary_files = set()
+        if hdf5:
+            import h5py
+            self.h5_file = h5py.File(path + '.h5', 'w')
+        self.points_item = self._write_array('points', mesh.points, 'mesh')
+        self.topology_item = self._write_array('topology', mesh.topology,
+                                               'mesh')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_frame(self, time, attributes):
+        """ Append a frame
+
+        :param time: The time of the frame
+        :type time: float
+
+        :param attributes: The (name, center, values) of each array,
+                           where center is 'Node' or 'Cell'
+        :type attributes: list[ tuple ]
+
+        """
+        group = 'frame_' + str(len(self.frames))
+        items = [(name, center, values.shape,
+                  self._write_array(name + '_' + center.lower(),
+                                    values.astype('<f4'), group))
+                 for name, center, values in attributes]
+        self.frames.append((time, items))
+
+    def close(self):
+        """ Write the XDMF file, and close the HDF5 file """
+        if self.h5_file is not None:
+            self.h5_file.close()
+            self.h5_file = None
+        lines = ['<?xml version="1.0" ?>',
+                 '<Xdmf Version="3.0">',
+                 '<Domain>',
+                 '<Grid Name="TimeSeries" GridType="Collection" '
+                 'CollectionType="Temporal">']
+        for time, items in self.frames or [(0.0, [])]:
+            lines += ['<Grid Name="mesh" GridType="Uniform">',
+                      '<Time Value="%.12g"/>' % time,
+                      '<Topology TopologyType="Mixed" '
+                      'NumberOfElements="%d">' % self.mesh.num_cells,
+                      self.topology_item,
+                      '</Topology>',
+                      '<Geometry GeometryType="XYZ">',
+                      self.points_item,
+                      '</Geometry>']
+            for name, center, shape, item in items:
+                attribute_type = 'Vector' if len(shape) > 1 else 'Scalar'
+                lines += ['<Attribute Name="%s" AttributeType="%s" '
+                          'Center="%s">' % (name, attribute_type, center),
+                          item,
+                          '</Attribute>']
+            lines.append('</Grid>')
+        lines += ['</Grid>', '</Domain>', '</Xdmf>', '']
+        with open(self.filename, 'w') as fid:
+            fid.write('\n'.join(lines))
+
+    def _write_array(self, name, array, group):
+        """ Write an array, appending to the binary file of the array
+
+        :returns: The XDMF data item referring to the array
+        :rtype: str
+
+        """
+        array = np.ascontiguousarray(array)
+        dims = ' '.join(str(dim) for dim in array.shape)
+        number_type = 'Float' if array.dtype.kind == 'f' else 'Int'
+        if self.h5_file is not None:
+            self.h5_file.create_dataset(group + '/' + name, data=array)
+            return ('<DataItem Format="HDF" NumberType="%s" Precision="%d" '
+                    'Dimensions="%s">%s:/%s/%s</DataItem>'
+                    % (number_type, array.itemsize, dims,
+                       os.path.basename(self.path) + '.h5', group, name))
+
+        # The mesh arrays are written once, and the frames of the other
+        # arrays are appended to one file per array
+        filename = self.path + '_' + name + '.bin'
+        mode = 'ab' if filename in self._binary_files else 'wb'
+        self._binary_files.add(filename)
+        with open(filename, mode) as fid:
+            fid.seek(0, os.SEEK_END)
+            seek = fid.tell()
+            array.astype(array.dtype.newbyteorder('<')).tofile(fid)
+        return ('<DataItem Format="Binary" NumberType="%s" Precision="%d" '
+                'Endian="Little" Seek="%d" Dimensions="%s">%s</DataItem>'
+                % (number_type, array.itemsize, seek, dims,
+                   os.path.basename(filename)))
+
+
+class VtuWriter(object):
+    """ Write each frame to a VTK unstructured grid file with raw
+    appended data, and the frame times to a ParaView collection file
+    when the writer is closed
+
+    :param path: The path of the files, without extension
+    :type path: str
+
+    :param mesh: The mesh
+    :type mesh: :py:class:`ExportMesh`
+
+    """
+
+    def __init__(self, path, mesh):
+        self.path = path
+        self.filename = path + '.pvd'
+        self.mesh = mesh
+        self.frames = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_frame(self, time, attributes):
+        """ Write a frame, see :py:meth:`XdmfWriter.write_frame` """
+        filename = self.path + '_' + str(len(self.frames)) + '.vtu'
+        arrays = []
+        sections = {'Node': [], 'Cell': []}
+        for name, center, values in attributes:
+            values = np.asarray(values, dtype='<f4')
+            sections[center].append(self._data_array(
+                arrays, values, name, 'Float32',
+                values.shape[1] if values.ndim > 1 else 1))
+        points = self._data_array(arrays, self.mesh.points.astype('<f8'),
+                                  None, 'Float64', 3)
+        cells = [self._data_array(arrays, self.mesh.connectivity.astype(
+                     '<i8'), 'connectivity', 'Int64', 1),
+                 self._data_array(arrays, self.mesh.offsets.astype('<i8'),
+                                  'offsets', 'Int64', 1),
+                 self._data_array(arrays, self.mesh.vtk_types, 'types',
+                                  'UInt8', 1)]
+        lines = ['<?xml version="1.0"?>',
+                 '<VTKFile type="UnstructuredGrid" version="1.0" '
+                 'byte_order="LittleEndian" header_type="UInt64">',
+                 '<UnstructuredGrid>',
+                 '<Piece NumberOfPoints="%d" NumberOfCells="%d">'
+                 % (len(self.mesh.points), self.mesh.num_cells),
+                 '<PointData>'] + sections['Node'] + [
+                 '</PointData>',
+                 '<CellData>'] + sections['Cell'] + [
+                 '</CellData>',
+                 '<Points>', points, '</Points>',
+                 '<Cells>'] + cells + [
+                 '</Cells>',
+                 '</Piece>',
+                 '</UnstructuredGrid>',
+                 '<AppendedData encoding="raw">',
+                 '_']
+        with open(filename, 'wb') as fid:
+            fid.write('\n'.join(lines).encode('ascii'))
+            for array in arrays:
+                np.array([array.nbytes], dtype='<u8').tofile(fid)
+                array.tofile(fid)
+            fid.write('\n</AppendedData>\n</VTKFile>\n'.encode('ascii'))
+        self.frames.append((time, os.path.basename(filename)))
+
+    def close(self):
+        """ Write the collection file """
+        lines = ['<?xml version="1.0"?>',
+                 '<VTKFile type="Collection" version="0.1">',
+                 '<Collection>']
+        lines += ['<DataSet timestep="%.12g" part="0" file="%s"/>'
+                  % (time, filename) for time, filename in self.frames]
+        lines += ['</Collection>', '</VTKFile>', '']
+        with open(self.filename, 'w') as fid:
+            fid.write('\n'.join(lines))
+
+    def _data_array(self, arrays, array, name, data_type, num_components):
+        """ Add an array to the appended data, and get its DataArray tag
+        """
+        offset = sum(8 + item.nbytes for item in arrays)
+        arrays.append(np.ascontiguousarray(array))
+        name_attribute = '' if name is None else ' Name="%s"' % name
+        return ('<DataArray type="%s"%s NumberOfComponents="%d" '
+                'format="appended" offset="%d"/>'
+                % (data_type, name_attribute, num_components, offset))
+
+
+def read_colormap(filename):
+    """ Read a colormap file from data/colormaps
+
+    :param filename: The path to the csv file, with a header line and
+                     lines with the scalar and the RGB values (0-255)
+    :type filename: str
+
+    :returns: The scalars and the RGB values (0-1), one row per color
+    :rtype: (np.array, np.array)
+
+    """
+    table = np.loadtxt(filename, delimiter=',', skiprows=1, ndmin=2)
+    return table[:, 0], table[:, 1:4]/255.0
+
+
+def write_colormaps(filename, colormap_dir=COLORMAP_DIR):
+    """ Write the colormaps in a directory as a ParaView preset file
+
+    :param filename: The json file to write
+    :type filename: str
+
+    :param colormap_dir: The directory with the csv files
+    :type colormap_dir: str
+
+    :returns: The names of the colormaps
+    :rtype: list[ str ]
+
+    """
+    presets = []
+    for csv_file in sorted(os.listdir(colormap_dir)):
+        name, extension = os.path.splitext(csv_file)
+        if extension != '.csv':
+            continue
+        scalars, colors = read_colormap(os.path.join(colormap_dir, csv_file))
+        points = np.hstack((scalars[:, np.newaxis], colors)).ravel()
+        presets.append({'Name': name, 'ColorSpace': 'Lab',
+                        'NanColor': [1.0, 1.0, 0.0],
+                        'RGBPoints': points.tolist()})
+    with open(filename, 'w') as fid:
+        json.dump(presets, fid, indent=1)
+    return [preset['Name'] for preset in presets]
+
+
+def _read_field(blocks, mesh_table, mesh):
+    """ Read the values of a field output at the points or cells
+
+    :returns: The center ('Node' or 'Cell') and the values, one row per
+              point or cell. Missing values are NaN.
+    :rtype: (str, np.array)
+
+    """
+    nodal = all(block.elementLabels is None for block in blocks)
+    if nodal:
+        values = None
+        for block in blocks:
+            data = np.asarray(block.data)
+            if values is None:
+                values = np.full((len(mesh_table.labels), data.shape[1]),
+                                 np.nan)
+            values[mesh_table.indices(block.nodeLabels)] = data
+        if values is None:
+            values = np.full((len(mesh_table.labels), 0), np.nan)
+        return 'Node', values
+
+    # Average over the integration points of each element
+    element_labels = mesh_table.element_labels
+    counts = np.zeros(len(element_labels))
+    sums = None
+    for block in blocks:
+        data = np.asarray(block.data)
+        if sums is None:
+            sums = np.zeros((len(element_labels), data.shape[1]))
+        inds = np.searchsorted(element_labels,
+                               np.asarray(block.elementLabels, np.int64))
+        counts += np.bincount(inds, minlength=len(element_labels))
+        for comp_ind in range(data.shape[1]):
+            sums[:, comp_ind] += np.bincount(inds, weights=data[:, comp_ind],
+                                             minlength=len(element_labels))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = sums/counts[:, np.newaxis]
+    return 'Cell', values[mesh.element_rows]
+
+
+def _attributes(items, field_name, component_labels, center, data):
+    """ Get the (name, center, values) to write for a field output """
+    attributes = []
+    for item in items:
+        if derived.is_derived(item):
+            attributes.append((item, center, derived.evaluate(
+                [item], data, component_labels, field_name)[:, 0]))
+        elif component_labels in ([field_name + str(i) for i in (1, 2)],
+                                  [field_name + str(i) for i in (1, 2, 3)]):
+            vectors = np.zeros((len(data), 3))
+            vectors[:, :data.shape[1]] = data
+            attributes.append((item, center, vectors))
+        else:
+            attributes += [(label, center, data[:, comp_ind])
+                           for comp_ind, label in enumerate(component_labels)]
+    return attributes
+
+
+def _file_name(inst_name):
+    """ Get a file name for an instance name """
+    return re.sub(r'[^\w\-.]', '_', inst_name)
+
+
+def _export_task(task):
+    """ Export one instance, catching all errors """
+    (odb_path, inst_name, directory, fields, step_numbers, increments, fmt,
+     odb_module) = task
+    try:
+        open_odb = importlib.import_module(odb_module).openOdb
+        odb = open_odb(odb_path, readOnly=True)
+        try:
+            filename = export_instance(odb, inst_name, directory, fields,
+                                       step_numbers, increments, fmt)
+        finally:
+            odb.close()
+            mesh_table_module.clear_cache(odb.name)
+        return inst_name, filename, None
+    except Exception:
+        return inst_name, None, traceback.format_exc()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Export meshes and field outputs for ParaView')
+    parser.add_argument('odb_path', help='the odb file')
+    parser.add_argument('directory', help='the output directory')
+    parser.add_argument('-f', '--fields', nargs='+', required=True,
+                        help='field outputs and derived quantities, e.g. '
+                             + 'U S MISES')
+    parser.add_argument('-s', '--steps', nargs='+', type=int, default=[0],
+                        help='step numbers')
+    parser.add_argument('--increments', nargs='+', default=['0:-1'],
+                        help='increments, e.g. 0:-1 or -1')
+    parser.add_argument('--format', default='binary', choices=EXPORT_FORMATS)
+    parser.add_argument('-i', '--instances', nargs='+', default=None,
+                        help='instances to export, all by default')
+    parser.add_argument('-n', '--processes', type=int, default=1,
+                        help='number of worker processes')
+    parser.add_argument('--odb-module', default='odbAccess',
+                        help='module providing openOdb')
+    args = parser.parse_args(args)
+
+    increments = [int(incr) if re.match(r'^-?\d+$', incr) else incr
+                  for incr in args.increments]
+    filenames = export_odb(args.odb_path, args.directory, args.fields,
+                           args.steps, increments, fmt=args.format,
+                           instances=args.instances,
+                           processes=args.processes,
+                           odb_module=args.odb_module)
+    write_colormaps(os.path.join(args.directory, 'colormaps.json'))
+    for inst_name in sorted(filenames):
+        print(inst_name + ': ' + filenames[inst_name])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
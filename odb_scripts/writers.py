@@ -0,0 +1,200 @@
+""" Writers for saving tables of results (curves) with named columns and
+metadata. All writers have the same interface::
+
+    with NpzWriter('results.npz') as writer:
+        writer.write('S_E1_IP1', ['Time', 'S11'], data,
+                     metadata={'instance': 'PART-1-1', 'element': 1})
+
+"""
+from __future__ import print_function, division
+import os
+import json
+import numpy as np
+
+
+class Writer(object):
+    """ Base class for writers """
+
+    def write(self, name, columns, data, metadata=None):
+        """ Write a table
+
+        :param name: The name of the table, must be unique for the
+                     writer
+        :type name: str
+
+        :param columns: The column names
+        :type columns: list[ str ]
+
+        :param data: The data, one column for each column name
+        :type data: np.array
+
+        :param metadata: Additional information about the table, e.g.
+                         instance name and node label. Values must be
+                         json serializable.
+        :type metadata: dict
+
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """ Finish writing. Must be called for writers that write
+        on close.
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TextWriter(Writer):
+    """ Write each table to a separate text file, <name>.dat, with a
+    header line containing the column names. The metadata is not saved.
+
+    :param directory: The directory to save the files in
+    :type directory: str
+
+    :param fmt: The format used for each value
+    :type fmt: str
+
+    """
+
+    def __init__(self, directory='.', fmt='%20.12e'):
+        self.directory = directory
+        self.fmt = fmt
+
+    def write(self, name, columns, data, metadata=None):
+        filename = os.path.join(self.directory, name + '.dat')
+        with open(filename, 'w') as fid:
+            fid.write('# %+18s' % columns[0])
+            for column in columns[1:]:
+                fid.write('%+21s' % column)
+            fid.write('\n')
+            np.savetxt(fid, np.asarray(data), fmt=self.fmt)
+
+
+class NpzWriter(Writer):
+    """ Write all tables to a single npz file when the writer is closed.
+    Each table is saved as a structured array with one field per column,
+    and the metadata as a json string with the key <name>.meta
+
+    An npz file cannot be appended in place. In the mode 'a', the tables
+    of an existing file are read when closing, and the file is
+    rewritten with the old and the new tables.
+
+    :param filename: The name of the npz file
+    :type filename: str
+
+    :param compress: Should the file be compressed?
+    :type compress: bool
+
+    :param mode: 'a' appends tables to an existing file, and the table
+                 names must not be in the file already. 'w' overwrites
+                 an existing file.
+    :type mode: str
+
+    """
+
+    def __init__(self, filename, compress=True, mode='a'):
+        if mode not in ('a', 'w'):
+            raise ValueError('Unknown mode "' + str(mode) + '", must be '
+                             + '"a" or "w"')
+        self.filename = filename
+        self.compress = compress
+        self.arrays = {}
+        self.existing = []
+        if mode == 'a' and os.path.exists(filename):
+            with np.load(filename) as npz:
+                self.existing = list(npz.files)
+
+    def write(self, name, columns, data, metadata=None):
+        if name in self.arrays or name in self.existing:
+            raise ValueError('A table with the name "' + name
+                             + '" has already been written to "'
+                             + self.filename + '"')
+        data = np.asarray(data)
+        table = np.empty(data.shape[0],
+                         dtype=[(str(column), data.dtype)
+                                for column in columns])
+        for col_ind, column in enumerate(columns):
+            table[str(column)] = data[:, col_ind]
+        self.arrays[name] = table
+        self.arrays[name + '.meta'] = np.array(json.dumps(metadata or {}))
+
+    def close(self):
+        arrays = {}
+        if len(self.existing) > 0:
+            with np.load(self.filename) as npz:
+                arrays = dict((name, npz[name]) for name in npz.files)
+        arrays.update(self.arrays)
+        # Write to a temporary file first, such that the existing tables
+        # are kept if writing fails
+        tmp_file = self.filename + '.tmp.npz'
+        if self.compress:
+            np.savez_compressed(tmp_file, **arrays)
+        else:
+            np.savez(tmp_file, **arrays)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+        os.rename(tmp_file, self.filename)
+        self.existing = list(arrays)
+        self.arrays = {}
+
+
+class HDF5Writer(Writer):
+    """ Write tables to an HDF5 file, one group per table. The group
+    contains the dataset 'data' and the attributes 'columns' and the
+    metadata items. Requires h5py.
+
+    :param filename: The name of the HDF5 file
+    :type filename: str
+
+    :param mode: The file mode, 'a' appends tables to an existing file
+    :type mode: str
+
+    :param compression: The dataset compression filter
+    :type compression: str
+
+    """
+
+    def __init__(self, filename, mode='a', compression='gzip'):
+        import h5py
+        self.file = h5py.File(filename, mode)
+        self.compression = compression
+
+    def write(self, name, columns, data, metadata=None):
+        group = self.file.create_group(name)
+        group.create_dataset('data', data=np.asarray(data),
+                             compression=self.compression)
+        group.attrs['columns'] = [str(column).encode('utf-8')
+                                  for column in columns]
+        for key, value in (metadata or {}).items():
+            group.attrs[key] = value
+
+    def close(self):
+        self.file.close()
+
+
+def get_writer(spec, **kwargs):
+    """ Get a writer from a specification
+
+    :param spec: A writer object, or the format: 'txt', 'npz' or 'h5'
+    :type spec: Writer or str
+
+    :param kwargs: Arguments passed to the writer constructor when spec
+                   is a format
+    :type kwargs: dict
+
+    :returns: The writer
+    :rtype: :py:class:`Writer`
+
+    """
+    if isinstance(spec, Writer):
+        return spec
+    writers = {'txt': TextWriter, 'npz': NpzWriter, 'h5': HDF5Writer}
+    if spec not in writers:
+        raise ValueError('Unknown writer format "' + str(spec) + '", '
+                         + 'supported formats are ' + str(list(writers)))
+    return writers[spec](**kwargs)
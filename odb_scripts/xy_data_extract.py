@@ -1,5 +1,11 @@
+import numpy as np
+
+from odb_scripts.writers import TextWriter
+from odb_scripts.backends import get_session
+
+
 def save_xy_ip_data(inst_name, elem_num, ip_num=1, quantity='S', 
-                    components=['S11', 'S22', 'S12']):
+                    components=['S11', 'S22', 'S12'], writer=None):
     """ save xy data from integration point, created with standard name
     with xydata from ODB field output.
     
@@ -18,6 +24,11 @@ def save_xy_ip_data(inst_name, elem_num, ip_num=1, quantity='S',
     :param components: List of components to extract data for
     :type components: list[ str ]
     
+    :param writer: The writer used to save the data, see 
+                   :py:mod:`odb_scripts.writers`. If None, the data is 
+                   saved to a text file in the current directory.
+    :type writer: :py:class:`odb_scripts.writers.Writer`
+    
     """
     
     def get_data(component):
@@ -25,32 +36,16 @@ def save_xy_ip_data(inst_name, elem_num, ip_num=1, quantity='S',
                         + ' PI: ' + inst_name 
                         + ' E: ' + str(elem_num) 
                         + ' IP: ' + str(ip_num))
-        return session.xyDataObjects[xy_data_name].data
-        
-    save_data = []
-    data = get_data(components[0])
-    save_data.append(zip(*data)[0]) # Add time
-    for comp in components:
-        data = get_data(comp)
-        save_data.append(zip(*data)[1]) # Add data for component
+        return get_session().xyDataObjects[xy_data_name].data
         
-    filename = (quantity + '_E' + str(elem_num) 
-                + '_IP' + str(ip_num) + '.dat')
-    
-    np.savetxt(filename, np.transpose(save_data), fmt='%20.12e')
-    
-    with open(filename, 'r') as fid:
-        save_str = fid.read()
+    name = quantity + '_E' + str(elem_num) + '_IP' + str(ip_num)
+    metadata = {'instance': inst_name, 'element': elem_num, 
+                'ip': ip_num, 'quantity': quantity}
+    _save_xy_data(name, get_data, components, writer, metadata)
     
-    with open(filename, 'w') as fid:
-        fid.write('# %+18s' % 'Time')
-        for comp in components:
-            fid.write('%+21s' % comp)
-        fid.write('\n')
-        fid.write(save_str)
     
 def save_xy_node_data(inst_name, node_num, quantity='U', 
-                      components=['U1', 'U2']):
+                      components=['U1', 'U2'], writer=None):
     """ save xy data from node, created with standard name
     with xydata from ODB field output.
     
@@ -67,31 +62,36 @@ def save_xy_node_data(inst_name, node_num, quantity='U',
     :param components: List of components to extract data for
     :type components: list[ str ]
     
+    :param writer: The writer used to save the data, see 
+                   :py:mod:`odb_scripts.writers`. If None, the data is 
+                   saved to a text file in the current directory.
+    :type writer: :py:class:`odb_scripts.writers.Writer`
+    
     """
     
     def get_data(component):
         xy_data_name = (quantity + ':' + component
                         + ' PI: ' + inst_name 
                         + ' N: ' + str(node_num))
-        return session.xyDataObjects[xy_data_name].data
-        
-    save_data = []
-    data = get_data(components[0])
-    save_data.append(zip(*data)[0]) # Add time
-    for comp in components:
-        data = get_data(comp)
-        save_data.append(zip(*data)[1]) # Add data for component
+        return get_session().xyDataObjects[xy_data_name].data
         
-    filename = quantity + '_N' + str(node_num) + '.dat'
+    name = quantity + '_N' + str(node_num)
+    metadata = {'instance': inst_name, 'node': node_num, 
+                'quantity': quantity}
+    _save_xy_data(name, get_data, components, writer, metadata)
     
-    np.savetxt(filename, np.transpose(save_data), fmt='%20.12e')
     
-    with open(filename, 'r') as fid:
-        save_str = fid.read()
-    
-    with open(filename, 'w') as fid:
-        fid.write('# %+18s' % 'Time')
-        for comp in components:
-            fid.write('%+21s' % comp)
-        fid.write('\n')
-        fid.write(save_str)
\ No newline at end of file
+def _save_xy_data(name, get_data, components, writer, metadata):
+    """ Collect the time and the components into one table and write it
+    """
+    save_data = np.empty((len(get_data(components[0])), 
+                          len(components) + 1))
+    for col, comp in enumerate(components):
+        data = np.array(get_data(comp))
+        if col == 0:
+            save_data[:, 0] = data[:, 0] # Add time
+        save_data[:, col + 1] = data[:, 1] # Add data for component
+    
+    if writer is None:
+        writer = TextWriter()
+    writer.write(name, ['Time'] + list(components), save_data, metadata)
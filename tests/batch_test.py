@@ -0,0 +1,114 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import batch, bulk_data, writers, mesh_table, frame_cache
+import mock_odb
+
+
+# Test with mock odb files, does not require Abaqus
+out_dir = tempfile.mkdtemp()
+odb_paths = []
+for i, num_frames in enumerate([(2, 3), (4, 2), (3, 3)]):
+    odb_paths.append(os.path.join(out_dir, 'job' + str(i) + '.odb'))
+    mock_odb.write_odb_file(odb_paths[-1], num_frames=num_frames)
+missing_path = os.path.join(out_dir, 'missing.odb')
+
+spec = {'inst_name': 'PART-1-1', 'positions': 'EDGE', 'variable': 'U1',
+        'step_numbers': [0, 1]}
+
+npz_file = os.path.join(out_dir, 'results.npz')
+with writers.NpzWriter(npz_file) as writer:
+    results, errors = batch.extract_many(odb_paths + [missing_path], spec,
+                                         processes=2, writer=writer,
+                                         odb_module='mock_odb')
+
+# Check that the missing file fails without stopping the other files
+assert(list(errors) == [missing_path])
+assert(results[missing_path] is None)
+
+# Check that results are the same as for serial extraction
+npz = np.load(npz_file)
+for path in odb_paths:
+    odb = mock_odb.openOdb(path)
+    ref = bulk_data.get_multiple_positions(odb, **spec)
+    assert(np.all(results[path]['time'] == ref['time']))
+    assert(np.all(results[path][1] == ref[1]))
+    table = npz[os.path.splitext(os.path.basename(path))[0]]
+    assert(np.all(table['Time'] == ref['time']))
+    assert(np.all(table['2'] == ref[2]))
+npz.close()
+
+# Odb files with the same name in different directories get unique
+# table names, and a failing write does not stop the other files
+dup_paths = []
+for run in ['run1', 'run2']:
+    os.makedirs(os.path.join(out_dir, run))
+    dup_paths.append(os.path.join(out_dir, run, 'Job-1.odb'))
+    mock_odb.write_odb_file(dup_paths[-1])
+assert(batch.get_table_names(dup_paths + odb_paths[:1])
+       == {dup_paths[0]: 'run1_Job-1', dup_paths[1]: 'run2_Job-1',
+           odb_paths[0]: 'job0'})
+
+
+class FailingWriter(writers.NpzWriter):
+    def write(self, name, columns, data, metadata=None):
+        if name == 'job1':
+            raise IOError('Disk full')
+        writers.NpzWriter.write(self, name, columns, data, metadata)
+
+
+npz_file = os.path.join(out_dir, 'dup.npz')
+with FailingWriter(npz_file) as writer:
+    results, errors = batch.extract_many(dup_paths + odb_paths[:2], spec,
+                                         processes=1, writer=writer,
+                                         odb_module='mock_odb')
+assert(list(errors) == [odb_paths[1]] and 'Disk full' in errors[odb_paths[1]])
+npz = np.load(npz_file)
+assert(sorted(name for name in npz.files if not name.endswith('.meta'))
+       == ['job0', 'run1_Job-1', 'run2_Job-1'])
+npz.close()
+
+# Check get_multiple_variables in the current process
+spec = {'function': 'get_multiple_variables', 'inst_name': 'PART-1-1',
+        'position': [1.0, 2.0, 0.0], 'variables': ['U2', 'RF1'],
+        'step_numbers': [1], 'increments': [-1]}
+for path in odb_paths:
+    mesh_table.clear_cache(path)
+caller_path = os.path.join(out_dir, 'caller.odb')
+mock_odb.write_odb_file(caller_path)
+caller_odb = mock_odb.openOdb(caller_path)
+caller_table = mesh_table.get_mesh_table(caller_odb, 'PART-1-1')
+max_bytes = frame_cache.default_cache.max_bytes
+frame_cache.default_cache.max_bytes = 1024**2
+try:
+    bulk_data.get_multiple_positions(caller_odb, 'PART-1-1', 'X0', 'U1', [0])
+    num_entries = frame_cache.default_cache.stats()['entries']
+    results, errors = batch.extract_many(odb_paths, spec, processes=1,
+                                         odb_module='mock_odb')
+    # The caches of the caller are kept
+    assert(mesh_table.get_mesh_table(caller_odb, 'PART-1-1') is caller_table)
+    assert(frame_cache.default_cache.stats()['entries'] >= num_entries)
+finally:
+    frame_cache.default_cache.max_bytes = max_bytes
+    frame_cache.default_cache.clear()
+    frame_cache.default_cache.reset_stats()
+assert(not any(mesh_table.is_cached(path) for path in odb_paths))
+assert(len(errors) == 0)
+for path in odb_paths:
+    assert(len(results[path]['RF1']) == 1)
+
+# Check splitting one odb into frame ranges
+assert(batch.partition_frames(7, 3) == [(0, 2), (2, 4), (4, 7)])
+assert(batch.partition_frames(2, 4) == [(0, 1), (1, 2)])
+
+spec = {'inst_name': 'PART-1-1', 'positions': 'X0', 'variable': 'RF2',
+        'step_numbers': [0, 1], 'increments': [0, '1:-1']}
+result = batch.extract_parallel(odb_paths[1], spec, processes=3,
+                                odb_module='mock_odb')
+ref = bulk_data.get_multiple_positions(mock_odb.openOdb(odb_paths[1]), **spec)
+assert(sorted(result, key=str) == sorted(ref, key=str))
+for key in ref:
+    assert(np.all(np.asarray(result[key]) == np.asarray(ref[key])))
+assert(np.all(result['step'] == ref['step']))
+assert(np.all(result['incr'] == ref['incr']))
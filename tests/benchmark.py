@@ -0,0 +1,270 @@
+""" Benchmarks of the extraction hot paths, using the mock odb such that
+they can be run on any machine with numpy, without Abaqus.
+
+Each benchmark is run for a series of problem sizes, and the timings are
+reported together with the scaling exponent (slope in log-log scale).
+The results can be saved as a json baseline, and later runs can be
+compared against it::
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json --tolerance 1.5
+
+The session based functions in node_data cannot run without Abaqus, and
+are benchmarked through their session free equivalents: The node lookup
+of get_node_labels (MeshTable.find_labels), the frame selection of
+set_active_frames (bulk_data.get_active_frames) and the bulk data engine
+of get_multiple_positions and get_multiple_variables. Note that the
+timings include the time for the mock odb to calculate its field values.
+"""
+from __future__ import print_function, division
+import os
+import sys
+import json
+import shutil
+import tempfile
+import argparse
+import platform
+from timeit import default_timer
+import numpy as np
+
+from odb_scripts import bulk_data, mesh_table, writers
+import mock_odb
+
+
+INST_NAME = 'PART-1-1'
+
+
+def create_odb(num_nodes, num_frames, set_size=0, block_size=None):
+    """ Create a mock odb with approximately num_nodes nodes, in a box
+    with aspect ratio 4:2:1, and num_frames frames in one step
+    """
+    n = (num_nodes/8.0)**(1.0/3)
+    shape = [max(2, int(round(4*n))), max(2, int(round(2*n))),
+             max(2, int(round(n)))]
+    node_sets = {'BENCH': min(set_size, int(np.prod(shape)))}
+    return mock_odb.Odb('bench_' + str(num_nodes) + '_' + str(num_frames),
+                        shape, [num_frames], block_size=block_size,
+                        node_sets=node_sets)
+
+
+def timed(function, *args, **kwargs):
+    """ Call function and return the elapsed wall time """
+    start = default_timer()
+    function(*args, **kwargs)
+    return default_timer() - start
+
+
+def bench_node_labels_build(num_nodes):
+    """ get_node_labels, first call: read nodes and build the index """
+    odb = create_odb(num_nodes, 1)
+    odb.rootAssembly.instances[INST_NAME].nodes  # Create node objects
+    mesh_table.clear_cache()
+
+    def build():
+        mesh_table.get_mesh_table(odb, INST_NAME).grid
+    return timed(build)
+
+
+def bench_node_labels_query(num_nodes, num_probes=1000):
+    """ get_node_labels, later calls: query probe positions """
+    odb = create_odb(num_nodes, 1)
+    mesh_table.clear_cache()
+    table = mesh_table.get_mesh_table(odb, INST_NAME)
+    table.grid
+    inds = np.random.RandomState(0).randint(0, len(table.labels), num_probes)
+    return timed(table.find_labels, table.coords[inds] + 1.e-4, 1.e-2)
+
+
+def bench_active_frames(num_frames):
+    """ set_active_frames: select all frames and every second frame """
+    odb = create_odb(8, num_frames)
+
+    def select():
+        bulk_data.get_active_frames(odb, [0], ['0:-1'])
+        bulk_data.get_active_frames(odb, [0], ['0:-1:2', -1])
+    return timed(select)
+
+
+def bench_positions_nodes(num_nodes, num_frames=10):
+    """ get_multiple_positions, node set with 10 % of the nodes """
+    odb = create_odb(num_nodes, num_frames, set_size=num_nodes//10)
+    mesh_table.clear_cache()
+    mesh_table.get_mesh_table(odb, INST_NAME).node_set_labels('BENCH')
+    return timed(bulk_data.get_multiple_positions, odb, INST_NAME, 'BENCH',
+                 'U1', [0])
+
+
+def bench_positions_frames(num_frames, num_nodes=1000):
+    """ get_multiple_positions, node set with 100 nodes """
+    odb = create_odb(num_nodes, num_frames, set_size=100)
+    mesh_table.clear_cache()
+    mesh_table.get_mesh_table(odb, INST_NAME).node_set_labels('BENCH')
+    return timed(bulk_data.get_multiple_positions, odb, INST_NAME, 'BENCH',
+                 'U1', [0])
+
+
+def bench_variables_frames(num_frames, num_nodes=1000):
+    """ get_multiple_variables, 4 variables from 2 fields """
+    odb = create_odb(num_nodes, num_frames)
+    mesh_table.clear_cache()
+    position = mesh_table.get_mesh_table(odb, INST_NAME).coords[0]
+    return timed(bulk_data.get_multiple_variables, odb, INST_NAME, position,
+                 ['U1', 'U2', 'U3', 'RF2'], [0])
+
+
+def bench_text_writer(num_rows, num_curves=10):
+    """ xy writers, text files with 3 components """
+    return _bench_writer('txt', num_rows, num_curves)
+
+
+def bench_npz_writer(num_rows, num_curves=10):
+    """ xy writers, one npz container with 3 components per curve """
+    return _bench_writer('npz', num_rows, num_curves)
+
+
+def _bench_writer(writer_format, num_rows, num_curves):
+    out_dir = tempfile.mkdtemp()
+    data = np.random.RandomState(0).rand(num_rows, 4)
+    columns = ['Time', 'S11', 'S22', 'S12']
+    try:
+        if writer_format == 'txt':
+            writer = writers.TextWriter(out_dir)
+        else:
+            writer = writers.NpzWriter(os.path.join(out_dir, 'bench.npz'))
+
+        def write():
+            with writer:
+                for curve in range(num_curves):
+                    writer.write('S_E' + str(curve), columns, data)
+        return timed(write)
+    finally:
+        shutil.rmtree(out_dir)
+
+
+BENCHMARKS = [
+    ('node_labels_build', 'nodes', bench_node_labels_build,
+     [1e4, 1e5, 1e6]),
+    ('node_labels_query', 'nodes', bench_node_labels_query,
+     [1e4, 1e5, 1e6]),
+    ('active_frames', 'frames', bench_active_frames, [1e2, 1e3, 1e4]),
+    ('positions_nodes', 'nodes', bench_positions_nodes, [1e4, 1e5, 1e6]),
+    ('positions_frames', 'frames', bench_positions_frames, [1e1, 1e2, 1e3]),
+    ('variables_frames', 'frames', bench_variables_frames, [1e1, 1e2, 1e3]),
+    ('text_writer', 'rows', bench_text_writer, [1e2, 1e3, 1e4]),
+    ('npz_writer', 'rows', bench_npz_writer, [1e2, 1e3, 1e4]),
+]
+
+
+def run(names=None, scale=1.0, repeat=3):
+    """ Run the benchmarks
+
+    :param names: Names of the benchmarks to run. If None, all are run.
+    :type names: list[ str ]
+
+    :param scale: Factor to multiply all problem sizes with
+    :type scale: float
+
+    :param repeat: The number of runs for each size, the fastest is used
+    :type repeat: int
+
+    :returns: The results, {name: {'parameter': str, 'sizes': list,
+              'times': list, 'exponent': float}}
+    :rtype: dict
+
+    """
+    results = {}
+    for name, parameter, function, sizes in BENCHMARKS:
+        if names is not None and name not in names:
+            continue
+        sizes = [max(1, int(size*scale)) for size in sizes]
+        times = [min([function(size) for _ in range(repeat)])
+                 for size in sizes]
+        results[name] = {'parameter': parameter, 'sizes': sizes,
+                         'times': times,
+                         'exponent': scaling_exponent(sizes, times)}
+        print_result(name, results[name])
+    return results
+
+
+def scaling_exponent(sizes, times):
+    """ Get the exponent p in time ~ size^p, fitted in log-log scale """
+    if len(sizes) < 2:
+        return float('nan')
+    log_times = np.log(np.maximum(times, 1.e-9))
+    return float(np.polyfit(np.log(sizes), log_times, 1)[0])
+
+
+def print_result(name, result):
+    print(name + ' (scaling exponent ' + '%.2f' % result['exponent'] + ')')
+    for size, time in zip(result['sizes'], result['times']):
+        print('    %10d %-6s %10.4f s' % (size, result['parameter'], time))
+
+
+def compare(results, baseline, tolerance):
+    """ Compare results with a baseline
+
+    :param results: The results from :py:func:`run`
+    :type results: dict
+
+    :param baseline: Results from an earlier run
+    :type baseline: dict
+
+    :param tolerance: The maximum allowed ratio between the current and
+                      the baseline time
+    :type tolerance: float
+
+    :returns: The regressions, as a list of (name, size, ratio)
+    :rtype: list[ tuple ]
+
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        base_times = dict(zip(baseline[name]['sizes'],
+                              baseline[name]['times']))
+        for size, time in zip(result['sizes'], result['times']):
+            if size in base_times:
+                ratio = time/max(base_times[size], 1.e-9)
+                if ratio > tolerance:
+                    regressions.append((name, size, ratio))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('names', nargs='*',
+                        help='benchmarks to run (default all): '
+                        + ', '.join(b[0] for b in BENCHMARKS))
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='factor to multiply problem sizes with')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='save results to json file')
+    parser.add_argument('--baseline', help='compare with json file')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='allowed slowdown factor compared to baseline')
+    args = parser.parse_args(args)
+
+    results = run(args.names or None, args.scale, args.repeat)
+
+    if args.output is not None:
+        with open(args.output, 'w') as fid:
+            json.dump({'machine': platform.platform(),
+                       'python': platform.python_version(),
+                       'numpy': np.__version__,
+                       'scale': args.scale,
+                       'results': results}, fid, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as fid:
+            baseline = json.load(fid)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for name, size, ratio in regressions:
+            print('Regression: ' + name + ' at size ' + str(size) + ' is '
+                  + '%.2f' % ratio + ' times slower than the baseline')
+        return 1 if len(regressions) > 0 else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
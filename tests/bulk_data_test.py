@@ -0,0 +1,330 @@
+import os
+import tempfile
+from time import sleep
+import numpy as np
+
+from odb_scripts import bulk_data, mesh_table, mesh_cache, instrumentation
+from odb_scripts import element_data
+from odb_scripts.results import ResultArray
+import mock_odb
+
+
+# Test with mock odb, does not require Abaqus
+odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+mock_odb.write_odb_file(odb_file, shape=(4, 3, 2), num_frames=(3, 4))
+odb = mock_odb.openOdb(odb_file)
+inst_name = 'PART-1-1'
+inst = odb.rootAssembly.instances[inst_name]
+pos = [[3.0, 2.0, 1.0], [1.0, 0.0, 0.0], [0.0, 1.0, 1.0]]
+var = ['U1', 'U2', 'RF3']
+
+# Check frame selection
+assert(bulk_data.get_frame_numbers(4, ['0:-1']) == [0, 1, 2, 3])
+assert(bulk_data.get_frame_numbers(4, [0, 1, -1]) == [0, 1, 3])
+assert(bulk_data.get_frame_numbers(4, ['1:2', -1]) == [1, 2, 3])
+assert(bulk_data.get_frame_numbers(4, [u'1:2', -1]) == [1, 2, 3])
+
+frames = bulk_data.get_active_frames(odb, [0, 1], [0, -1])
+assert([(f[0], f[2]) for f in frames] == [(0, 0), (0, 2), (1, 0), (1, 3)])
+
+
+def expected(variable, coords, labels, time):
+    field_name, comp = bulk_data.split_variable(variable)
+    comp_ind = mock_odb.FIELDS[field_name].index(comp)
+    return mock_odb.nodal_value(field_name, comp_ind, np.array(labels),
+                                np.array(coords), time)
+
+
+# Check getting multiple positions
+data = bulk_data.get_multiple_positions(odb, inst_name, pos, var[0],
+                                        step_numbers=[0, 1],
+                                        increments=[0, 1, -1])
+
+assert(len(data['time']) == len(data[0]))
+assert(len(data['node']) == len(pos))
+assert(np.allclose(data['time'], [0.0, 0.5, 1.0, 1.0, 1.0 + 1.0/3, 2.0]))
+assert(data['step'].tolist() == [0, 0, 0, 1, 1, 1])
+assert(data['incr'].tolist() == [0, 1, 2, 0, 1, 3])
+
+labels = bulk_data.get_mesh_table(odb, inst_name).find_labels(pos, 1.e-2)
+for node_ind in range(len(pos)):
+    assert(np.allclose(data['node'][node_ind], pos[node_ind]))
+    ref = [expected(var[0], [pos[node_ind]], [labels[node_ind]], t)[0]
+           for t in data['time']]
+    assert(np.allclose(data[node_ind], ref, rtol=1.e-6))
+
+# Check data when getting from set
+data = bulk_data.get_multiple_positions(odb, inst_name, 'X0', var[1],
+                                        step_numbers=[1])
+set_labels = inst.nodeSets['X0'].node_labels
+assert(len(data['node']) == len(set_labels))
+assert(np.all(data['node'][:, 0] == 0.0))
+for node_ind in range(len(set_labels)):
+    ref = expected(var[1], data['node'][node_ind:node_ind+1],
+                   set_labels[node_ind:node_ind+1], data['time'][-1])
+    assert(abs(data[node_ind][-1] - ref[0]) < 1.e-5)
+
+# Check getting multiple variables
+data = bulk_data.get_multiple_variables(odb, inst_name, pos[0], var,
+                                        step_numbers=[0, 1])
+assert(len(data['time']) == 7)
+for vn in var:
+    assert(vn in data)
+    ref = [expected(vn, [pos[0]], labels[:1], t)[0] for t in data['time']]
+    assert(np.allclose(data[vn], ref, rtol=1.e-6))
+
+# Check the result container: columns are views, save and memory mapped load
+assert(data.data.shape == (7, len(var)))
+assert(np.shares_memory(data[var[1]], data.data))
+result_dir = os.path.join(tempfile.mkdtemp(), 'result')
+data.save(result_dir)
+loaded = ResultArray.load(result_dir)
+assert(not loaded.data.flags.owndata)  # Memory mapped
+assert(loaded.keys() == data.keys())
+for key in data:
+    assert(np.all(loaded[key] == data[key]))
+merged = ResultArray.concatenate([loaded, data])
+assert(np.all(merged['time'] == np.concatenate([data['time']]*2)))
+
+# Check the mapping protocol
+assert(len(data.values()) == len(data) == 3 + len(var))
+as_dict = data.to_dict()
+assert(all(np.all(data[key] == as_dict[key]) for key in data))
+assert(data.get('missing') is None)
+assert(data.step.dtype == np.int64 and data.incr.dtype == np.int64)
+data[var[0]] = 0.0
+assert(np.all(data.data[:, 0] == 0.0))
+data['label'] = np.arange(7)
+assert('label' in data.info and data.keys()[3] == 'label')
+assert(np.all(data.pop('label') == np.arange(7)) and 'label' not in data)
+del data[var[0]]
+assert(data.column_keys == var[1:] and data.data.shape == (7, len(var) - 1))
+assert(np.all(data[var[1]] == loaded[var[1]]))
+try:
+    data['time'] = [0.0]
+    raise AssertionError('time with the wrong shape accepted')
+except ValueError:
+    pass
+
+# Check that missing positions are reported
+try:
+    bulk_data.get_multiple_positions(odb, inst_name, [[0.5, 0.5, 0.5]],
+                                     var[0], step_numbers=[0])
+    raise AssertionError('Expected ValueError for missing position')
+except ValueError:
+    pass
+
+# Check that only the requested nodes are read: the node itself for one
+# position, and a node set created once for several positions
+node_labels, region = bulk_data.get_node_region(odb, inst_name, pos[:1],
+                                                1.e-2)
+assert(isinstance(region, mock_odb.OdbMeshNode))
+assert(region.label == node_labels[0])
+node_labels, region = bulk_data.get_node_region(odb, inst_name, pos, 1.e-2)
+assert(isinstance(region, mock_odb.OdbSet))
+assert(sorted(region.node_labels) == sorted(node_labels))
+num_sets = len(inst.nodeSets)
+assert(bulk_data.get_node_region(odb, inst_name, pos[::-1], 1.e-2)[1]
+       is region)
+assert(len(inst.nodeSets) == num_sets)
+
+# Check that values at integration points are not read at the nodes
+try:
+    bulk_data.get_multiple_variables(odb, inst_name, pos[0], ['U1', 'S11'],
+                                     step_numbers=[0])
+    raise AssertionError('Expected ValueError for stress at the nodes')
+except ValueError as e:
+    assert('only available at INTEGRATION_POINT' in str(e))
+
+# Check the mesh cache
+cache_dir = tempfile.mkdtemp()
+mesh_cache.enable(cache_dir)
+mesh_table.clear_cache()
+table = mesh_table.get_mesh_table(odb, inst_name)
+cache_file = mesh_cache.get_cache_file(odb_file, inst_name)
+assert(os.path.exists(cache_file))
+assert(table.connectivity.shape == (3*2*1, 8))
+assert(np.all(table.coordinates(table.connectivity[0])
+              == [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                  [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]]))
+
+mesh_table.clear_cache()
+cached_table = mesh_table.get_mesh_table(odb, inst_name)
+assert(cached_table._instance is None)  # Loaded from file
+assert(np.all(cached_table.labels == table.labels))
+assert(np.all(cached_table.coords == table.coords))
+assert(np.all(cached_table.connectivity == table.connectivity))
+assert(list(cached_table.element_types) == ['C3D8']*6)
+assert(np.all(cached_table.node_set_labels('X0')
+              == inst.nodeSets['X0'].node_labels))
+assert(np.all(cached_table.element_set_labels('EX0') == [1, 2]))
+data = bulk_data.get_multiple_positions(odb, inst_name, 'X0', var[1],
+                                        step_numbers=[1])
+assert(len(data['node']) == len(inst.nodeSets['X0'].node_labels))
+
+# Modifying the odb file invalidates the cache
+mesh_table.clear_cache()
+with open(odb_file, 'a') as fid:
+    fid.write(' ')
+assert(mesh_table.get_mesh_table(odb, inst_name)._instance is not None)
+mesh_cache.disable()
+
+# The tables kept in memory are also rebuilt when the odb file changes
+table = mesh_table.get_mesh_table(odb, inst_name)
+assert(mesh_table.get_mesh_table(odb, inst_name) is table)
+with open(odb_file, 'a') as fid:
+    fid.write(' ')
+assert(mesh_table.get_mesh_table(odb, inst_name) is not table)
+
+# Check the streaming variants against the full extraction
+data = bulk_data.get_multiple_positions(odb, inst_name, 'EDGE', var[0],
+                                        step_numbers=[0, 1],
+                                        increments=['1:-1'])
+frame_ind = 0
+for step, incr, time, values in bulk_data.iter_multiple_positions(
+        odb, inst_name, 'EDGE', var[0], step_numbers=[0, 1],
+        increments=['1:-1']):
+    assert(step == data['step'][frame_ind])
+    assert(incr == data['incr'][frame_ind])
+    assert(time == data['time'][frame_ind])
+    assert(np.all(values == [data[i][frame_ind]
+                             for i in range(len(data['node']))]))
+    frame_ind += 1
+assert(frame_ind == len(data['time']))
+
+data = bulk_data.get_multiple_variables(odb, inst_name, pos[1], var,
+                                        step_numbers=[1], increments=[-1])
+frames = list(bulk_data.iter_multiple_variables(odb, inst_name, pos[1], var,
+                                                step_numbers=[1],
+                                                increments=[-1]))
+assert(len(frames) == 1)
+assert(np.all(frames[0][3] == [data[vn][0] for vn in var]))
+
+# Check the instrumentation reports
+instrumentation.enable()
+mesh_table.clear_cache()
+data = bulk_data.get_multiple_positions(odb, inst_name, 'X0', var[0],
+                                        step_numbers=[0, 1])
+instrumentation.disable()
+report = instrumentation.get_reports()[-1]
+assert(report['function'] == 'get_multiple_positions')
+assert(set(report['phases']) == set(['node_lookup', 'frame_selection',
+                                     'field_read']))
+assert(report['counts']['frames_activated'] == 7)
+assert(report['counts']['frames_read'] == 7)
+assert(report['counts']['nodes_scanned'] == 24 + 6)
+assert(report['wall_time'] >= sum(report['phases'].values()))
+num_reports = len(instrumentation.get_reports())
+bulk_data.get_multiple_positions(odb, inst_name, 'X0', var[0],
+                                 step_numbers=[0])
+assert(len(instrumentation.get_reports()) == num_reports)
+
+
+# Nested phases are not counted twice, and max_reports=0 keeps no reports
+@instrumentation.instrumented
+def nested_phases():
+    with instrumentation.phase('outer'):
+        sleep(0.02)
+        with instrumentation.phase('inner'):
+            sleep(0.05)
+
+
+instrumentation.enable()
+nested_phases()
+report = instrumentation.get_reports()[-1]
+assert(report['phases']['inner'] >= 0.05)
+assert(0.02 <= report['phases']['outer'] < 0.05)
+assert(report['wall_time'] >= sum(report['phases'].values()))
+instrumentation.enable(max_reports=0)
+nested_phases()
+assert(instrumentation.get_reports() == [])
+instrumentation.disable()
+
+# Check extraction of integration point values for many elements
+comps = ['S11', 'S22', 'S12']
+data = element_data.get_multiple_elements(odb, inst_name, [5, 2], 'S', comps,
+                                          step_numbers=[0, 1],
+                                          increments=[-1], ips=[1, 8])
+assert(data['values'].shape == (2, 2, 2, 3))
+for frame_ind, time in enumerate(data['time']):
+    for elem_ind, elem in enumerate([5, 2]):
+        for ip_ind, ip in enumerate([1, 8]):
+            for comp_ind, comp in enumerate(comps):
+                ref = mock_odb.ip_value('S', mock_odb.FIELDS['S'].index(comp),
+                                        elem, ip, time)
+                assert(abs(data['values'][frame_ind, elem_ind, ip_ind,
+                                          comp_ind] - ref) < 1.e-4)
+
+
+# Only the given elements are read, through an element set created once
+region = element_data.get_element_label_region(odb, inst_name, [5, 2])
+assert(sorted(region.element_labels) == [2, 5])
+assert(element_data.get_element_label_region(odb, inst_name, [2, 5])
+       is region)
+try:
+    element_data.get_multiple_elements(odb, inst_name, [], 'S', comps,
+                                       step_numbers=[1])
+    raise AssertionError('Expected ValueError for no elements')
+except ValueError as e:
+    assert('empty' in str(e))
+inst.elementSets['EEMPTY'] = mock_odb.OdbSet('EEMPTY', inst,
+                                             element_labels=[])
+try:
+    element_data.get_multiple_elements(odb, inst_name, 'EEMPTY', 'S', comps,
+                                       step_numbers=[1])
+    raise AssertionError('Expected ValueError for an empty element set')
+except ValueError as e:
+    assert('"EEMPTY"' in str(e))
+del inst.elementSets['EEMPTY']
+
+data = element_data.get_multiple_elements(odb, inst_name, 'EX0', 'S', comps,
+                                          step_numbers=[1])
+assert(list(data['element']) == [1, 2])
+assert(list(data['ip']) == list(range(1, 9)))
+assert(data['values'].shape == (4, 2, 8, 3))
+
+# Values at two section points, e.g. of a shell, must be selected by
+# section point instead of silently using one of them
+blocks = [mock_odb.FieldBulkData(
+    np.array([[1.0 + sp], [2.0 + sp], [3.0 + sp], [4.0 + sp]]), ('S11',),
+    inst, element_labels=np.array([1, 1, 2, 2]),
+    integration_points=np.array([1, 2, 1, 2]),
+    section_point=mock_odb.SectionPoint(sp)) for sp in (1, 5)]
+out = np.empty((2, 1))
+selector = element_data.IntegrationPointSelector([2, 1], [2], 5)
+selector.fill(blocks, [0], out)
+assert(np.all(out[:, 0] == [9.0, 7.0]))
+try:
+    element_data.IntegrationPointSelector([2, 1], [2]).fill(blocks, [0], out)
+    raise AssertionError('Expected ValueError for several section points')
+except ValueError as e:
+    assert('section_point' in str(e))
+
+# Check getting multiple variables at multiple positions in one pass
+data = bulk_data.get_multiple_positions_variables(odb, inst_name, pos, var,
+                                                  step_numbers=[0, 1])
+assert(data['values'].shape == (7, len(pos), len(var)))
+assert(data['values'].flags['C_CONTIGUOUS'])
+assert(list(data['label']) == labels)
+for var_ind, vn in enumerate(var):
+    ref = bulk_data.get_multiple_positions(odb, inst_name, pos, vn,
+                                           step_numbers=[0, 1])
+    for node_ind in range(len(pos)):
+        assert(np.all(data['values'][:, node_ind, var_ind] == ref[node_ind]))
+
+# Check that node_data can be imported without Abaqus, and that the
+# engine 'auto' then uses the bulk data engine
+from odb_scripts import node_data, backends
+assert(not backends.cae_available())
+assert(backends.resolve_engine('auto') == 'bulk')
+data = node_data.get_multiple_variables(odb, inst_name, pos[0], var,
+                                        step_numbers=[0, 1])
+ref = bulk_data.get_multiple_variables(odb, inst_name, pos[0], var,
+                                       step_numbers=[0, 1])
+assert(np.all(data.data == ref.data))
+try:
+    node_data.get_multiple_variables(odb, inst_name, pos[0], var, [0],
+                                     engine='xy')
+    raise AssertionError('Expected ImportError for the xy engine')
+except ImportError:
+    pass
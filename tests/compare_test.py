@@ -0,0 +1,48 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts.compare import compare_odbs, format_report
+import mock_odb
+
+
+# Test with mock odb files, does not require Abaqus
+out_dir = tempfile.mkdtemp()
+odb_files = []
+for name, num_frames in [('a', (3, 2)), ('b', (3, 2)), ('c', (3, 4))]:
+    odb_files.append(os.path.join(out_dir, name + '.odb'))
+    mock_odb.write_odb_file(odb_files[-1], shape=(4, 3, 3),
+                            num_frames=num_frames, block_size=7)
+odb_a, odb_b, odb_c = [mock_odb.openOdb(path) for path in odb_files]
+inst_name = 'PART-1-1'
+fields = ['U', 'S', 'MISES']
+
+# Identical results, matched by label and by coordinates
+for match in ['label', 'coordinates']:
+    report = compare_odbs(odb_a, odb_b, inst_name, fields, [0, 1],
+                          match=match)
+    assert(report['passed'] and report['failure'] is None)
+    assert(report['num_frames'] == (5, 5))
+    assert(np.all(report['fields']['U']['max_abs'] == 0.0))
+    assert(report['fields']['U']['compared'] == 4*3*3)
+    assert(report['fields']['S']['compared'] == 3*2*2*mock_odb.NUM_IPS)
+    assert(report['fields']['MISES']['unmatched'] == 0)
+assert('PASSED' in format_report(report))
+
+# The frame times of the second step differ, such that the values of the
+# second frame in the second step differ
+report = compare_odbs(odb_a, odb_c, inst_name, fields, [0, 1],
+                      stop_early=False)
+assert(not report['passed'] and report['failure'] == ('U', 4))
+assert(report['num_frames'] == (5, 7))
+assert(list(report['fields']['U']['passed']) == [True]*4 + [False])
+time_diff = report['time_b'][4] - report['time'][4]
+# Largest for the third component at the largest z coordinate
+ref_error = abs(time_diff)*3*(1.0 + 2.0)
+assert(np.isclose(report['fields']['U']['max_abs'][4], ref_error,
+                  rtol=1.e-4))
+assert('FAILED' in format_report(report))
+
+# Early exit after the first failing frame
+report = compare_odbs(odb_a, odb_c, inst_name, ['U'], [1], rtol=0.01)
+assert(report['failure'] == ('U', 1) and len(report['time']) == 2)
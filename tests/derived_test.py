@@ -0,0 +1,104 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import derived, bulk_data, element_data, reductions
+import mock_odb
+
+
+# Check the invariants for known stress states
+labels = ['S11', 'S22', 'S33', 'S12', 'S13', 'S23']
+uniaxial = [100.0, 0, 0, 0, 0, 0]
+shear = [0, 0, 0, 50.0, 0, 0]
+hydrostatic = [-30.0, -30.0, -30.0, 0, 0, 0]
+names = ['MISES', 'TRESCA', 'PRESS', 'MAX_PRINCIPAL', 'MIN_PRINCIPAL',
+         'INV3']
+values = derived.evaluate(names, np.array([uniaxial, shear, hydrostatic]),
+                          labels, 'S')
+assert(np.allclose(values[0], [100.0, 100.0, -100.0/3, 100.0, 0.0, 100.0]))
+assert(np.allclose(values[1], [np.sqrt(3)*50, 100.0, 0.0, 50.0, -50.0, 0.0]))
+assert(np.allclose(values[2], [0.0, 0.0, 30.0, -30.0, -30.0, 0.0]))
+
+# Principal values and directions of random tensors, with frames x points
+rand = np.random.RandomState(0).rand(3, 5, 6)
+names = ['MIN_PRINCIPAL', 'MID_PRINCIPAL', 'MAX_PRINCIPAL',
+         'MAX_PRINCIPAL_DIR1', 'MAX_PRINCIPAL_DIR2', 'MAX_PRINCIPAL_DIR3',
+         'S12']
+values = derived.evaluate(names, rand, labels, 'S')
+assert(values.shape == (3, 5, len(names)))
+tens = derived.tensor(rand, labels, 'S')
+direction = values[..., 3:6]
+assert(np.allclose(np.einsum('...ij,...j->...i', tens, direction),
+                   values[..., 2:3]*direction))
+assert(np.allclose(values[..., :3].sum(axis=-1),
+                   np.trace(tens, axis1=-2, axis2=-1)))
+assert(np.all(values[..., -1] == rand[..., 3]))
+
+# Plane stress components and engineering shear strains
+plane = derived.evaluate(['MISES'], np.array([[0, 0, 0, 50.0]]),
+                         ['S11', 'S22', 'S33', 'S12'], 'S')
+assert(np.allclose(plane, np.sqrt(3)*50))
+strain = derived.tensor(np.array([[0, 0, 0, 0.02]]),
+                        ['LE11', 'LE22', 'LE33', 'LE12'], 'LE')
+assert(np.allclose(strain[0, 0, 1], 0.01))
+assert(derived.split_derived('LE:MAX_PRINCIPAL') == ('LE', 'MAX_PRINCIPAL'))
+assert(derived.split_derived('RFMAG') == ('RF', 'MAG'))
+assert(derived.split_derived('U2') is None)
+
+# Derived quantities in the extraction functions, with mock odb
+odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+mock_odb.write_odb_file(odb_file, shape=(4, 3, 2), num_frames=(3, 4))
+odb = mock_odb.openOdb(odb_file)
+inst_name = 'PART-1-1'
+pos = [3.0, 2.0, 1.0]
+
+data = bulk_data.get_multiple_variables(odb, inst_name, pos,
+                                        ['U2', 'UMAG', 'U1'], [0, 1])
+ref = bulk_data.get_multiple_variables(odb, inst_name, pos,
+                                       ['U1', 'U2', 'U3'], [0, 1])
+assert(np.allclose(data['UMAG'], np.sqrt(np.sum(ref.data**2, axis=1))))
+assert(np.all(data['U2'] == ref['U2']))
+
+data = bulk_data.get_multiple_positions(odb, inst_name, 'X0', 'RFMAG', [1])
+assert(np.all(data.data >= 0))
+
+comps = ['S11', 'MISES', 'MAX_PRINCIPAL']
+data = element_data.get_multiple_elements(odb, inst_name, 'EX0', 'S',
+                                          comps, [1])
+raw = element_data.get_multiple_elements(odb, inst_name, 'EX0', 'S',
+                                         labels, [1])
+assert(np.all(data['values'][..., 0] == raw['values'][..., 0]))
+assert(np.allclose(data['values'][..., 1:],
+                   derived.evaluate(comps[1:], raw['values'], labels, 'S')))
+
+# Derived quantities of element fields are not available at the nodes
+for variables in (['MISES'], ['U1', 'S:MAX_PRINCIPAL']):
+    try:
+        bulk_data.get_multiple_variables(odb, inst_name, pos, variables, [0])
+        raise AssertionError('Expected ValueError for ' + str(variables))
+    except ValueError as e:
+        assert('only available at INTEGRATION_POINT' in str(e))
+try:
+    bulk_data.get_multiple_variables(odb, inst_name, pos, ['LE:MISES'], [0])
+    raise AssertionError('Expected ValueError for a missing field output')
+except ValueError as e:
+    assert('no field output LE' in str(e))
+
+# Existing field outputs ending with MAG are not derived, and magnitudes
+# are only computed for vector fields
+assert(derived.split_derived('PEMAG', ['U', 'PEMAG']) is None)
+assert(derived.split_derived('PEMAG') == ('PE', 'MAG'))
+data = element_data.get_multiple_elements(odb, inst_name, 'EX0', 'PEMAG',
+                                          ['PEMAG'], [1], increments=[-1])
+ref = mock_odb.ip_value('PEMAG', 0, data['element'][:, np.newaxis],
+                        np.arange(1, mock_odb.NUM_IPS + 1), data['time'][0])
+assert(np.allclose(data['values'][0, :, :, 0], ref))
+data = reductions.get_set_reduction(odb, inst_name, 'EX0', 'PEMAG', [1],
+                                    increments=[-1], reductions=['max'])
+assert(np.isclose(data['max'][0], np.max(ref)))
+try:
+    element_data.get_multiple_elements(odb, inst_name, 'EX0', 'S', ['SMAG'],
+                                       [1])
+    raise AssertionError('Magnitude of a tensor accepted')
+except ValueError as e:
+    assert('only computed for vector fields' in str(e))
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import field_dump, bulk_data, element_data
+from odb_scripts.field_reader import FieldDump
+import mock_odb
+
+
+# Test with mock odb, does not require Abaqus
+odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+mock_odb.write_odb_file(odb_file, shape=(4, 3, 2), num_frames=(3, 4),
+                        block_size=7)
+odb = mock_odb.openOdb(odb_file)
+inst_name = 'PART-1-1'
+
+# Dump a nodal field and compare with the bulk data extraction
+out_dir = os.path.join(tempfile.mkdtemp(), 'U')
+header = field_dump.dump_field(odb, inst_name, 'U', out_dir, [0, 1],
+                               increments=[0, -1])
+dump = FieldDump(out_dir)
+assert(dump.position == 'nodal')
+assert(dump.components == ['U1', 'U2', 'U3'])
+assert(dump.values.shape == (4, 4*3*2, 3))
+assert(isinstance(dump.values, np.memmap))
+assert(np.all(np.diff(dump.labels) > 0))
+assert(dump.step.tolist() == [0, 0, 1, 1])
+assert(dump.incr.tolist() == [0, 2, 0, 3])
+assert(dump.frame_index(1, 3) == 3)
+
+ref = bulk_data.get_multiple_positions(odb, inst_name, dump.coords, 'U2',
+                                       [0, 1], increments=[0, -1])
+assert(np.allclose(dump.time, ref['time']))
+assert(np.allclose(dump.values[:, :, 1], ref.data, rtol=1.e-6))
+
+inds = dump.indices([5, 2])
+assert(dump.labels[inds].tolist() == [5, 2])
+
+# Dump an integration point field for an element set
+out_dir = os.path.join(tempfile.mkdtemp(), 'S')
+field_dump.dump_field(odb, inst_name, 'S', out_dir, [1],
+                      region='EX0', components=['S11', 'S12'],
+                      dtype='float64')
+dump = FieldDump(out_dir)
+assert(dump.position == 'integration_point')
+ref = element_data.get_multiple_elements(odb, inst_name, 'EX0', 'S',
+                                         ['S11', 'S12'], [1])
+num_elements = len(ref['element'])
+assert(dump.values.shape == (4, num_elements*mock_odb.NUM_IPS, 2))
+assert(dump.values.dtype == np.float64)
+assert(np.all(dump.values[...]
+              == ref['values'].reshape(4, -1, 2)))
+inds = dump.indices(ref['element'][-1:])
+assert(dump.ip[inds].tolist() == list(range(1, mock_odb.NUM_IPS + 1)))
+
+# An interrupted dump cannot be opened
+os.remove(os.path.join(out_dir, 'header.json'))
+try:
+    FieldDump(out_dir)
+    raise AssertionError('Expected IOError for missing header')
+except IOError:
+    pass
+
+# Mixed mesh with values at two section points: element 1 has one
+# integration point, and element 2 has no values (e.g. a spring)
+mixed_file = os.path.join(tempfile.mkdtemp(), 'mixed.odb')
+mock_odb.write_odb_file(mixed_file, shape=(4, 3, 2), num_frames=(2,),
+                        block_size=4, element_ips={1: 1, 2: 0},
+                        section_points=[1, 5])
+mixed = mock_odb.openOdb(mixed_file)
+out_dir = os.path.join(tempfile.mkdtemp(), 'S_mixed')
+try:
+    field_dump.dump_field(mixed, inst_name, 'S', out_dir, [0])
+    raise AssertionError('Expected ValueError for several section points')
+except ValueError as e:
+    assert('section_point' in str(e))
+header = field_dump.dump_field(mixed, inst_name, 'S', out_dir, [0],
+                               components=['S22'], section_point=5)
+assert(header['section_point'] == 5)
+dump = FieldDump(out_dir)
+num_elements = 3*2*1
+assert(dump.labels.tolist() == [1] + [label for label in
+                                      range(3, num_elements + 1)
+                                      for ip in range(mock_odb.NUM_IPS)])
+assert(dump.ip.tolist() == [1] + list(range(1, mock_odb.NUM_IPS + 1))
+       *(num_elements - 2))
+ref = 5000.0 + mock_odb.ip_value('S', 1, dump.labels, dump.ip,
+                                 dump.time[:, np.newaxis])
+assert(np.allclose(dump.values[:, :, 0], ref))
+
+# An empty element set is reported
+inst = mixed.rootAssembly.instances[inst_name]
+inst.elementSets['EMPTY'] = mock_odb.OdbSet('EMPTY', inst, element_labels=[])
+try:
+    field_dump.dump_field(mixed, inst_name, 'S', out_dir, [0],
+                          region='EMPTY')
+    raise AssertionError('Expected ValueError for an empty set')
+except ValueError as e:
+    assert('EMPTY' in str(e))
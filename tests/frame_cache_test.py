@@ -0,0 +1,55 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import bulk_data, frame_cache
+import mock_odb
+
+
+# Test with mock odb, does not require Abaqus
+odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+mock_odb.write_odb_file(odb_file, shape=(5, 4, 3), num_frames=(3, 2))
+odb = mock_odb.openOdb(odb_file)
+inst_name = 'PART-1-1'
+positions = [[0.0, 0.0, 0.0], [4.0, 3.0, 2.0], [1.0, 2.0, 1.0]]
+
+refs = [bulk_data.get_multiple_positions(odb, inst_name, positions, 'U2',
+                                         [0, 1]),
+        bulk_data.get_multiple_variables(odb, inst_name, positions[1],
+                                         ['U1', 'UMAG'], [0, 1])]
+
+cache = frame_cache.default_cache
+cache.clear()
+cache.reset_stats()
+cache.max_bytes = 10*1024**2
+try:
+    for repeat in range(2):
+        data = [bulk_data.get_multiple_positions(odb, inst_name, positions,
+                                                 'U2', [0, 1]),
+                bulk_data.get_multiple_variables(odb, inst_name, positions[1],
+                                                 ['U1', 'UMAG'], [0, 1])]
+        for result, ref in zip(data, refs):
+            assert(np.all(result.data == ref.data))
+            assert(np.all(result.time == ref.time))
+        # One entry per frame for the field output U, read once
+        assert(cache.stats()['misses'] == 5)
+        assert(cache.stats()['hits'] == 5 + 10*repeat)
+    assert(cache.stats()['entries'] == 5)
+
+    # Node sets are cached separately from the instance
+    ref = bulk_data.get_multiple_positions(odb, inst_name, 'X0', 'U3', [1])
+    assert(cache.stats()['entries'] == 7)
+
+    # Least recently used entries are removed to respect the budget
+    cache.max_bytes = cache.memory()//2
+    bulk_data.get_multiple_positions(odb, inst_name, 'X0', 'U3', [0])
+    assert(cache.stats()['entries'] < 10)
+    assert(cache.memory() <= cache.max_bytes)
+    assert(cache.stats()['evictions'] > 0)
+
+    cache.clear(odb.name)
+    assert(cache.stats()['entries'] == 0 and cache.memory() == 0)
+finally:
+    cache.max_bytes = 0
+    cache.clear()
+    cache.reset_stats()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import mesh_table, node_data
+from odb_scripts.mesh_table import MeshTable, get_mesh_table
+import mock_odb
+
+
+# Test with mock odb, does not require Abaqus
+odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+mock_odb.write_odb_file(odb_file, shape=(4, 3, 2), num_frames=(2,))
+odb = mock_odb.openOdb(odb_file)
+inst_name = 'PART-1-1'
+inst = odb.rootAssembly.instances[inst_name]
+
+# The table is sorted by label, although the instance is not
+table = get_mesh_table(odb, inst_name)
+assert(get_mesh_table(odb, inst_name) is table)
+assert(np.all(table.labels == np.arange(1, 4*3*2 + 1)))
+labels = [19, 1, 12]
+assert(np.all(table.indices(labels) == [18, 0, 11]))
+assert(np.all(table.coordinates(labels)
+              == inst.node_coords[inst.node_indices(labels)]))
+try:
+    table.indices([1, 25])
+    raise AssertionError('Missing node label accepted')
+except ValueError as e:
+    assert('[25]' in str(e))
+
+# Sets are read once, in the order given by the odb
+set_labels = table.node_set_labels('X0')
+assert(np.all(set_labels == inst.nodeSets['X0'].node_labels))
+assert(table.node_set_labels('X0') is set_labels)
+assert(np.all(table.element_set_labels('EX0')
+              == inst.elementSets['EX0'].element_labels))
+
+# Save and load a table without the odb
+table_file = os.path.join(tempfile.mkdtemp(), 'table.npz')
+table.save(table_file)
+loaded = MeshTable.load(table_file)
+assert(np.all(loaded.labels == table.labels))
+assert(np.all(loaded.connectivity == table.connectivity))
+assert(np.all(loaded.node_set_labels('EDGE')
+              == table.node_set_labels('EDGE')))
+assert(loaded.find_labels([[1.0, 2.0, 1.0]], 1.e-2) == [12])
+
+# The node_data helpers use the cached table
+node_labels, coords = node_data.get_node_coordinates(odb, inst_name)
+assert(node_labels is table.labels and coords is table.coords)
+assert(node_data.get_node_grid(odb, inst_name) is table.grid)
+node_data.clear_node_cache()
+assert(get_mesh_table(odb, inst_name) is not table)
+mesh_table.clear_cache(odb.name)
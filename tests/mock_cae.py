@@ -0,0 +1,113 @@
+""" A stand-in for the parts of the Abaqus session used by the 'xy'
+engine, for the odb objects of :py:mod:`mock_odb`. :py:func:`install`
+registers the modules abaqus, abaqusConstants and visualization, such
+that :py:mod:`odb_scripts.backends` finds the CAE kernel.
+
+The xy data objects are named as by Abaqus, e.g.
+'U:U1 PI: PART-1-1 N: 12', with one object per variable and unique
+node, and the values given by :py:func:`mock_odb.nodal_value`.
+"""
+from __future__ import print_function, division
+import sys
+import types
+import numpy as np
+
+from odb_scripts import backends
+import mock_odb
+
+
+NODAL = 'NODAL'
+COMPONENT = 'COMPONENT'
+
+
+class XYData(object):
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+
+class OdbData(object):
+    def __init__(self, odb):
+        self.steps = odb.steps
+        self.activeFrames = [(name, ('0:-1',)) for name in odb.steps.keys()]
+
+    def setValues(self, activeFrames):
+        self.activeFrames = []
+        for step_name, incr in activeFrames:
+            if list(incr) == ['0:-1']:
+                self.activeFrames.append((step_name, ('0:-1',)))
+            else:
+                num_frames = len(self.steps[step_name].frames)
+                frame_nums = sorted(set(int(i) % num_frames for i in incr))
+                self.activeFrames.append((step_name, tuple(frame_nums)))
+
+
+class Viewport(object):
+    def setValues(self, displayedObject=None):
+        self.displayedObject = displayedObject
+
+
+class Session(object):
+    def __init__(self):
+        self.viewports = mock_odb.Repository()
+        self.viewports['Viewport: 1'] = Viewport()
+        self.odbData = {}
+
+    def openOdb(self, path, readOnly=True):
+        odb = mock_odb.openOdb(path, readOnly)
+        self.odbData[odb.name] = OdbData(odb)
+        return odb
+
+    def xyDataListFromField(self, odb, outputPosition, variable, nodeLabels):
+        frames = []
+        for step_name, incr in self.odbData[odb.name].activeFrames:
+            step = odb.steps[step_name]
+            if isinstance(incr[0], str):
+                incr = range(len(step.frames))
+            frames += [step.frames[frame_num] for frame_num in incr]
+        time = np.array([frame.total_time for frame in frames])
+
+        xy_data_list = []
+        for field_name, position, ((_, component),) in variable:
+            comp_ind = mock_odb.FIELDS[field_name].index(component)
+            for inst_name, labels in nodeLabels:
+                inst = odb.rootAssembly.instances[inst_name]
+                for label in sorted(set(labels)):
+                    coords = inst.node_coords[inst.node_indices([label])]
+                    values = [mock_odb.nodal_value(field_name, comp_ind,
+                                                   np.array([label]), coords,
+                                                   t)[0] for t in time]
+                    name = (field_name + ':' + component + ' PI: '
+                            + inst_name + ' N: ' + str(label))
+                    xy_data_list.append(XYData(name, tuple(zip(time,
+                                                               values))))
+        return xy_data_list
+
+
+session = Session()
+
+
+MODULES = ('abaqus', 'abaqusConstants', 'visualization')
+
+
+def install():
+    """ Register the mock modules abaqus, abaqusConstants and
+    visualization. Call :py:func:`uninstall` when done, such that other
+    tests in the same process use the bulk engine.
+    """
+    abaqus = types.ModuleType('abaqus')
+    abaqus.session = session
+    constants = types.ModuleType('abaqusConstants')
+    constants.NODAL = NODAL
+    constants.COMPONENT = COMPONENT
+    sys.modules['abaqus'] = abaqus
+    sys.modules['abaqusConstants'] = constants
+    sys.modules['visualization'] = types.ModuleType('visualization')
+    backends._cae.clear()
+
+
+def uninstall():
+    """ Remove the mock modules registered by :py:func:`install` """
+    for name in MODULES:
+        sys.modules.pop(name, None)
+    backends._cae.clear()
@@ -0,0 +1,408 @@
+""" A stand-in for the parts of the Abaqus odb object model used by
+odb_scripts, making it possible to test the odb access without Abaqus.
+
+The "odb file" is a json file describing a structured mesh and the
+steps, written by :py:func:`write_odb_file` and opened by
+:py:func:`openOdb`. Field values are not stored, but are calculated by
+:py:func:`nodal_value` when requested, such that the expected results
+are known in the tests.
+"""
+from __future__ import print_function, division
+import json
+from collections import OrderedDict
+import numpy as np
+
+
+FIELDS = OrderedDict([('U', ('U1', 'U2', 'U3')),
+                      ('RF', ('RF1', 'RF2', 'RF3')),
+                      ('S', ('S11', 'S22', 'S33', 'S12', 'S13', 'S23')),
+                      ('PEMAG', ())])
+NODAL_FIELDS = ('U', 'RF')
+NUM_IPS = 8
+
+
+def nodal_value(field_name, comp_ind, labels, coords, time):
+    """ The value of a nodal field component
+
+    :param field_name: The field name, e.g. 'U'
+    :type field_name: str
+
+    :param comp_ind: The component index (0 for U1)
+    :type comp_ind: int
+
+    :param labels: The node labels
+    :type labels: np.array
+
+    :param coords: The node coordinates
+    :type coords: np.array (N x 3)
+
+    :param time: The total time
+    :type time: float
+
+    :returns: The values
+    :rtype: np.array
+
+    """
+    scale = 1.0 if field_name == 'U' else -10.0
+    return scale*(time*(comp_ind + 1)*(1.0 + coords[:, comp_ind])
+                  + 1.e-3*labels)
+
+
+def ip_value(field_name, comp_ind, element_labels, ips, time):
+    """ The value of a field component at integration points
+
+    :param field_name: The field name, e.g. 'S'
+    :type field_name: str
+
+    :param comp_ind: The component index (0 for S11)
+    :type comp_ind: int
+
+    :param element_labels: The element labels
+    :type element_labels: np.array
+
+    :param ips: The integration point numbers
+    :type ips: np.array
+
+    :param time: The total time
+    :type time: float
+
+    :returns: The values
+    :rtype: np.array
+
+    """
+    return 10.0*time*(comp_ind + 1) + element_labels + 0.1*ips
+
+
+def write_odb_file(path, shape=(4, 3, 2), num_frames=(3, 4), block_size=None,
+                   node_sets=None, element_ips=None, section_points=None):
+    """ Write a mock odb file.
+
+    :param path: The file path
+    :type path: str
+
+    :param shape: Number of nodes in each coordinate direction of the
+                  structured mesh, with unit node spacing
+    :type shape: tuple( int )
+
+    :param num_frames: The number of frames for each step. Each step has
+                       unit step time.
+    :type num_frames: tuple( int )
+
+    :param block_size: The maximum number of nodes in each bulk data
+                       block. If None, the nodes are split into two
+                       blocks.
+    :type block_size: int
+
+    :param node_sets: Additional node sets, given as {name: size}, with
+                      randomly chosen nodes
+    :type node_sets: dict
+
+    :param element_ips: The number of integration points of elements
+                        that do not have NUM_IPS, given as
+                        {label: num_ips}, e.g. for mixed meshes. Elements
+                        with 0 integration points have no values, e.g.
+                        springs.
+    :type element_ips: dict
+
+    :param section_points: The section point numbers of the values at
+                           the integration points, e.g. for shells. The
+                           values at section point n are increased by
+                           1000*n. If None, the values have no section
+                           points.
+    :type section_points: list[ int ]
+
+    """
+    element_ips = dict((str(label), num_ips) for label, num_ips
+                       in (element_ips or {}).items())
+    with open(path, 'w') as fid:
+        json.dump({'shape': list(shape), 'num_frames': list(num_frames),
+                   'block_size': block_size, 'node_sets': node_sets,
+                   'element_ips': element_ips,
+                   'section_points': section_points}, fid)
+
+
+def openOdb(path, readOnly=True):
+    """ Open a mock odb file written by :py:func:`write_odb_file` """
+    with open(path, 'r') as fid:
+        spec = json.load(fid)
+    return Odb(path, **spec)
+
+
+class Repository(OrderedDict):
+    """ Ordered dictionary where keys() return a list, as for Abaqus """
+    def keys(self):
+        return list(OrderedDict.keys(self))
+
+
+class OdbMeshNode(object):
+    def __init__(self, label, coordinates, instance_name):
+        self.label = label
+        self.coordinates = coordinates
+        self.instanceName = instance_name
+
+
+class OdbMeshElement(object):
+    def __init__(self, label, connectivity, element_type, instance_name):
+        self.label = label
+        self.connectivity = connectivity
+        self.type = element_type
+        self.instanceName = instance_name
+
+
+class OdbSet(object):
+    def __init__(self, name, instance, node_labels=(), element_labels=()):
+        self.name = name
+        self.instance = instance
+        self.node_labels = np.asarray(node_labels, dtype=int)
+        self.element_labels = np.asarray(element_labels, dtype=int)
+
+    @property
+    def nodes(self):
+        inds = self.instance.node_indices(self.node_labels)
+        return [self.instance.nodes[i] for i in inds]
+
+    @property
+    def elements(self):
+        return [self.instance.elements[label - 1]
+                for label in self.element_labels]
+
+
+class OdbInstance(object):
+    def __init__(self, name, shape, node_sets=None):
+        self.name = name
+        grids = np.meshgrid(*[np.arange(n, dtype=float) for n in shape],
+                            indexing='ij')
+        coords = np.transpose([g.ravel() for g in grids])
+        # Store the nodes in reversed label order, such that the code
+        # under test cannot rely on sorted node storage
+        num_nodes = coords.shape[0]
+        self.node_labels = np.arange(num_nodes, 0, -1)
+        self.node_coords = coords[::-1].copy()
+        self._nodes = None
+
+        self.nodeSets = Repository()
+        all_labels = self.node_labels[::-1]
+        self.nodeSets['ALL'] = OdbSet('ALL', self, all_labels)
+        x0 = self.node_coords[:, 0] == 0.0
+        self.nodeSets['X0'] = OdbSet('X0', self, self.node_labels[x0])
+        edge = np.all(self.node_coords[:, 1:] == 0.0, axis=1)
+        self.nodeSets['EDGE'] = OdbSet('EDGE', self, self.node_labels[edge])
+        random_state = np.random.RandomState(0)
+        for set_name, set_size in sorted((node_sets or {}).items()):
+            set_labels = random_state.permutation(num_nodes)[:set_size] + 1
+            self.nodeSets[set_name] = OdbSet(set_name, self, set_labels)
+
+        # Hexahedral elements, with labels in the order of the lower
+        # corner node (i, j, k)
+        node_nums = np.arange(1, num_nodes + 1).reshape(shape)
+        corners = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+                   (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+        num_elems = [n - 1 for n in shape]
+        self.connectivity = np.transpose(
+            [node_nums[i:i + num_elems[0], j:j + num_elems[1],
+                       k:k + num_elems[2]].ravel() for i, j, k in corners])
+        self._elements = None
+        self.elementSets = Repository()
+        elem_labels = np.arange(1, self.connectivity.shape[0] + 1)
+        self.elementSets['EALL'] = OdbSet('EALL', self,
+                                          element_labels=elem_labels)
+        elem_x0 = np.arange(self.connectivity.shape[0]) < (num_elems[1]
+                                                           * num_elems[2])
+        self.elementSets['EX0'] = OdbSet('EX0', self,
+                                         element_labels=elem_labels[elem_x0])
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self._nodes = [OdbMeshNode(int(label), tuple(coord), self.name)
+                           for label, coord in zip(self.node_labels,
+                                                   self.node_coords)]
+        return self._nodes
+
+    @property
+    def elements(self):
+        if self._elements is None:
+            self._elements = [OdbMeshElement(label + 1, tuple(conn),
+                                             'C3D8', self.name)
+                              for label, conn in enumerate(
+                                  self.connectivity.tolist())]
+        return self._elements
+
+    def getNodeFromLabel(self, label):
+        return self.nodes[int(self.node_indices(label))]
+
+    def NodeSetFromNodeLabels(self, name, nodeLabels):
+        self.nodeSets[name] = OdbSet(name, self, nodeLabels)
+        return self.nodeSets[name]
+
+    def ElementSetFromElementLabels(self, name, elementLabels):
+        self.elementSets[name] = OdbSet(name, self,
+                                        element_labels=elementLabels)
+        return self.elementSets[name]
+
+    def node_indices(self, labels):
+        # Labels are stored in reversed order, 1-based
+        return len(self.node_labels) - np.asarray(labels, dtype=int)
+
+
+class OdbAssembly(object):
+    def __init__(self, shape, node_sets=None):
+        self.instances = Repository()
+        self.instances['PART-1-1'] = OdbInstance('PART-1-1', shape,
+                                                 node_sets)
+
+
+class SectionPoint(object):
+    def __init__(self, number, description=''):
+        self.number = number
+        self.description = description
+
+
+class FieldBulkData(object):
+    def __init__(self, data, component_labels, instance, node_labels=None,
+                 element_labels=None, integration_points=None,
+                 section_point=None):
+        self.sectionPoint = section_point
+        self.data = data
+        self.componentLabels = component_labels
+        self.instance = instance
+        self.nodeLabels = node_labels
+        self.elementLabels = element_labels
+        self.integrationPoints = integration_points
+
+
+class FieldLocation(object):
+    def __init__(self, position):
+        self.position = position
+
+
+class FieldOutput(object):
+    def __init__(self, name, frame, region=None):
+        self.name = name
+        self.componentLabels = FIELDS[name]
+        self.locations = [FieldLocation('NODAL' if name in NODAL_FIELDS
+                                        else 'INTEGRATION_POINT')]
+        self._frame = frame
+        self._region = region
+
+    def getSubset(self, region=None, position=None):
+        return FieldOutput(self.name, self._frame, region)
+
+    @property
+    def bulkDataBlocks(self):
+        odb = self._frame.odb
+        at_nodes = self.name in NODAL_FIELDS
+        if self._region is None:
+            instances = odb.rootAssembly.instances.values()
+        elif isinstance(self._region, OdbInstance):
+            instances = [self._region]
+        elif isinstance(self._region, OdbMeshNode):
+            instances = [odb.rootAssembly.instances[
+                self._region.instanceName]]
+        else:
+            instances = [self._region.instance]
+
+        blocks = []
+        for inst in instances:
+            if at_nodes:
+                labels = inst.node_labels
+            else:
+                labels = np.arange(1, inst.connectivity.shape[0] + 1)
+            if isinstance(self._region, OdbSet):
+                if at_nodes:
+                    labels = self._region.node_labels
+                else:
+                    labels = self._region.element_labels
+            elif isinstance(self._region, OdbMeshNode):
+                if not at_nodes:
+                    continue
+                labels = np.array([self._region.label])
+
+            block_size = odb.block_size
+            if block_size is None:
+                block_size = max(1, (len(labels) + 1)//2)
+            for start in range(0, len(labels), block_size):
+                block_labels = labels[start:start + block_size]
+                if at_nodes:
+                    blocks.append(self._nodal_block(inst, block_labels))
+                else:
+                    blocks += self._ip_blocks(inst, block_labels)
+        return blocks
+
+    def _nodal_block(self, inst, labels):
+        coords = inst.node_coords[inst.node_indices(labels)]
+        data = np.empty((len(labels), len(self.componentLabels)),
+                        dtype=np.float32)
+        for comp_ind in range(len(self.componentLabels)):
+            data[:, comp_ind] = nodal_value(self.name, comp_ind, labels,
+                                            coords, self._frame.total_time)
+        return FieldBulkData(data, self.componentLabels, inst,
+                             node_labels=labels)
+
+    def _ip_blocks(self, inst, element_labels):
+        odb = self._frame.odb
+        num_ips = [odb.element_ips.get(label, NUM_IPS)
+                   for label in np.asarray(element_labels).tolist()]
+        ips = np.array([ip for n in num_ips for ip in range(1, n + 1)],
+                       dtype=int)
+        element_labels = np.repeat(element_labels, num_ips)
+        if odb.section_points is None:
+            return [self._ip_block(inst, element_labels, ips)]
+        return [self._ip_block(inst, element_labels, ips, number)
+                for number in odb.section_points]
+
+    def _ip_block(self, inst, element_labels, ips, section_point=None):
+        # Scalar fields, e.g. PEMAG, have one column and no labels
+        num_comps = max(len(self.componentLabels), 1)
+        data = np.empty((len(element_labels), num_comps), dtype=np.float32)
+        for comp_ind in range(num_comps):
+            data[:, comp_ind] = ip_value(self.name, comp_ind, element_labels,
+                                         ips, self._frame.total_time)
+        if section_point is None:
+            return FieldBulkData(data, self.componentLabels, inst,
+                                 element_labels=element_labels,
+                                 integration_points=ips)
+        data += 1000.0*section_point
+        return FieldBulkData(data, self.componentLabels, inst,
+                             element_labels=element_labels,
+                             integration_points=ips,
+                             section_point=SectionPoint(section_point))
+
+
+class OdbFrame(object):
+    def __init__(self, odb, step, frame_id, frame_value):
+        self.odb = odb
+        self.frameId = frame_id
+        self.frameValue = frame_value
+        self.total_time = step.totalTime + frame_value
+        self.fieldOutputs = Repository()
+        for name in FIELDS:
+            self.fieldOutputs[name] = FieldOutput(name, self)
+
+
+class OdbStep(object):
+    def __init__(self, odb, name, total_time, num_frames):
+        self.name = name
+        self.totalTime = total_time
+        self.frames = [OdbFrame(odb, self, i, i/max(num_frames - 1, 1))
+                       for i in range(num_frames)]
+
+
+class Odb(object):
+    def __init__(self, path, shape, num_frames, block_size=None,
+                 node_sets=None, element_ips=None, section_points=None):
+        self.name = path
+        self.path = path
+        self.block_size = block_size
+        self.element_ips = dict((int(label), num_ips) for label, num_ips
+                                in (element_ips or {}).items())
+        self.section_points = section_points
+        self.rootAssembly = OdbAssembly(shape, node_sets)
+        self.steps = Repository()
+        for step_num, step_frames in enumerate(num_frames):
+            name = 'Step-' + str(step_num + 1)
+            self.steps[name] = OdbStep(self, name, float(step_num),
+                                       step_frames)
+
+    def close(self):
+        pass
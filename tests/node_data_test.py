@@ -61,3 +61,13 @@ for vn in var:
 # Check that a value is correctly extracted
 node_u1_disp = 3.64039
 assert(abs(data['U1'][-1] - node_u1_disp) < 1.e-5)
+
+# Check getting multiple variables at multiple positions
+data = node_data.get_multiple_positions_variables(odb_3d, inst_name, pos, var,
+                                                  step_numbers=[0,1])
+ref_data = node_data.get_multiple_positions(odb_3d, inst_name, pos, var[1],
+                                            step_numbers=[0,1])
+assert(data['values'].shape == (len(data['time']), len(pos), len(var)))
+assert(abs(data['values'][-1, 0, 0] - node_u1_disp) < 1.e-5)
+for node_ind in range(len(pos)):
+    assert(np.allclose(data['values'][:, node_ind, 1], ref_data[node_ind]))
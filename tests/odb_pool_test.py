@@ -0,0 +1,58 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import bulk_data, mesh_table, odb_pool
+import mock_odb
+
+
+# Test with mock odb, does not require Abaqus
+odb_dir = tempfile.mkdtemp()
+odb_paths = [os.path.join(odb_dir, 'job' + str(i) + '.odb') for i in range(3)]
+for odb_path in odb_paths:
+    mock_odb.write_odb_file(odb_path, shape=(3, 2, 2), num_frames=(2,))
+
+# Reuse and least recently used eviction by count
+pool = odb_pool.OdbPool(max_open=2, odb_module='mock_odb')
+odb = pool.get(odb_paths[0])
+assert(pool.get(odb_paths[0]) is odb)
+pool.get(odb_paths[1])
+pool.get(odb_paths[0])
+pool.get(odb_paths[2])  # Evicts odb_paths[1], the least recently used
+assert(pool.open_paths() == [odb_paths[0], odb_paths[2]])
+assert(pool.stats() == {'hits': 2, 'misses': 3, 'evictions': 1, 'open': 2,
+                        'bytes': pool.memory()})
+pool.close_all()
+assert(pool.open_paths() == [])
+
+# Eviction by memory, keeping the most recently used odb
+sizes = {odb_paths[0]: 60, odb_paths[1]: 50, odb_paths[2]: 200}
+pool = odb_pool.OdbPool(max_open=10, max_bytes=100, odb_module='mock_odb',
+                        size_function=sizes.get)
+pool.get(odb_paths[0])
+pool.get(odb_paths[1])
+assert(pool.open_paths() == [odb_paths[1]] and pool.memory() == 50)
+pool.get(odb_paths[2])
+assert(pool.open_paths() == [odb_paths[2]])
+assert(pool.stats()['evictions'] == 2)
+
+# Evicted odb files are removed from the mesh table cache
+mesh_table.clear_cache()
+odb = pool.get(odb_paths[2])
+mesh_table.get_mesh_table(odb, 'PART-1-1')
+assert(len(mesh_table._mesh_tables) == 1)
+pool.get(odb_paths[0])
+assert(len(mesh_table._mesh_tables) == 0)
+pool.close_all()
+
+# Extraction functions accept paths, opened through the default pool
+odb_pool.default_pool.odb_module = 'mock_odb'
+ref = bulk_data.get_multiple_positions(mock_odb.openOdb(odb_paths[1]),
+                                       'PART-1-1', 'X0', 'U1', [0])
+for _ in range(2):
+    data = bulk_data.get_multiple_positions(odb_paths[1], 'PART-1-1', 'X0',
+                                            'U1', [0])
+    assert(np.all(data.data == ref.data))
+stats = odb_pool.default_pool.stats()
+assert(stats['misses'] == 1 and stats['hits'] == 1)
+odb_pool.default_pool.close_all()
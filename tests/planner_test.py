@@ -0,0 +1,51 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import bulk_data, instrumentation
+from odb_scripts.planner import QueryPlan
+import mock_odb
+
+
+# Test with mock odb, does not require Abaqus
+odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+mock_odb.write_odb_file(odb_file, shape=(5, 4, 3), num_frames=(3, 4))
+odb = mock_odb.openOdb(odb_file)
+inst_name = 'PART-1-1'
+
+calls = [('get_multiple_positions', (inst_name, 'X0', 'U2', [0, 1])),
+         ('get_multiple_positions', (inst_name, [[1.0, 1.0, 1.0],
+                                                 [4.0, 0.0, 2.0]],
+                                     'RF1', [1], [0, '2:-1'])),
+         ('get_multiple_variables', (inst_name, [0.0, 3.0, 2.0],
+                                     ['U1', 'UMAG', 'RF3'], [0, 1], [-1])),
+         ('get_multiple_positions_variables', (inst_name, 'EDGE',
+                                               ['U3', 'U1'], [1]))]
+
+plan = QueryPlan(odb)
+requests = [getattr(plan, function)(*args) for function, args in calls]
+instrumentation.enable()
+try:
+    results = plan.run()
+    report = instrumentation.get_reports()[-1]
+finally:
+    instrumentation.disable()
+    instrumentation.clear()
+
+# One pass over the union of the frames
+assert(report['function'] == 'run_requests')
+assert(report['counts']['frames_read'] == 7)
+assert(report['counts']['planned_requests'] == 4)
+
+for (function, args), request, result in zip(calls, requests, results):
+    assert(request.result is result)
+    ref = getattr(bulk_data, function)(odb, *args)
+    assert(sorted(result, key=str) == sorted(ref, key=str))
+    for key in ref:
+        if key == 'variables':
+            assert(result[key] == ref[key])
+        else:
+            assert(np.all(np.asarray(result[key]) == np.asarray(ref[key])))
+
+# Running again only extracts new requests
+assert(plan.run()[0] is results[0])
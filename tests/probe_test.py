@@ -0,0 +1,53 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import probe, mesh_table
+import mock_odb
+
+
+# Test with mock odb, does not require Abaqus
+odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+shape = (5, 4, 3)
+mock_odb.write_odb_file(odb_file, shape=shape, num_frames=(3, 2))
+odb = mock_odb.openOdb(odb_file)
+inst_name = 'PART-1-1'
+
+
+def expected(variable, points, time):
+    # The mock values are linear in the coordinates, including the node
+    # labels of the regular grid, and are interpolated exactly
+    comp_ind = mock_odb.FIELDS[variable[:-1]].index(variable)
+    labels = (1 + points[:, 0]*shape[1]*shape[2] + points[:, 1]*shape[2]
+              + points[:, 2])
+    return mock_odb.nodal_value(variable[:-1], comp_ind, labels, points, time)
+
+
+# Line through the mesh, starting and ending outside
+points = probe.line_points([-0.5, 0.3, 0.7], [4.5, 2.9, 1.1], 201)
+variables = ['U1', 'RF3']
+data = probe.get_path_values(odb, inst_name, points, variables, [0, 1])
+assert(data['values'].shape == (5, len(points), len(variables)))
+outside = np.any((points < 0) | (points > np.array(shape) - 1), axis=1)
+assert(np.all((data['element'] == -1) == outside))
+assert(np.all(np.isnan(data['values'][:, outside])))
+for frame_ind, time in enumerate(data['time']):
+    for var_ind, variable in enumerate(variables):
+        ref = expected(variable, points[~outside], time)
+        assert(np.allclose(data['values'][frame_ind, ~outside, var_ind], ref,
+                           rtol=1.e-5))
+
+# Points at nodes and on element faces, and reuse of the probe
+table = mesh_table.get_mesh_table(odb, inst_name)
+points = np.vstack((table.coords[::7], [[1.5, 1.0, 0.5], [4.0, 3.0, 2.0]]))
+line_probe = probe.Probe(table, points)
+assert(np.all(line_probe.found))
+assert(len(line_probe.node_labels) < len(table.labels))
+data = probe.get_path_values(odb, inst_name, line_probe, ['U2'], [1],
+                             increments=[-1])
+assert(np.allclose(data['values'][0, :, 0],
+                   expected('U2', points, data['time'][0]), rtol=1.e-5))
+
+# Element spatial index candidates contain the containing element
+point_inds, elem_inds = table.element_grid.candidates([[0.5, 0.5, 0.5]])
+assert(1 in table.element_labels[elem_inds])
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import reductions, bulk_data, element_data
+import mock_odb
+
+
+# Test with mock odb, does not require Abaqus
+odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+mock_odb.write_odb_file(odb_file, shape=(6, 5, 4), num_frames=(3, 2),
+                        block_size=17)
+odb = mock_odb.openOdb(odb_file)
+inst_name = 'PART-1-1'
+
+# Nodal values, compared with reducing the full per node series
+names = ['sum', 'mean', 'min', 'max', 'p50', 'p99.5']
+data = reductions.get_set_reduction(odb, inst_name, 'X0', 'RF2', [0, 1],
+                                    reductions=names)
+full = bulk_data.get_multiple_positions(odb, inst_name, 'X0', 'RF2', [0, 1])
+labels = bulk_data.get_node_region(odb, inst_name, 'X0', 1.e-2)[0]
+assert(data.column_keys == ['sum', 'mean', 'min', 'min_label', 'max',
+                            'max_label', 'p50', 'p99.5'])
+assert(np.allclose(data.time, full.time))
+assert(np.allclose(data['sum'], np.sum(full.data, axis=1)))
+assert(np.allclose(data['mean'], np.mean(full.data, axis=1)))
+assert(np.allclose(data['min'], np.min(full.data, axis=1)))
+assert(np.allclose(data['max'], np.max(full.data, axis=1)))
+assert(np.all(data['max_label'] == labels[np.argmax(full.data, axis=1)]))
+assert(np.all(data['min_label'] == labels[np.argmin(full.data, axis=1)]))
+assert(np.allclose(data['p50'], np.median(full.data, axis=1)))
+assert(np.allclose(data['p99.5'], np.percentile(full.data, 99.5, axis=1)))
+
+# Derived quantity at the integration points of an element set
+data = reductions.get_set_reduction(odb, inst_name, 'EX0', 'MISES', [1],
+                                    increments=[-1], reductions=['max'])
+full = element_data.get_multiple_elements(odb, inst_name, 'EX0', 'S',
+                                          ['MISES'], [1], increments=[-1])
+values = full['values'][0, :, :, 0]
+assert(np.isclose(data['max'][0], np.max(values)))
+elem_ind = np.unravel_index(np.argmax(values), values.shape)[0]
+assert(data['max_label'][0] == full['element'][elem_ind])
+
+try:
+    reductions.get_set_reduction(odb, inst_name, 'X0', 'U1', [0],
+                                 reductions=['median'])
+    raise AssertionError('Unknown reduction accepted')
+except ValueError:
+    pass
+
+# A node set and an empty element set with the same name
+inst = odb.rootAssembly.instances[inst_name]
+inst.elementSets['X0'] = mock_odb.OdbSet('X0', inst, element_labels=[])
+try:
+    reductions.get_set_reduction(odb, inst_name, 'X0', 'U1', [0])
+    raise AssertionError('Ambiguous set name accepted')
+except ValueError as e:
+    assert('both a node set and an element set' in str(e))
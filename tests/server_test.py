@@ -0,0 +1,76 @@
+import os
+import tempfile
+import threading
+import numpy as np
+
+from odb_scripts import bulk_data, mesh_table
+from odb_scripts.server import OdbServer
+from odb_scripts.client import OdbClient
+from odb_scripts.results import ResultArray
+import mock_odb
+
+
+# Test the server with the mock odb as stand-in backend
+odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+mock_odb.write_odb_file(odb_file, shape=(4, 3, 2), num_frames=(3, 4))
+odb = mock_odb.openOdb(odb_file)
+other_file = os.path.join(tempfile.mkdtemp(), 'other.odb')
+mock_odb.write_odb_file(other_file, shape=(2, 2, 2), num_frames=(2,))
+inst_name = 'PART-1-1'
+pos = [[3.0, 2.0, 1.0], [1.0, 0.0, 0.0], [0.0, 1.0, 1.0]]
+
+server = OdbServer(('127.0.0.1', 0), odb_module='mock_odb',
+                   odb_paths=[odb_file])
+thread = threading.Thread(target=server.serve)
+thread.start()
+
+with OdbClient(server.server_address, timeout=60) as client:
+    assert(client.ping())
+    assert(client.list_odbs() == [os.path.abspath(odb_file)])
+
+    data = client.get_multiple_positions(odb_file, inst_name,
+                                         np.array(pos), 'U2', [0, 1],
+                                         increments=[0, -1])
+    ref = bulk_data.get_multiple_positions(odb, inst_name, pos, 'U2',
+                                           [0, 1], increments=[0, -1])
+    assert(isinstance(data, ResultArray))
+    assert(data.keys() == ref.keys())
+    for key in ref:
+        assert(np.all(data[key] == ref[key]))
+
+    data = client.get_multiple_variables(odb_file, inst_name, pos[0],
+                                         ['U1', 'RF3'], [1])
+    ref = bulk_data.get_multiple_variables(odb, inst_name, pos[0],
+                                           ['U1', 'RF3'], [1])
+    assert(np.all(data.data == ref.data))
+
+    data = client.get_multiple_positions_variables(odb_file, inst_name, 'X0',
+                                                   ['U1', 'U3'], [0])
+    ref = bulk_data.get_multiple_positions_variables(odb, inst_name, 'X0',
+                                                     ['U1', 'U3'], [0])
+    assert(np.all(data['values'] == ref['values']))
+    assert(np.all(data['label'] == ref['label']))
+
+    labels = client.get_node_labels(odb_file, inst_name, pos)
+    assert(np.all(labels == bulk_data.get_mesh_table(odb, inst_name)
+                  .find_labels(pos, 1.e-2)))
+
+    # Errors on the server are raised in the client, and the server
+    # continues serving
+    try:
+        client.get_node_labels(odb_file, inst_name, [[0.5, 0.5, 0.5]])
+        raise AssertionError('Expected RuntimeError for missing node')
+    except RuntimeError as error:
+        assert('ValueError' in str(error))
+    assert(client.ping())
+
+    # Closing an odb only removes the cached tables of that odb
+    assert(client.get_node_labels(other_file, inst_name, pos[1:2]) == [5])
+    assert(client.close_odb(odb_file) == [os.path.abspath(other_file)])
+    assert(not mesh_table.is_cached(os.path.abspath(odb_file)))
+    assert(mesh_table.is_cached(os.path.abspath(other_file)))
+    assert(client.close_odb(other_file) == [])
+    client.shutdown()
+
+thread.join(60)
+assert(not thread.is_alive())
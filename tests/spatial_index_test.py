@@ -0,0 +1,77 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts.spatial_index import NodeGrid, ElementGrid
+from odb_scripts import node_data
+import mock_odb
+
+
+# Nearest point queries, compared with a brute force search
+random_state = np.random.RandomState(0)
+coords = random_state.rand(500, 3)*[4.0, 2.0, 1.0]
+points = np.vstack((coords[::7] + 1.e-4, random_state.rand(50, 3)*4.0))
+tol = 0.05
+grid = NodeGrid(coords)
+nearest, num_found = grid.query(points, tol)
+dist = np.sqrt(np.sum((points[:, np.newaxis] - coords[np.newaxis])**2,
+                      axis=2))
+assert(np.all(num_found == np.sum(dist < tol, axis=1)))
+found = num_found > 0
+assert(np.all(nearest[~found] == -1))
+assert(np.all(nearest[found] == np.argmin(dist[found], axis=1)))
+
+# The cell size is not smaller than the search radius
+assert(NodeGrid(coords, min_cell_size=0.5).cell_size == 0.5)
+assert(np.all(NodeGrid(coords, min_cell_size=0.5).query(points, 0.5)[1]
+              == np.sum(dist < 0.5, axis=1)))
+
+# Planar mesh with round-off noise out of plane, the noise should not
+# give a tiny cell size
+grids = np.meshgrid(np.arange(200.0), np.arange(200.0), indexing='ij')
+coords = np.transpose([grids[0].ravel(), grids[1].ravel(),
+                       1.e-12*random_state.rand(200*200)])
+grid = NodeGrid(coords)
+assert(grid.cell_size > 0.5)
+points = coords[::997] + [1.e-3, 0.0, 0.0]
+nearest, num_found = grid.query(points, 1.e-2)
+assert(np.all(num_found == 1))
+assert(np.all(nearest == np.arange(0, len(coords), 997)))
+
+# Graded mesh: many small elements and one large element spanning many
+# cells. Each element is only added to the cells of its own box.
+grids = np.meshgrid(np.arange(200)*0.01, np.arange(100)*0.01, [0.0],
+                    indexing='ij')
+box_min = np.transpose([g.ravel() for g in grids])
+box_min = np.vstack((box_min, [[0.0, 0.0, 0.0]]))
+box_max = box_min + 0.01
+box_max[-1] = [2.0, 1.0, 0.01]
+grid = ElementGrid(box_min, box_max)
+assert(len(grid.elements) < 5*len(box_min))
+points = random_state.rand(200, 3)*[2.0, 1.0, 0.01]
+point_inds, elem_inds = grid.candidates(points)
+inside = np.all((points[:, np.newaxis] >= box_min)
+                & (points[:, np.newaxis] <= box_max), axis=2)
+for point_ind in range(len(points)):
+    candidates = elem_inds[point_inds == point_ind]
+    assert(set(np.nonzero(inside[point_ind])[0]) <= set(candidates))
+    assert(len(box_min) - 1 in candidates)
+
+# Errors for missing positions and several nodes within tol
+odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+mock_odb.write_odb_file(odb_file, shape=(4, 3, 2), num_frames=(2,))
+odb = mock_odb.openOdb(odb_file)
+labels = node_data.get_node_labels(odb, 'PART-1-1', [[1.0, 2.0, 1.0],
+                                                     [3.0, 0.0, 0.0]], 1.e-2)
+assert(labels == [12, 19])
+try:
+    node_data.get_node_labels(odb, 'PART-1-1', [[1.0, 2.0, 1.0],
+                                                [0.5, 0.5, 0.5]], 1.e-2)
+    raise AssertionError('Missing position accepted')
+except ValueError as e:
+    assert('Could not find the position: [0.5, 0.5, 0.5]' in str(e))
+try:
+    node_data.get_node_labels(odb, 'PART-1-1', [[1.0, 2.0, 1.0]], 1.1)
+    raise AssertionError('Several nodes within tol accepted')
+except ValueError as e:
+    assert('Found 5 nodes within tol' in str(e))
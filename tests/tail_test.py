@@ -0,0 +1,53 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import tail, bulk_data
+import mock_odb
+
+
+# Test with a mock odb file that grows between the polls, does not
+# require Abaqus. The frame times of the mock odb change when frames are
+# added, and each poll is therefore compared with the odb at that time.
+out_dir = tempfile.mkdtemp()
+odb_file = os.path.join(out_dir, 'job.odb')
+store = os.path.join(out_dir, 'store')
+spec = {'inst_name': 'PART-1-1', 'positions': 'EDGE', 'variable': 'U1',
+        'step_numbers': [0, 1]}
+
+num_appended = []
+refs = []
+for num_frames in [(2,), (4,), (4, 1), (4, 1), (4, 3)]:
+    mock_odb.write_odb_file(odb_file, num_frames=num_frames)
+    odb = mock_odb.openOdb(odb_file)
+    num_appended.append(tail.extract_tail(odb, spec, store))
+    ref = bulk_data.get_multiple_positions(
+        odb, **dict(spec, step_numbers=list(range(len(num_frames)))))
+    refs.append(ref.data[len(ref.time) - num_appended[-1]:])
+assert(num_appended == [2, 2, 1, 0, 2])
+assert(tail.read_state(store)['last'] == [1, 2])
+
+for mmap_mode in ['r', None]:
+    result = tail.load_tail(store, mmap_mode=mmap_mode)
+    assert(np.all(result.data == np.concatenate(refs)))
+    assert(np.all(result.step == ref.step))
+    assert(np.all(result.incr == ref.incr))
+    assert(np.all(result['node'] == ref['node']))
+del result
+
+# Rows from an interrupted poll, not recorded in the state, are replaced
+with open(os.path.join(store, 'time.bin'), 'ab') as fid:
+    np.zeros(3).tofile(fid)
+mock_odb.write_odb_file(odb_file, num_frames=(4, 5))
+assert(tail.extract_tail(mock_odb.openOdb(odb_file), spec, store) == 2)
+ref = bulk_data.get_multiple_positions(mock_odb.openOdb(odb_file), **spec)
+assert(np.all(tail.load_tail(store).time[-2:] == ref.time[-2:]))
+assert(len(tail.load_tail(store).time) == len(ref.time))
+
+# A store cannot be continued with a different spec
+try:
+    tail.extract_tail(mock_odb.openOdb(odb_file), dict(spec, variable='U2'),
+                      store)
+    raise AssertionError('Different spec accepted')
+except ValueError:
+    pass
@@ -0,0 +1,72 @@
+import os
+import re
+import tempfile
+import numpy as np
+
+from odb_scripts import vtk_export, mesh_table
+import mock_odb
+
+
+# Test with mock odb, does not require Abaqus
+out_dir = tempfile.mkdtemp()
+odb_file = os.path.join(out_dir, 'mock.odb')
+mock_odb.write_odb_file(odb_file, shape=(4, 3, 3), num_frames=(2, 3))
+odb = mock_odb.openOdb(odb_file)
+inst_name = 'PART-1-1'
+table = mesh_table.get_mesh_table(odb, inst_name)
+num_nodes = len(table.labels)
+num_cells = len(table.element_labels)
+
+# Cell types of common elements
+assert(vtk_export.cell_type('C3D8R', 8) == 'hex')
+assert(vtk_export.cell_type('C3D10M', 10) == 'tet10')
+assert(vtk_export.cell_type('S4R', 4) == 'quad')
+assert(vtk_export.cell_type('CPE6M', 6) == 'tri6')
+assert(vtk_export.cell_type('B32', 3) == 'line')
+assert(vtk_export.cell_type('CONN3D2', 2) is None)
+
+# Raw binary XDMF: the frames are appended to one file per array
+filenames = vtk_export.export_odb(odb_file, out_dir, ['U', 'S', 'MISES'],
+                                  [0, 1], odb_module='mock_odb')
+xdmf_file = filenames[inst_name]
+with open(xdmf_file, 'r') as fid:
+    xdmf = fid.read()
+assert(xdmf.count('<Time ') == 5)
+assert(xdmf.count('Name="S22"') == 5)
+path = os.path.join(out_dir, inst_name)
+points = np.fromfile(path + '_points.bin', dtype='<f8').reshape(-1, 3)
+assert(np.all(points == table.coords))
+topology = np.fromfile(path + '_topology.bin', dtype='<i8')
+assert(np.all(topology.reshape(-1, 9)[:, 0] == 9))
+node_inds = table.element_node_indices()
+assert(np.all(topology.reshape(-1, 9)[:, 1:] == node_inds))
+
+u = np.fromfile(path + '_U_node.bin', dtype='<f4').reshape(5, num_nodes, 3)
+for frame_ind, match in enumerate(re.finditer(
+        r'<Time Value="([^"]+)"/>', xdmf)):
+    time = float(match.group(1))
+    ref = mock_odb.nodal_value('U', 1, table.labels, table.coords, time)
+    assert(np.allclose(u[frame_ind, :, 1], ref))
+    mises = np.fromfile(path + '_MISES_cell.bin', dtype='<f4',
+                        count=num_cells, offset=4*num_cells*frame_ind)
+    assert(np.all(np.isfinite(mises)) and np.all(mises >= 0))
+s11 = np.fromfile(path + '_S11_cell.bin', dtype='<f4').reshape(5, num_cells)
+ip_mean = np.mean(np.arange(1, mock_odb.NUM_IPS + 1))
+ref = mock_odb.ip_value('S', 0, table.element_labels, ip_mean, 2.0)
+assert(np.allclose(s11[-1], ref))
+
+# VTU files with a collection of the frames
+pvd_file = vtk_export.export_instance(odb, inst_name, out_dir, ['U'], [1],
+                                      increments=[-1], fmt='vtu')
+with open(pvd_file, 'r') as fid:
+    assert(fid.read().count('<DataSet ') == 1)
+with open(path + '_0.vtu', 'rb') as fid:
+    vtu = fid.read()
+header, appended = vtu.split(b'<AppendedData encoding="raw">\n_', 1)
+offset = int(re.search(b'Name="U" NumberOfComponents="3" format="appended" '
+                       b'offset="(\\d+)"', header).group(1))
+nbytes = np.frombuffer(appended[offset:offset + 8], dtype='<u8')[0]
+assert(nbytes == 4*3*num_nodes)
+
+names = vtk_export.write_colormaps(os.path.join(out_dir, 'colormaps.json'))
+assert('cool_warm' in names)
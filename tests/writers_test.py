@@ -0,0 +1,77 @@
+import os
+import json
+import tempfile
+import numpy as np
+
+from odb_scripts import writers
+
+
+out_dir = tempfile.mkdtemp()
+columns = ['Time', 'S11', 'S22']
+data = np.array([[0.0, 1.0, 2.0], [0.5, 3.0, 4.0], [1.0, 5.0, 6.0]])
+metadata = {'instance': 'PART-1-1', 'element': 3, 'ip': 1}
+
+# Check text output, header and data written in one pass
+with writers.TextWriter(out_dir) as writer:
+    writer.write('S_E3_IP1', columns, data, metadata)
+
+filename = os.path.join(out_dir, 'S_E3_IP1.dat')
+with open(filename, 'r') as fid:
+    header = fid.readline()
+assert(header.split() == ['#'] + columns)
+assert(np.allclose(np.loadtxt(filename), data))
+
+# Check several tables in one npz file
+filename = os.path.join(out_dir, 'results.npz')
+with writers.get_writer('npz', filename=filename) as writer:
+    writer.write('S_E3_IP1', columns, data, metadata)
+    writer.write('S_E4_IP1', columns, 2*data, metadata)
+
+npz = np.load(filename)
+assert(npz['S_E3_IP1'].dtype.names == tuple(columns))
+assert(np.allclose(npz['S_E4_IP1']['S22'], 2*data[:, 2]))
+assert(json.loads(str(npz['S_E3_IP1.meta'])) == metadata)
+npz.close()
+
+# Appending to an existing npz file keeps the earlier tables, and the
+# table names must be unique
+with writers.get_writer('npz', filename=filename) as writer:
+    writer.write('S_E5_IP1', columns, 3*data, metadata)
+    try:
+        writer.write('S_E3_IP1', columns, data, metadata)
+        raise AssertionError('Existing table name accepted')
+    except ValueError:
+        pass
+npz = np.load(filename)
+assert(sorted(npz.files) == ['S_E3_IP1', 'S_E3_IP1.meta', 'S_E4_IP1',
+                             'S_E4_IP1.meta', 'S_E5_IP1', 'S_E5_IP1.meta'])
+assert(np.allclose(npz['S_E5_IP1']['S11'], 3*data[:, 1]))
+assert(json.loads(str(npz['S_E4_IP1.meta'])) == metadata)
+npz.close()
+
+# The mode 'w' overwrites the file
+with writers.NpzWriter(filename, mode='w') as writer:
+    writer.write('S_E3_IP1', columns, data)
+npz = np.load(filename)
+assert(sorted(npz.files) == ['S_E3_IP1', 'S_E3_IP1.meta'])
+npz.close()
+
+# HDF5 output appends to an existing file, requires h5py
+try:
+    import h5py
+except ImportError:
+    h5py = None
+    print('h5py is not installed, skipping the HDF5 writer test')
+if h5py is not None:
+    filename = os.path.join(out_dir, 'results.h5')
+    with writers.get_writer('h5', filename=filename) as writer:
+        writer.write('S_E3_IP1', columns, data, metadata)
+    with writers.get_writer('h5', filename=filename) as writer:
+        writer.write('S_E4_IP1', columns, 2*data, metadata)
+    with h5py.File(filename, 'r') as h5:
+        assert(sorted(h5.keys()) == ['S_E3_IP1', 'S_E4_IP1'])
+        group = h5['S_E4_IP1']
+        assert(np.allclose(group['data'][...], 2*data))
+        assert([column.decode('utf-8') for column in group.attrs['columns']]
+               == columns)
+        assert(group.attrs['element'] == 3)
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import numpy as np
+
+from odb_scripts import node_data, bulk_data, backends
+import mock_odb
+import mock_cae
+
+
+# Test the xy engine with a mock session, does not require Abaqus
+mock_cae.install()
+try:
+    assert(backends.resolve_engine('auto') == 'xy')
+    odb_file = os.path.join(tempfile.mkdtemp(), 'mock.odb')
+    mock_odb.write_odb_file(odb_file, shape=(4, 3, 2), num_frames=(3, 4))
+    odb = mock_cae.session.openOdb(odb_file)
+    inst_name = 'PART-1-1'
+    var = ['U1', 'UMAG', 'RF3']
+
+    # Positions giving the same node share the xy data of that node
+    pos = [[3.0, 2.0, 1.0], [1.0, 0.0, 0.0], [3.0, 2.0, 1.0 + 1.e-3]]
+    data = node_data.get_multiple_positions_variables(
+        odb, inst_name, pos, var, step_numbers=[0, 1], increments=[0, -1])
+    ref = bulk_data.get_multiple_positions_variables(
+        odb, inst_name, pos, var, step_numbers=[0, 1], increments=[0, -1])
+    assert(not np.any(np.isnan(data['values'])))
+    assert(np.all(data['values'][:, 0] == data['values'][:, 2]))
+    assert(np.allclose(data['values'], ref['values'], rtol=1.e-6))
+    assert(np.allclose(data['time'], ref['time']))
+    assert(list(data['step']) == list(ref['step']))
+    assert(list(data['incr']) == list(ref['incr']))
+
+    data = node_data.get_multiple_positions(odb, inst_name, pos[:2], 'RF3',
+                                            [1])
+    ref = bulk_data.get_multiple_positions(odb, inst_name, pos[:2], 'RF3',
+                                           [1])
+    assert(np.allclose(data.data, ref.data, rtol=1.e-6))
+
+    data = node_data.get_multiple_variables(odb, inst_name, pos[1],
+                                            ['U1', 'U2'], [0])
+    ref = bulk_data.get_multiple_variables(odb, inst_name, pos[1],
+                                           ['U1', 'U2'], [0])
+    assert(np.allclose(data.data, ref.data, rtol=1.e-6))
+finally:
+    mock_cae.uninstall()